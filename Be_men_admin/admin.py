@@ -71,10 +71,12 @@ class ProductAdmin(admin.ModelAdmin):
     search_fields = ("name", "category__category", "description")
     readonly_fields = ("created_at", "updated_at")
     list_display_links = ("name",)
+    list_select_related = ("category",)
 
 
 @admin.register(Order)
 class OrderAdmin(admin.ModelAdmin):
+    list_select_related = ("user", "product")
     list_display = (
         "id",
         "user",
@@ -89,7 +91,7 @@ class OrderAdmin(admin.ModelAdmin):
     )
     list_filter = ("payment_status", "order_status", "created_at")
     search_fields = (
-        "user__username",
+        "user__email",
         "product__name",
         "tracking_id",
         "razorpay_order_id",
@@ -0,0 +1,57 @@
+import re
+from functools import reduce
+from operator import or_
+
+from django.db.models import Q
+from rest_framework import filters
+from rest_framework.settings import api_settings
+
+
+class AdminSearchFilter(filters.BaseFilterBackend):
+    """
+    Typo tolerant search for the admin list views, backed by pg_trgm.
+
+    Every column in the view's ``search_fields`` carries a GIN
+    ``gin_trgm_ops`` index. A row matches when the term appears anywhere in
+    the column (case-insensitive regex, served by the trigram index) or is
+    close to a word in it (``%>`` word similarity, with the threshold set in
+    ``DATABASES["default"]["OPTIONS"]``), so "jakcet" still finds
+    "Leather Jacket". Views can set ``search_by_id = True`` to also match
+    numeric terms against the primary key.
+    """
+
+    search_param = api_settings.SEARCH_PARAM
+
+    def get_search_term(self, request):
+        term = request.query_params.get(self.search_param, "")
+        return term.replace("\x00", "").strip()
+
+    def filter_queryset(self, request, queryset, view):
+        term = self.get_search_term(request)
+        search_fields = getattr(view, "search_fields", None)
+        if not term or not search_fields:
+            return queryset
+
+        pattern = re.escape(term)
+        conditions = [
+            Q(**{f"{field}__iregex": pattern})
+            | Q(**{f"{field}__trigram_word_similar": term})
+            for field in search_fields
+        ]
+        search_by_id = getattr(view, "search_by_id", False)
+        if search_by_id and term.isdigit() and len(term) <= 18:
+            conditions.append(Q(pk=int(term)))
+
+        return queryset.filter(reduce(or_, conditions))
+
+    def get_schema_operation_parameters(self, view):
+        return [
+            {
+                "name": self.search_param,
+                "required": False,
+                "in": "query",
+                "description": "Fuzzy search on "
+                + ", ".join(getattr(view, "search_fields", None) or []),
+                "schema": {"type": "string"},
+            },
+        ]
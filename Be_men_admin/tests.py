@@ -1,3 +1,501 @@
-from django.test import TestCase
+import csv
+import io
+import json
+import os
+import shutil
+import tempfile
+import time
+from unittest import skipUnless
 
-# Create your tests here.
+from accesories_backend.storage import MEDIA_CLAIM_KEY
+from accesories_backend.uploads import ChunkedUpload
+from admin_products.models import StockMovement
+from Be_men_user.models import User
+from Be_men_user.tests import QueryBudgetTestCase, seed_activity, seed_catalog
+from django.conf import settings
+from django.core.cache import cache
+from django.core.files.storage import default_storage
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.core.management import call_command
+from django.db import connection
+from django.test import TestCase, override_settings
+from order.models import Order
+from PIL import Image
+from product.models import Product, ProductCategory
+from rest_framework.test import APIClient
+
+from . import urls as admin_urls
+
+
+def png_upload(name="product.png"):
+    buffer = io.BytesIO()
+    Image.new("RGB", (8, 8), "black").save(buffer, "PNG")
+    return SimpleUploadedFile(name, buffer.getvalue(), content_type="image/png")
+
+
+class AdminRouteQueryBudgetTests(QueryBudgetTestCase):
+    urlconf = admin_urls
+    budgets = {
+        "admin-dashboard": 13,
+        "admin-user-list": 2,
+        "admin-user-export": 1,
+        "admin-user-detail": 1,
+        "admin-ban-user": 2,
+        "admin-order-list": 2,
+        "admin-order-export": 1,
+        "admin-order-detail": 3,
+        "admin-product-list": 2,
+        "admin-product-export": 1,
+        "admin-product-add": 2,
+        "admin-product-detail": 1,
+        "admin-product-update": 3,
+        "admin-product-delete": 8,
+        "admin-product-upload": 0,
+        "admin-product-upload-chunk": 0,
+        "admin-product-direct-upload": 0,
+        "admin-product-direct-upload-receive": 0,
+        "admin-product-finalize-upload": 2,
+        "admin-product-import": 7,
+        "admin-product-stock": 5,
+        "cancelled-orders": 2,
+        "approve-return": 4,
+        "admin-category-list": 2,
+        "admin-category-detail": 1,
+        "api-root": 0,
+    }
+
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.media_root = tempfile.mkdtemp()
+        cls.media_override = override_settings(
+            MEDIA_ROOT=cls.media_root,
+            CHUNKED_UPLOAD_DIR=f"{cls.media_root}/chunked_uploads",
+        )
+        cls.media_override.enable()
+
+    @classmethod
+    def tearDownClass(cls):
+        cls.media_override.disable()
+        shutil.rmtree(cls.media_root, ignore_errors=True)
+        super().tearDownClass()
+
+    def setUp(self):
+        super().setUp()
+        self.admin = User.objects.create_superuser(
+            email="admin@example.com",
+            name="Admin",
+            phone_number="9000000000",
+            password="Str0ng-passw0rd",
+        )
+        self.customer = User.objects.create_user(
+            email="customer@example.com",
+            name="Customer",
+            phone_number="9000000001",
+            password="Str0ng-passw0rd",
+        )
+        self.products = seed_catalog(3)
+        self.orders = seed_activity(self.customer, self.products)
+        self.client.force_authenticate(self.admin)
+
+    def grow(self):
+        start = User.objects.count()
+        for i in range(start, start + 6):
+            customer = User.objects.create_user(
+                email=f"customer{i}@example.com",
+                name=f"Customer {i}",
+                phone_number=f"91{i:08d}",
+                password="Str0ng-passw0rd",
+            )
+            seed_activity(customer, seed_catalog(2), status="CANCELLED")
+
+    def test_dashboard(self):
+        self.assertFlatQueries(
+            "admin-dashboard",
+            lambda: self.client.get("/api/v1/admin/dashboard/"),
+            self.grow,
+        )
+
+    def test_user_routes(self):
+        self.assertFlatQueries(
+            "admin-user-list",
+            lambda: self.client.get("/api/v1/admin/users/"),
+            self.grow,
+        )
+        url = f"/api/v1/admin/user/{self.customer.id}/"
+        self.assertWithinBudget("admin-user-detail", lambda: self.client.get(url))
+        self.assertWithinBudget(
+            "admin-ban-user", lambda: self.client.post(f"{url}ban/")
+        )
+
+    def test_order_routes(self):
+        self.assertFlatQueries(
+            "admin-order-list",
+            lambda: self.client.get("/api/v1/admin/orders/"),
+            self.grow,
+        )
+        self.assertFlatQueries(
+            "cancelled-orders",
+            lambda: self.client.get("/api/v1/admin/returned-cancelled-orders/"),
+            self.grow,
+        )
+        order = self.orders[0]
+        url = f"/api/v1/admin/orders/{order.id}/"
+        self.assertWithinBudget("admin-order-detail", lambda: self.client.get(url))
+        self.assertWithinBudget(
+            "admin-order-detail",
+            lambda: self.client.patch(url, {"tracking_id": "TRACK123"}),
+        )
+
+        Order.objects.filter(id=order.id).update(order_status="RETURN_PENDING")
+        self.assertWithinBudget(
+            "approve-return",
+            lambda: self.client.post(
+                f"/api/v1/admin/orders/{order.id}/return/", {"action": "approve"}
+            ),
+        )
+
+    def test_product_routes(self):
+        self.assertFlatQueries(
+            "admin-product-list",
+            lambda: self.client.get("/api/v1/admin/products/"),
+            lambda: seed_catalog(12),
+        )
+        category = ProductCategory.objects.first()
+        self.assertWithinBudget(
+            "admin-product-add",
+            lambda: self.client.post(
+                "/api/v1/admin/products/add/",
+                {
+                    "name": "Card holder",
+                    "category_id": category.id,
+                    "description": "Slim card holder",
+                    "price": "299.00",
+                    "old_price": "399.00",
+                    "product_image": png_upload(),
+                    "product_stock": 10,
+                },
+                format="multipart",
+            ),
+        )
+        product = self.products[0]
+        url = f"/api/v1/admin/products/{product.id}/"
+        self.assertWithinBudget("admin-product-detail", lambda: self.client.get(url))
+        self.assertWithinBudget(
+            "admin-product-update",
+            lambda: self.client.patch(
+                f"{url}update/", {"product_stock": 5}, format="multipart"
+            ),
+        )
+        self.assertWithinBudget(
+            "admin-product-delete", lambda: self.client.delete(f"{url}delete/")
+        )
+
+    @skipUnless(connection.vendor == "postgresql", "trigram search needs PostgreSQL")
+    def test_search(self):
+        self.assertFlatQueries(
+            "admin-user-list",
+            lambda: self.client.get("/api/v1/admin/users/?search=customer"),
+            self.grow,
+        )
+        self.assertFlatQueries(
+            "admin-order-list",
+            lambda: self.client.get("/api/v1/admin/orders/?search=product"),
+            self.grow,
+        )
+        self.assertFlatQueries(
+            "admin-product-list",
+            lambda: self.client.get("/api/v1/admin/products/?search=product"),
+            lambda: seed_catalog(12),
+        )
+
+    def test_chunked_upload_routes(self):
+        data = png_upload().read()
+        response, _ = self.assertWithinBudget(
+            "admin-product-upload",
+            lambda: self.client.post(
+                "/api/v1/admin/products/uploads/",
+                {"filename": "product.png", "size": len(data)},
+            ),
+        )
+        url = f"/api/v1/admin/products/uploads/{response.data['upload_id']}/"
+        for offset in range(0, len(data), 16):
+            self.assertWithinBudget(
+                "admin-product-upload-chunk",
+                lambda: self.client.patch(
+                    url,
+                    data[offset : offset + 16],
+                    content_type="application/offset+octet-stream",
+                    HTTP_UPLOAD_OFFSET=str(offset),
+                ),
+            )
+        response, _ = self.assertWithinBudget(
+            "admin-product-upload-chunk", lambda: self.client.get(url)
+        )
+        self.assertTrue(response.data["complete"])
+
+    def test_chunked_upload_expiry(self):
+        upload = ChunkedUpload.create(self.admin, "product.png", 100)
+        paths = [upload.path_for(upload.id, suffix) for suffix in ("json", "part")]
+        expired = time.time() - settings.CHUNKED_UPLOAD_EXPIRY - 60
+
+        # Metadata written long ago, chunk received just now: in progress.
+        os.utime(paths[0], (expired, expired))
+        ChunkedUpload.purge_expired()
+        self.assertTrue(all(map(os.path.exists, paths)))
+        self.assertIsNotNone(ChunkedUpload.get(upload.id, self.admin))
+
+        os.utime(paths[1], (expired, expired))
+        ChunkedUpload.purge_expired()
+        self.assertFalse(any(map(os.path.exists, paths)))
+
+    def test_direct_upload_routes(self):
+        data = png_upload().read()
+        response, _ = self.assertWithinBudget(
+            "admin-product-direct-upload",
+            lambda: self.client.post(
+                "/api/v1/admin/products/direct-uploads/",
+                {"filename": "product.png", "content_type": "image/png", "size": 10},
+            ),
+        )
+        issued = response.data
+        target = issued["upload"]
+        self.assertEqual(target["method"], "PUT")
+        self.assertWithinBudget(
+            "admin-product-direct-upload-receive",
+            lambda: APIClient().put(target["url"], data, content_type="image/png"),
+        )
+        product = self.products[0]
+        self.assertWithinBudget(
+            "admin-product-finalize-upload",
+            lambda: self.client.post(
+                f"/api/v1/admin/products/{product.id}/finalize-upload/",
+                {"token": issued["token"]},
+            ),
+        )
+        product.refresh_from_db()
+        self.assertEqual(product.product_image.name, issued["name"])
+
+    def test_media_release(self):
+        # A file stored under the upload's client-side name is unrelated.
+        stray = f"{self.media_root}/picture.png"
+        with open(stray, "wb") as f:
+            f.write(b"unrelated")
+        with self.captureOnCommitCallbacks(execute=True):
+            user = User.objects.create_user(
+                email="pictured@example.com",
+                name="Pictured",
+                phone_number="9000000002",
+                password="Str0ng-passw0rd",
+                profile_picture=png_upload("picture.png"),
+            )
+        self.assertTrue(os.path.exists(stray))
+
+        # The replaced picture was just saved, so a concurrent save may be
+        # about to reference it; the sweep deletes it later.
+        name = user.profile_picture.name
+        user.profile_picture = "default.png"
+        with self.captureOnCommitCallbacks(execute=True):
+            user.save()
+        self.assertTrue(default_storage.exists(name))
+
+        cache.delete(MEDIA_CLAIM_KEY.format(name))
+        call_command("release_orphaned_media", stdout=io.StringIO())
+        self.assertFalse(default_storage.exists(name))
+        self.assertTrue(os.path.exists(stray))
+
+    def test_import_route(self):
+        images = f"{self.media_root}/import"
+        os.makedirs(images)
+        with open(f"{images}/card.png", "wb") as f:
+            f.write(png_upload().read())
+        rows = "\n".join(
+            [
+                "sku,name,category,price,product_stock,image",
+                "CARD-1,Card holder,Card holders,299.00,10,card.png",
+                "CARD-2,Card case,Card holders,349.00,5,card.png",
+                "SEED-0,Renamed,Wallets,1.00,,",
+                "BAD-1,No price,Wallets,,1,card.png",
+                "BAD-2,Huge stock,Wallets,10.00,2147483648,",
+                "BAD-3,Huge price,Wallets,100000000.00,1,",
+            ]
+        )
+        Product.objects.filter(pk=self.products[0].pk).update(
+            sku="SEED-0", active=False
+        )
+
+        with override_settings(PRODUCT_IMPORT_IMAGE_DIR=images):
+            response, _ = self.assertWithinBudget(
+                "admin-product-import",
+                lambda: self.client.post(
+                    "/api/v1/admin/products/import/",
+                    {"file": SimpleUploadedFile("catalog.csv", rows.encode())},
+                    format="multipart",
+                ),
+            )
+        self.assertEqual((response.data["created"], response.data["updated"]), (2, 1))
+        self.assertEqual(
+            [(e["line"], list(e["errors"])) for e in response.data["errors"]],
+            [(5, ["price"]), (6, ["product_stock"]), (7, ["price"])],
+        )
+        self.assertFalse(Product.objects.filter(sku__startswith="BAD-").exists())
+        created = Product.objects.filter(sku__in=["CARD-1", "CARD-2"])
+        self.assertEqual(len({p.product_image.name for p in created}), 1)
+        # Columns the row leaves out keep their stored values.
+        seed = Product.objects.get(sku="SEED-0")
+        self.assertEqual(seed.name, "Renamed")
+        self.assertEqual(seed.product_stock, self.products[0].product_stock)
+        self.assertFalse(seed.active)
+        self.assertEqual(seed.description, self.products[0].description)
+        self.assertEqual(seed.old_price, self.products[0].old_price)
+        self.assertEqual(seed.product_image, self.products[0].product_image)
+
+    def test_stock_route(self):
+        first, second, third = self.products
+        response, _ = self.assertWithinBudget(
+            "admin-product-stock",
+            lambda: self.client.post(
+                "/api/v1/admin/products/stock/",
+                {
+                    "adjustments": [
+                        {"product_id": first.id, "delta": 5},
+                        {"product_id": second.id, "absolute": 7},
+                        {"product_id": third.id, "delta": -51},
+                        {"product_id": 999999, "delta": 1},
+                    ],
+                    "reason": "Restock",
+                },
+                format="json",
+            ),
+        )
+        statuses = [result["status"] for result in response.data["results"]]
+        self.assertEqual(statuses, ["updated", "updated", "rejected", "not_found"])
+        self.assertEqual(
+            dict(Product.objects.values_list("id", "product_stock")),
+            {first.id: 55, second.id: 7, third.id: 50},
+        )
+        self.assertEqual(
+            sorted(StockMovement.objects.values_list("delta", flat=True)), [-43, 5]
+        )
+
+    def test_export_routes(self):
+        def export(url):
+            def call():
+                response = self.client.get(url)
+                # Rows are fetched while the body streams.
+                response.body = response.getvalue()
+                return response
+
+            return call
+
+        response, _ = self.assertWithinBudget(
+            "admin-order-export",
+            export("/api/v1/admin/orders/export/?order_status=processing"),
+        )
+        lines = response.body.decode().splitlines()
+        self.assertEqual(lines[0].split(",")[:3], ["id", "user.name", "user.email"])
+        self.assertEqual(len(lines), 1 + len(self.orders))
+        self.assertFlatQueries(
+            "admin-order-export", export("/api/v1/admin/orders/export/"), self.grow
+        )
+
+        response, _ = self.assertWithinBudget(
+            "admin-product-export",
+            export("/api/v1/admin/products/export/?export_format=jsonl"),
+        )
+        rows = [json.loads(line) for line in response.body.splitlines()]
+        self.assertEqual(len(rows), Product.objects.count())
+        self.assertIn(rows[0]["category.category"], {"Wallets", "Belts", "Watches"})
+        self.assertFlatQueries(
+            "admin-user-export",
+            export("/api/v1/admin/users/export/"),
+            self.grow,
+        )
+
+    def test_csv_export_neutralizes_formulas(self):
+        product = self.products[0]
+        product.name = '=HYPERLINK("http://example.com","Click")'
+        product.description = "-2+3"
+        product.save()
+        url = "/api/v1/admin/products/export/"
+
+        response = self.client.get(url)
+        rows = csv.DictReader(io.StringIO(response.getvalue().decode()))
+        row = next(row for row in rows if row["id"] == str(product.id))
+        self.assertEqual(row["name"], "'" + product.name)
+        self.assertEqual(row["description"], "'-2+3")
+        self.assertEqual(row["price"], str(product.price))
+
+        response = self.client.get(url + "?export_format=jsonl")
+        rows = map(json.loads, response.getvalue().splitlines())
+        row = next(row for row in rows if row["id"] == product.id)
+        self.assertEqual(row["name"], product.name)
+
+    def test_category_routes(self):
+        self.assertWithinBudget("api-root", lambda: self.client.get("/api/v1/admin/"))
+        self.assertFlatQueries(
+            "admin-category-list",
+            lambda: self.client.get("/api/v1/admin/category/"),
+            lambda: seed_catalog(3, category_names=("Caps", "Socks", "Ties")),
+        )
+        category = ProductCategory.objects.first()
+        self.assertWithinBudget(
+            "admin-category-detail",
+            lambda: self.client.get(f"/api/v1/admin/category/{category.id}/"),
+        )
+
+
+@skipUnless(connection.vendor == "postgresql", "trigram search needs PostgreSQL")
+class AdminSearchFilterTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.admin = User.objects.create_superuser(
+            email="admin@example.com",
+            name="Admin",
+            phone_number="9000000000",
+            password="Str0ng-passw0rd",
+        )
+        customer = User.objects.create_user(
+            email="shopper@example.com",
+            name="Shopper",
+            phone_number="9000000001",
+            password="Str0ng-passw0rd",
+        )
+        category = ProductCategory.objects.create(category="Outerwear")
+        cls.jacket, cls.belt, cls.card_holder = [
+            Product.objects.create(
+                name=name,
+                category=category,
+                description="Full grain.",
+                price="999.00",
+                product_image="products/seed.png",
+            )
+            for name in ("Leather Jacket", "Belt (brown)", "Card holder 100%")
+        ]
+        cls.orders = seed_activity(customer, [cls.jacket, cls.belt, cls.card_holder])
+
+    def setUp(self):
+        self.client = APIClient()
+        self.client.force_authenticate(self.admin)
+
+    def search(self, route, term):
+        response = self.client.get(f"/api/v1/admin/{route}/", {"search": term})
+        self.assertEqual(response.status_code, 200)
+        return {row["id"] for row in response.data["results"]}
+
+    def test_misspelled_terms(self):
+        self.assertEqual(self.search("products", "jakcet"), {self.jacket.id})
+        self.assertEqual(self.search("products", "lether"), {self.jacket.id})
+        self.assertEqual(self.search("products", "JACKET"), {self.jacket.id})
+
+    def test_metacharacters_are_literal(self):
+        self.assertEqual(self.search("products", ".*"), set())
+        self.assertEqual(self.search("products", "(brown"), {self.belt.id})
+        self.assertEqual(self.search("products", "100%"), {self.card_holder.id})
+
+    def test_search_by_id(self):
+        order = self.orders[1]
+        self.assertEqual(self.search("orders", str(order.id)), {order.id})
+        self.assertEqual(self.search("orders", "shoper"), {o.id for o in self.orders})
+        # Too long for a bigint; searched as text only.
+        self.assertEqual(self.search("orders", "9" * 19), set())
@@ -1,11 +1,20 @@
-from admin_orders.views import (AdminOrderDetailView, AdminOrderListView,
-                                ApproveReturnView, ReturnedCancelledOrdersView)
+from admin_orders.views import (AdminOrderDetailView, AdminOrderExportView,
+                                AdminOrderListView, ApproveReturnView,
+                                ReturnedCancelledOrdersView)
 from admin_products.views import (AdminProductCreateView,
                                   AdminProductDeleteView,
-                                  AdminProductDetailView, AdminProductListView,
-                                  AdminProductUpdateView)
+                                  AdminProductDetailView,
+                                  AdminProductExportView, AdminProductListView,
+                                  AdminProductUpdateView,
+                                  ProductDirectUploadReceiveView,
+                                  ProductDirectUploadView,
+                                  ProductFinalizeUploadView,
+                                  ProductImportView,
+                                  ProductMediaUploadChunkView,
+                                  ProductMediaUploadView,
+                                  ProductStockAdjustView)
 from admin_users.views import (AdminBanUserView, AdminUserDetailView,
-                               AdminUserListView)
+                               AdminUserExportView, AdminUserListView)
 from django.urls import path,include
 
 from .views import AdminDashboardAPIView
@@ -18,11 +27,25 @@ router.register(r"category", AdminCategoryViewSet, basename="admin-category")
 urlpatterns = [
     path("dashboard/", AdminDashboardAPIView.as_view(), name="admin-dashboard"),
     path("users/", AdminUserListView.as_view(), name="admin-user-list"),
+    path("users/export/", AdminUserExportView.as_view(), name="admin-user-export"),
     path("user/<int:pk>/", AdminUserDetailView.as_view(), name="admin-user-detail"),
     path("user/<int:pk>/ban/", AdminBanUserView.as_view(), name="admin-ban-user"),
     path("orders/", AdminOrderListView.as_view(), name="admin-order-list"),
+    path(
+        "orders/export/", AdminOrderExportView.as_view(), name="admin-order-export"
+    ),
     path("orders/<int:pk>/", AdminOrderDetailView.as_view(), name="admin-order-detail"),
     path("products/", AdminProductListView.as_view(), name="admin-product-list"),
+    path(
+        "products/export/",
+        AdminProductExportView.as_view(),
+        name="admin-product-export",
+    ),
+    path(
+        "products/stock/",
+        ProductStockAdjustView.as_view(),
+        name="admin-product-stock",
+    ),
     path("products/add/", AdminProductCreateView.as_view(), name="admin-product-add"),
     path(
         "products/<int:id>/",
@@ -39,6 +62,36 @@ urlpatterns = [
         AdminProductDeleteView.as_view(),
         name="admin-product-delete",
     ),
+    path(
+        "products/uploads/",
+        ProductMediaUploadView.as_view(),
+        name="admin-product-upload",
+    ),
+    path(
+        "products/uploads/<str:upload_id>/",
+        ProductMediaUploadChunkView.as_view(),
+        name="admin-product-upload-chunk",
+    ),
+    path(
+        "products/direct-uploads/",
+        ProductDirectUploadView.as_view(),
+        name="admin-product-direct-upload",
+    ),
+    path(
+        "products/direct-uploads/<str:token>/",
+        ProductDirectUploadReceiveView.as_view(),
+        name="admin-product-direct-upload-receive",
+    ),
+    path(
+        "products/<int:id>/finalize-upload/",
+        ProductFinalizeUploadView.as_view(),
+        name="admin-product-finalize-upload",
+    ),
+    path(
+        "products/import/",
+        ProductImportView.as_view(),
+        name="admin-product-import",
+    ),
     path(
         "returned-cancelled-orders/",
         ReturnedCancelledOrdersView.as_view(),
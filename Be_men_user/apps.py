@@ -4,3 +4,6 @@ from django.apps import AppConfig
 class BeMenConfig(AppConfig):
     default_auto_field = "django.db.models.BigAutoField"
     name = "Be_men_user"
+
+    def ready(self):
+        import Be_men_user.signals
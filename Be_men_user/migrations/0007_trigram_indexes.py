@@ -0,0 +1,37 @@
+# Generated by Django 5.2.7 on 2026-10-17 17:14
+
+import django.contrib.postgres.indexes
+from django.db import migrations
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("Be_men_user", "0006_user_is_banned"),
+        ("auth", "0012_alter_user_first_name_max_length"),
+        # Installs the pg_trgm extension these indexes need.
+        ("product", "0003_trigram_indexes"),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name="user",
+            index=django.contrib.postgres.indexes.GinIndex(
+                fields=["name"], name="user_name_trgm", opclasses=["gin_trgm_ops"]
+            ),
+        ),
+        migrations.AddIndex(
+            model_name="user",
+            index=django.contrib.postgres.indexes.GinIndex(
+                fields=["email"], name="user_email_trgm", opclasses=["gin_trgm_ops"]
+            ),
+        ),
+        migrations.AddIndex(
+            model_name="user",
+            index=django.contrib.postgres.indexes.GinIndex(
+                fields=["phone_number"],
+                name="user_phone_number_trgm",
+                opclasses=["gin_trgm_ops"],
+            ),
+        ),
+    ]
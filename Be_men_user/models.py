@@ -1,4 +1,5 @@
 from django.contrib.auth.models import AbstractUser, BaseUserManager
+from django.contrib.postgres.indexes import GinIndex
 from django.db import models
 
 
@@ -48,5 +49,19 @@ class User(AbstractUser):
 
     objects = UserManager()
 
+    class Meta(AbstractUser.Meta):
+        swappable = "AUTH_USER_MODEL"
+        indexes = [
+            GinIndex(fields=["name"], name="user_name_trgm", opclasses=["gin_trgm_ops"]),
+            GinIndex(
+                fields=["email"], name="user_email_trgm", opclasses=["gin_trgm_ops"]
+            ),
+            GinIndex(
+                fields=["phone_number"],
+                name="user_phone_number_trgm",
+                opclasses=["gin_trgm_ops"],
+            ),
+        ]
+
     def __str__(self):
         return self.email
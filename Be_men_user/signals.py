@@ -0,0 +1,27 @@
+from accesories_backend.storage import release_media, stored_name
+from django.db.models.signals import post_delete, post_init, post_save
+from django.dispatch import receiver
+
+from .models import User
+
+
+@receiver(post_init, sender=User)
+def remember_loaded_picture(sender, instance, **kwargs):
+    instance._loaded_picture = stored_name(instance.__dict__.get("profile_picture"))
+
+
+@receiver(post_save, sender=User)
+def release_replaced_picture(sender, instance, created=False, raw=False, **kwargs):
+    if raw or "profile_picture" in instance.get_deferred_fields():
+        return
+    # A new row replaced nothing.
+    loaded, picture = instance._loaded_picture, instance.profile_picture.name
+    if not created and loaded and loaded != picture:
+        release_media(loaded)
+    instance._loaded_picture = picture
+
+
+@receiver(post_delete, sender=User)
+def release_user_media(sender, instance, **kwargs):
+    if "profile_picture" not in instance.get_deferred_fields():
+        release_media(instance.profile_picture.name)
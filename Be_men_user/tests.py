@@ -1,3 +1,532 @@
+from datetime import timedelta
+from decimal import Decimal
+from unittest import mock, skipUnless
+
+from accesories_backend.cache import bump_generation
+from cart.models import Cart
+from django.contrib.auth.tokens import PasswordResetTokenGenerator
+from django.core.cache import cache
+from django.db import connection
 from django.test import TestCase
+from django.test.utils import CaptureQueriesContext
+from django.urls import URLPattern, URLResolver
+from django.utils import timezone
+from django.utils.encoding import force_bytes
+from django.utils.http import urlsafe_base64_encode
+from order.models import Notification, Order
+from product.models import Product, ProductCategory
+from product.recommendations import update_co_purchases
+from rest_framework.test import APIClient
+from wishlist.models import Wishlist
+
+from . import urls as user_urls
+from .models import User
+
+
+def route_names(patterns):
+    names = set()
+    for pattern in patterns:
+        if isinstance(pattern, URLResolver):
+            names |= route_names(pattern.url_patterns)
+        elif isinstance(pattern, URLPattern) and pattern.name:
+            names.add(pattern.name)
+    return names
+
+
+def seed_catalog(count, category_names=("Wallets", "Belts", "Watches")):
+    categories = [
+        ProductCategory.objects.get_or_create(category=name)[0]
+        for name in category_names
+    ]
+    start = Product.objects.count()
+    return [
+        Product.objects.create(
+            name=f"Product {start + i}",
+            category=categories[i % len(categories)],
+            description="Full grain leather. " * 10,
+            price=Decimal("499.00") + i,
+            old_price=Decimal("699.00"),
+            product_image="products/seed.png",
+            product_stock=50,
+        )
+        for i in range(count)
+    ]
+
+
+def checkout_payload(products):
+    return {
+        "orders": [
+            {"product": p.id, "quantity": 1, "shipping_address": "Somewhere"}
+            for p in products
+        ]
+    }
+
+
+def seed_activity(user, products, status="PROCESSING"):
+    orders = []
+    for product in products:
+        Cart.objects.get_or_create(user=user, product=product)
+        Wishlist.objects.get_or_create(user=user, product=product)
+        orders.append(
+            Order.objects.create(
+                user=user,
+                product=product,
+                quantity=1,
+                price=product.price,
+                total_amount=product.price,
+                order_status=status,
+                phone="9999999999",
+            )
+        )
+        Notification.objects.create(user=user, message=f"Order for {product.name}")
+    return orders
+
+
+class QueryBudgetTestCase(TestCase):
+    """
+    Every route gets a declared query budget (``budgets``). List routes are
+    measured twice, before and after ``grow()`` adds more rows, and must run
+    the same number of queries both times, so N+1 regressions fail here with
+    the offending SQL printed.
+    """
+
+    budgets = {}
+    urlconf = None
+
+    def setUp(self):
+        cache.clear()
+        self.client = APIClient()
+
+    def test_every_route_has_a_budget(self):
+        if self.urlconf is None:
+            return
+        missing = route_names(self.urlconf.urlpatterns) - set(self.budgets)
+        self.assertFalse(missing, f"Routes without a query budget: {missing}")
+
+    def capture(self, call):
+        with CaptureQueriesContext(connection) as context:
+            response = call()
+        return response, context.captured_queries
+
+    def format_queries(self, queries):
+        return "\n".join(f"  {i}. {q['sql']}" for i, q in enumerate(queries, 1))
+
+    def assertWithinBudget(self, name, call):
+        response, queries = self.capture(call)
+        self.assertLess(
+            response.status_code,
+            400,
+            f"{name} returned {response.status_code}: {getattr(response, 'data', '')}",
+        )
+        budget = self.budgets[name]
+        if len(queries) > budget:
+            self.fail(
+                f"{name} ran {len(queries)} queries, budget is {budget}:\n"
+                + self.format_queries(queries)
+            )
+        return response, queries
+
+    def assertFlatQueries(self, name, call, grow):
+        _, small = self.assertWithinBudget(name, call)
+        grow()
+        cache.clear()
+        _, large = self.assertWithinBudget(name, call)
+        if len(large) != len(small):
+            self.fail(
+                f"{name} grew from {len(small)} to {len(large)} queries with "
+                "more rows:\n" + self.format_queries(large)
+            )
+
+
+class UserRouteQueryBudgetTests(QueryBudgetTestCase):
+    urlconf = user_urls
+    budgets = {
+        "register": 3,
+        "login": 1,
+        "logout": 1,
+        "profile": 0,
+        "profile-update": 2,
+        "password-change": 1,
+        "forgot-password": 1,
+        "reset-password": 2,
+        "api-root": 0,
+        "products-list": 3,
+        "products-detail": 2,
+        "products-facets": 1,
+        "products-related": 1,
+        "products-suggest": 1,
+        "products-membership": 1,
+        "notifications-list": 3,
+        "notifications-detail": 2,
+        "wishlist": 6,
+        "wishlist-detail": 1,
+        "cart": 7,
+        "cart-detail": 1,
+        "cart-batch": 6,
+        "cart-summary": 1,
+        "user-orders": 2,
+        "order-detail": 2,
+        "delete-order": 4,
+        "checkout-cod": 7,
+        "checkout-razorpay": 1,
+        "razorpay-verify": 7,
+        "update-order-address": 2,
+        "return-request": 4,
+    }
+
+    def setUp(self):
+        super().setUp()
+        self.user = User.objects.create_user(
+            email="customer@example.com",
+            name="Customer",
+            phone_number="9000000001",
+            password="Str0ng-passw0rd",
+        )
+        self.products = seed_catalog(3)
+        self.orders = seed_activity(self.user, self.products[:2])
+
+    def grow(self):
+        seed_activity(self.user, seed_catalog(12))
+
+    def test_account_routes(self):
+        self.assertWithinBudget(
+            "register",
+            lambda: self.client.post(
+                "/api/v1/user/signup/",
+                {
+                    "name": "New",
+                    "email": "new@example.com",
+                    "phone_number": "9000000002",
+                    "password": "Str0ng-passw0rd",
+                    "password2": "Str0ng-passw0rd",
+                },
+            ),
+        )
+        self.assertWithinBudget(
+            "login",
+            lambda: self.client.post(
+                "/api/v1/user/login/",
+                {"email": "customer@example.com", "password": "Str0ng-passw0rd"},
+            ),
+        )
+        self.assertWithinBudget(
+            "logout", lambda: self.client.post("/api/v1/user/logout/")
+        )
+        self.assertWithinBudget(
+            "forgot-password",
+            lambda: self.client.post(
+                "/api/v1/user/forgot-password/", {"email": "customer@example.com"}
+            ),
+        )
+        uid = urlsafe_base64_encode(force_bytes(self.user.pk))
+        token = PasswordResetTokenGenerator().make_token(self.user)
+        self.assertWithinBudget(
+            "reset-password",
+            lambda: self.client.post(
+                f"/api/v1/user/reset-password/{uid}/{token}/",
+                {
+                    "password": "An0ther-passw0rd",
+                    "confirm_password": "An0ther-passw0rd",
+                },
+            ),
+        )
+
+        self.user.refresh_from_db()
+        self.client.force_authenticate(self.user)
+        self.assertWithinBudget(
+            "profile", lambda: self.client.get("/api/v1/user/profile/")
+        )
+        self.assertWithinBudget(
+            "profile-update",
+            lambda: self.client.patch(
+                "/api/v1/user/profile/update/", {"name": "Renamed"}, format="multipart"
+            ),
+        )
+        self.assertWithinBudget(
+            "password-change",
+            lambda: self.client.post(
+                "/api/v1/user/profile/passwordchange/",
+                {"old_password": "An0ther-passw0rd", "new_password": "Thi3d-passw0rd"},
+            ),
+        )
+
+    def test_catalog_routes(self):
+        self.assertWithinBudget("api-root", lambda: self.client.get("/api/v1/user/"))
+        self.assertFlatQueries(
+            "products-list",
+            lambda: self.client.get("/api/v1/user/products/?page_size=50"),
+            lambda: seed_catalog(12),
+        )
+        self.assertFlatQueries(
+            "products-list",
+            lambda: self.client.get(
+                "/api/v1/user/products/?pagination=cursor&ordering=price"
+            ),
+            lambda: seed_catalog(12),
+        )
+        self.assertWithinBudget(
+            "products-detail",
+            lambda: self.client.get(f"/api/v1/user/products/{self.products[0].id}/"),
+        )
+        self.assertFlatQueries(
+            "products-facets",
+            lambda: self.client.get("/api/v1/user/products/facets/?category=belts"),
+            lambda: seed_catalog(12),
+        )
+
+    def test_anonymous_catalog_revalidation_is_free(self):
+        url = "/api/v1/user/products/?category=wallets"
+        etag = self.client.get(url)["ETag"]
+        with CaptureQueriesContext(connection) as queries:
+            hit = self.client.get(url)
+            not_modified = self.client.get(url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual((hit["X-Cache"], hit["ETag"]), ("HIT", etag))
+        self.assertEqual(not_modified.status_code, 304)
+        self.assertEqual(len(queries), 0, self.format_queries(queries))
+
+        bump_generation(Product)
+        self.assertEqual(self.client.get(url, HTTP_IF_NONE_MATCH=etag).status_code, 200)
+
+    def test_popularity_ordering(self):
+        self.assertFlatQueries(
+            "products-list",
+            lambda: self.client.get("/api/v1/user/products/?ordering=-popularity"),
+            lambda: seed_catalog(12),
+        )
+        self.assertFlatQueries(
+            "products-list",
+            lambda: self.client.get(
+                "/api/v1/user/products/?pagination=cursor&ordering=-popularity"
+            ),
+            lambda: seed_catalog(12),
+        )
+
+    def test_membership_routes(self):
+        self.client.force_authenticate(self.user)
+        first, _, third = self.products
+        self.assertFlatQueries(
+            "products-list",
+            lambda: self.client.get("/api/v1/user/products/?page_size=50"),
+            lambda: seed_catalog(12),
+        )
+        self.assertWithinBudget(
+            "products-detail",
+            lambda: self.client.get(f"/api/v1/user/products/{first.id}/"),
+        )
+
+        membership = f"/api/v1/user/products/membership/?ids={third.id},{first.id},0"
+        response, _ = self.assertWithinBudget(
+            "products-membership", lambda: self.client.get(membership)
+        )
+        etag = response["ETag"]
+        response, queries = self.assertWithinBudget(
+            "products-membership",
+            lambda: self.client.get(membership, HTTP_IF_NONE_MATCH=etag),
+        )
+        self.assertEqual((response.status_code, len(queries)), (304, 0))
+
+    def test_suggest_route(self):
+        self.assertWithinBudget(
+            "products-suggest",
+            lambda: self.client.get("/api/v1/user/products/suggest/?q=prod"),
+        )
+        # Served from memory until the catalog changes.
+        self.assertWithinBudget(
+            "products-suggest",
+            lambda: self.client.get("/api/v1/user/products/suggest/?q=product 1"),
+        )
+
+        # A rebuild is one query however large the catalog is.
+        def rebuild_and_suggest():
+            cache.clear()
+            return self.client.get("/api/v1/user/products/suggest/?q=product 1")
+
+        self.assertFlatQueries(
+            "products-suggest", rebuild_and_suggest, lambda: seed_catalog(12)
+        )
+
+    def test_related_route(self):
+        def settle_and_count():
+            # Orders are counted once they are older than SETTLE_DELAY.
+            Order.objects.update(created_at=timezone.now() - timedelta(hours=1))
+            update_co_purchases()
+
+        settle_and_count()
+        url = f"/api/v1/user/products/{self.products[0].id}/related/"
+        self.assertWithinBudget("products-related", lambda: self.client.get(url))
+        self.assertFlatQueries(
+            "products-related",
+            lambda: self.client.get(f"{url}?limit=20"),
+            lambda: (seed_activity(self.user, seed_catalog(12)), settle_and_count()),
+        )
+
+    @skipUnless(connection.vendor == "postgresql", "full-text search needs PostgreSQL")
+    def test_catalog_search(self):
+        self.assertFlatQueries(
+            "products-list",
+            lambda: self.client.get("/api/v1/user/products/?search=leather"),
+            lambda: seed_catalog(12),
+        )
+
+    def test_notification_routes(self):
+        self.client.force_authenticate(self.user)
+        self.assertFlatQueries(
+            "notifications-list",
+            lambda: self.client.get("/api/v1/user/notifications/"),
+            self.grow,
+        )
+        notification = Notification.objects.filter(user=self.user).first()
+        self.assertWithinBudget(
+            "notifications-detail",
+            lambda: self.client.patch(
+                f"/api/v1/user/notifications/{notification.id}/", {"read": True}
+            ),
+        )
+
+    def test_wishlist_and_cart_routes(self):
+        self.client.force_authenticate(self.user)
+        product = self.products[2]
+        self.assertFlatQueries(
+            "wishlist", lambda: self.client.get("/api/v1/user/wishlist/"), self.grow
+        )
+        self.assertFlatQueries(
+            "cart", lambda: self.client.get("/api/v1/user/cart/"), self.grow
+        )
+        self.assertWithinBudget(
+            "wishlist",
+            lambda: self.client.post(
+                "/api/v1/user/wishlist/", {"product_id": product.id}
+            ),
+        )
+        self.assertWithinBudget(
+            "wishlist-detail",
+            lambda: self.client.delete(f"/api/v1/user/wishlist/{product.id}/"),
+        )
+        self.assertWithinBudget(
+            "cart",
+            lambda: self.client.post(
+                "/api/v1/user/cart/", {"product_id": product.id, "quantity": 2}
+            ),
+        )
+        self.assertWithinBudget(
+            "cart-detail",
+            lambda: self.client.delete(f"/api/v1/user/cart/{product.id}/"),
+        )
+
+    def test_cart_batch_route(self):
+        self.client.force_authenticate(self.user)
+        in_cart, new = self.products[0], self.products[2]
+        self.assertWithinBudget(
+            "cart-batch",
+            lambda: self.client.post(
+                "/api/v1/user/cart/batch/",
+                {
+                    "items": [
+                        {"product_id": in_cart.id, "quantity": 2},
+                        {"product_id": new.id, "quantity": 5, "mode": "set"},
+                        {"product_id": 999999, "quantity": 1},
+                    ]
+                },
+                format="json",
+            ),
+        )
+        self.assertWithinBudget(
+            "cart-batch",
+            lambda: self.client.post(
+                "/api/v1/user/cart/batch/",
+                {"items": [{"product_id": new.id, "quantity": 1, "mode": "set"}]},
+                format="json",
+            ),
+        )
+
+    def test_cart_summary_route(self):
+        self.client.force_authenticate(self.user)
+        url = "/api/v1/user/cart/summary/"
+        response, _ = self.assertWithinBudget(
+            "cart-summary", lambda: self.client.get(url)
+        )
+        etag = response["ETag"]
+        response, _ = self.assertWithinBudget(
+            "cart-summary", lambda: self.client.get(url, HTTP_IF_NONE_MATCH=etag)
+        )
+        self.assertEqual(response.status_code, 304)
+        self.assertFlatQueries("cart-summary", lambda: self.client.get(url), self.grow)
+
+    def test_order_routes(self):
+        self.client.force_authenticate(self.user)
+        order = self.orders[0]
+        self.assertFlatQueries(
+            "user-orders", lambda: self.client.get("/api/v1/user/my-orders/"), self.grow
+        )
+        self.assertWithinBudget(
+            "order-detail", lambda: self.client.get(f"/api/v1/user/orders/{order.id}/")
+        )
+        self.assertWithinBudget(
+            "update-order-address",
+            lambda: self.client.put(
+                f"/api/v1/user/orders/{order.id}/update-address/",
+                {"shipping_address": "221B Baker Street"},
+            ),
+        )
+        self.assertWithinBudget(
+            "delete-order",
+            lambda: self.client.delete(
+                f"/api/v1/user/my-orders/{order.id}/",
+                {"cancellation_reason": "Changed my mind"},
+            ),
+        )
+
+        delivered = self.orders[1]
+        delivered.order_status = "DELIVERED"
+        delivered.save()
+        self.assertWithinBudget(
+            "return-request",
+            lambda: self.client.post(
+                f"/api/v1/user/orders/{delivered.id}/return/",
+                {"return_reason": "Wrong size"},
+            ),
+        )
+
+    def test_checkout_routes(self):
+        self.client.force_authenticate(self.user)
+        more = seed_catalog(6)
+        for name, url in [
+            ("checkout-cod", "/api/v1/user/checkout/cod/"),
+            ("razorpay-verify", "/api/v1/user/checkout/razorpay/verify/"),
+        ]:
+            with mock.patch("order.views.razorpay_client") as client:
+                client.utility.verify_payment_signature.return_value = True
+                _, few = self.assertWithinBudget(
+                    name,
+                    lambda: self.client.post(
+                        url,
+                        {
+                            **checkout_payload(more[:2]),
+                            "orders_payload": checkout_payload(more[:2])["orders"],
+                        },
+                        format="json",
+                    ),
+                )
+                _, many = self.assertWithinBudget(
+                    name,
+                    lambda: self.client.post(
+                        url,
+                        {
+                            **checkout_payload(more),
+                            "orders_payload": checkout_payload(more)["orders"],
+                        },
+                        format="json",
+                    ),
+                )
+            self.assertEqual(len(few), len(many), self.format_queries(many))
 
-# Create your tests here.
+        with mock.patch("order.views.razorpay_client") as client:
+            client.order.create.return_value = {"id": "order_test"}
+            self.assertWithinBudget(
+                "checkout-razorpay",
+                lambda: self.client.post(
+                    "/api/v1/user/checkout/razorpay/",
+                    checkout_payload(more),
+                    format="json",
+                ),
+            )
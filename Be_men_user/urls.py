@@ -1,4 +1,4 @@
-from cart.views import CartAPIView
+from cart.views import CartAPIView, CartBatchAPIView, CartSummaryAPIView
 from django.urls import include, path
 from order.views import (CODCheckoutAPIView, NotificationViewSet,
                          RazorpayCheckoutAPIView, RazorpayVerifyAPIView,
@@ -45,6 +45,8 @@ urlpatterns = [
     ),
     # cart
     path("cart/", CartAPIView.as_view(), name="cart"),
+    path("cart/batch/", CartBatchAPIView.as_view(), name="cart-batch"),
+    path("cart/summary/", CartSummaryAPIView.as_view(), name="cart-summary"),
     path("cart/<int:product_id>/", CartAPIView.as_view(), name="cart-detail"),
     # order
     path("my-orders/", UserOrdersAPIView.as_view(), name="user-orders"),
@@ -1,3 +1,4 @@
+from accesories_backend.uploads import StreamingImageUploadMixin
 from django.contrib.auth import authenticate, get_user_model
 from django.contrib.auth.hashers import make_password
 from django.contrib.auth.models import User
@@ -16,7 +17,7 @@ from .serializers import UserProfileSerializer, UserSignupSerializer
 User = get_user_model()
 
 
-class SignupView(generics.CreateAPIView):
+class SignupView(StreamingImageUploadMixin, generics.CreateAPIView):
 
     serializer_class = UserSignupSerializer
 
@@ -87,7 +88,7 @@ class LogoutView(APIView):
         return response
 
 
-class ProfileUpdateView(generics.UpdateAPIView):
+class ProfileUpdateView(StreamingImageUploadMixin, generics.UpdateAPIView):
 
     serializer_class = UserProfileSerializer
     permission_classes = [IsAuthenticated]
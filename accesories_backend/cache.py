@@ -0,0 +1,33 @@
+import time
+
+from django.core.cache import cache
+
+GENERATION_KEY = "generation:{}"
+
+
+def generation_key(model, scope=None):
+    key = GENERATION_KEY.format(model._meta.label_lower)
+    return key if scope is None else f"{key}:{scope}"
+
+
+def get_generation(model, scope=None):
+    """
+    Current write generation of a model's table, or of the rows belonging
+    to ``scope`` (e.g. one user's cart rows) when given.
+
+    Cache entries derived from the table embed this number in their key, so
+    bumping it invalidates all of them at once without scanning keys. The
+    counter starts from the clock so an evicted counter never reuses an old
+    generation.
+    """
+    return cache.get_or_set(generation_key(model, scope), time.time_ns(), None)
+
+
+def bump_generation(model, scope=None):
+    key = generation_key(model, scope)
+    try:
+        return cache.incr(key)
+    except ValueError:
+        value = time.time_ns()
+        cache.set(key, value, None)
+        return value
@@ -0,0 +1,42 @@
+import hashlib
+
+from django.db.models import Count, Max
+from django.utils.cache import get_conditional_response
+from django.utils.http import http_date, quote_etag
+
+
+def make_etag(*parts):
+    return hashlib.md5("|".join(str(part) for part in parts).encode()).hexdigest()
+
+
+def queryset_validators(queryset, *extra, timestamp_field="updated_at"):
+    """
+    Cheap validators for a filtered list: one aggregate query for
+    ``MAX(timestamp_field)`` and the row count, hashed together with
+    ``extra`` (request path, related generations...) into an ETag.
+    """
+    stats = queryset.order_by().aggregate(
+        last_modified=Max(timestamp_field), total=Count("pk")
+    )
+    etag = make_etag(stats["last_modified"], stats["total"], *extra)
+    return etag, stats["last_modified"]
+
+
+def conditional_response(request, etag, last_modified, build_response):
+    """
+    Answer If-None-Match / If-Modified-Since with 304 before building the
+    response; otherwise call ``build_response`` and attach the validators.
+    """
+    timestamp = int(last_modified.timestamp()) if last_modified else None
+    not_modified = get_conditional_response(
+        request, etag=quote_etag(etag), last_modified=timestamp
+    )
+    if not_modified is not None:
+        return not_modified
+
+    response = build_response()
+    if response.status_code == 200:
+        response["ETag"] = quote_etag(etag)
+        if timestamp is not None:
+            response["Last-Modified"] = http_date(timestamp)
+    return response
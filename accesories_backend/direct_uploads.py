@@ -0,0 +1,157 @@
+"""
+Presigned direct-to-storage uploads.
+
+The API only hands out upload targets and later checks the stored object;
+the bytes go from the client straight to the storage backend. On S3 (any
+storage exposing ``bucket``/``bucket_name`` like django-storages'
+S3Storage, including S3-compatible stand-ins via AWS_S3_ENDPOINT_URL) the
+target is a presigned POST limited to the announced content type and the
+maximum size. Other backends get a signed URL to a local receiving
+endpoint, which stands in for the bucket in development and tests.
+
+Objects that are uploaded but never claimed stay under
+DIRECT_UPLOAD_PREFIX; expire them with a bucket lifecycle rule.
+"""
+
+import os
+import secrets
+
+from django.conf import settings
+from django.core import signing
+from django.core.files import File
+from django.core.files.storage import default_storage
+from django.urls import reverse
+from django.utils.text import get_valid_filename
+from rest_framework import exceptions
+
+from .uploads import HEADER_BYTES, NotAnImage, UploadTooLarge, looks_like_image
+
+DIRECT_UPLOAD_PREFIX = "products/uploads"
+IMAGE_CONTENT_TYPES = ("image/jpeg", "image/png", "image/gif", "image/webp")
+CLAIM_SALT = "accesories_backend.direct_uploads.claim"
+RECEIVE_SALT = "accesories_backend.direct_uploads.receive"
+# Tokens can be claimed for a day; the upload itself must start before the
+# much shorter DIRECT_UPLOAD_EXPIRY.
+CLAIM_MAX_AGE = 24 * 60 * 60
+
+
+class S3DirectUploads:
+    def __init__(self, storage):
+        self.storage = storage
+
+    def key(self, name):
+        return self.storage._normalize_name(name)
+
+    def target(self, request, name, content_type, max_size):
+        post = self.storage.bucket.meta.client.generate_presigned_post(
+            Bucket=self.storage.bucket_name,
+            Key=self.key(name),
+            Fields={"Content-Type": content_type},
+            Conditions=[
+                {"Content-Type": content_type},
+                ["content-length-range", 1, max_size],
+            ],
+            ExpiresIn=settings.DIRECT_UPLOAD_EXPIRY,
+        )
+        return {"method": "POST", "url": post["url"], "fields": post["fields"]}
+
+    def read_head(self, name):
+        # A ranged GET, so checking the signature doesn't download the object.
+        response = self.storage.bucket.Object(self.key(name)).get(
+            Range=f"bytes=0-{HEADER_BYTES - 1}"
+        )
+        return response["Body"].read()
+
+
+class LocalDirectUploads:
+    receive_url_name = "admin-product-direct-upload-receive"
+
+    def __init__(self, storage):
+        self.storage = storage
+
+    def target(self, request, name, content_type, max_size):
+        token = signing.dumps(
+            {"name": name, "type": content_type, "max": max_size}, salt=RECEIVE_SALT
+        )
+        url = request.build_absolute_uri(reverse(self.receive_url_name, args=[token]))
+        return {"method": "PUT", "url": url, "headers": {"Content-Type": content_type}}
+
+    def read_head(self, name):
+        with self.storage.open(name) as f:
+            return f.read(HEADER_BYTES)
+
+
+def direct_uploads(storage=default_storage):
+    if hasattr(storage, "bucket") and hasattr(storage, "bucket_name"):
+        return S3DirectUploads(storage)
+    return LocalDirectUploads(storage)
+
+
+def issue_upload(request, filename, content_type, size):
+    """Reserve a storage name and return the target to upload it to."""
+    if content_type not in IMAGE_CONTENT_TYPES:
+        raise NotAnImage()
+    if size <= 0:
+        raise exceptions.ValidationError({"size": "Must be a positive integer."})
+    if size > settings.DIRECT_UPLOAD_MAX_SIZE:
+        raise UploadTooLarge()
+
+    filename = get_valid_filename(os.path.basename(filename or "")) or "upload"
+    name = f"{DIRECT_UPLOAD_PREFIX}/{secrets.token_urlsafe(12)}/{filename}"
+    token = signing.dumps({"name": name, "user": request.user.pk}, salt=CLAIM_SALT)
+    return {
+        "token": token,
+        "name": name,
+        "expires_in": settings.DIRECT_UPLOAD_EXPIRY,
+        "upload": direct_uploads().target(
+            request, name, content_type, settings.DIRECT_UPLOAD_MAX_SIZE
+        ),
+    }
+
+
+def claim_upload(token, user, storage=default_storage):
+    """
+    Check the object uploaded for ``token`` and return its storage name.
+    Objects that are too large or not images are deleted.
+    """
+    try:
+        data = signing.loads(token or "", salt=CLAIM_SALT, max_age=CLAIM_MAX_AGE)
+    except signing.BadSignature:
+        data = None
+    if not data or data.get("user") != user.pk:
+        raise exceptions.ValidationError({"token": "Invalid or expired upload token."})
+
+    name = data["name"]
+    if not storage.exists(name):
+        raise exceptions.ValidationError({"token": "Nothing was uploaded yet."})
+    if storage.size(name) > settings.DIRECT_UPLOAD_MAX_SIZE:
+        storage.delete(name)
+        raise UploadTooLarge()
+    if not looks_like_image(direct_uploads(storage).read_head(name)):
+        storage.delete(name)
+        raise NotAnImage()
+    return name
+
+
+def receive_local_upload(request, token, storage=default_storage):
+    """Store a PUT body for a LocalDirectUploads target; returns the name."""
+    try:
+        data = signing.loads(
+            token, salt=RECEIVE_SALT, max_age=settings.DIRECT_UPLOAD_EXPIRY
+        )
+    except signing.BadSignature:
+        raise exceptions.PermissionDenied("Invalid or expired upload URL.")
+    if request.content_type != data["type"]:
+        raise exceptions.UnsupportedMediaType(request.content_type)
+    try:
+        length = int(request.headers["Content-Length"])
+    except (KeyError, ValueError):
+        raise exceptions.ValidationError("Content-Length header is required.")
+    if length > data["max"]:
+        raise UploadTooLarge()
+    if storage.exists(data["name"]):
+        raise exceptions.ValidationError("This upload URL was already used.")
+    # The object must land under its reserved name, as it would on S3, so
+    # skip content addressing (accesories_backend/storage.py).
+    storage = getattr(storage, "backend", storage)
+    return storage.save(data["name"], File(request.stream, name=data["name"]))
@@ -0,0 +1,101 @@
+"""
+Streaming CSV / JSON Lines exports for the admin list views.
+
+StreamingExportMixin runs a list view's own get_queryset() and filter
+backends, then streams ``values_list(*export_fields)`` rows from
+``.iterator(chunk_size=...)``, a server-side cursor on PostgreSQL. Rows
+are encoded as they are fetched, so memory stays flat however many rows
+match, and the CSV header goes out before the query runs.
+"""
+
+import csv
+import datetime
+import decimal
+import json
+
+from django.http import StreamingHttpResponse
+from django.utils import timezone
+from rest_framework.exceptions import ValidationError
+
+EXPORT_FORMAT_PARAM = "export_format"
+EXPORT_CHUNK_SIZE = 2000
+
+# Leading characters that make spreadsheet apps read a cell as a formula.
+FORMULA_PREFIXES = ("=", "+", "-", "@", "\t", "\r")
+
+
+class _Echo:
+    """File-like object whose write() returns the line for csv.writer."""
+
+    def write(self, value):
+        return value
+
+
+def _plain(value):
+    if isinstance(value, datetime.datetime):
+        return timezone.localtime(value).isoformat() if value.tzinfo else value
+    if isinstance(value, (datetime.date, decimal.Decimal)):
+        return str(value)
+    return value
+
+
+def _csv_cell(value):
+    # Names, addresses and reasons are user input; quote anything that
+    # would run as a formula when the file is opened. Numbers and dates are
+    # left alone, so negative amounts stay numeric.
+    if isinstance(value, str) and value.startswith(FORMULA_PREFIXES):
+        return "'" + value
+    return _plain(value)
+
+
+def csv_lines(columns, rows):
+    writer = csv.writer(_Echo())
+    yield writer.writerow(columns)
+    for row in rows:
+        yield writer.writerow([_csv_cell(value) for value in row])
+
+
+def jsonl_lines(columns, rows):
+    for row in rows:
+        yield json.dumps(dict(zip(columns, map(_plain, row))), default=str) + "\n"
+
+
+EXPORT_FORMATS = {
+    "csv": (csv_lines, "text/csv"),
+    "jsonl": (jsonl_lines, "application/x-ndjson"),
+}
+
+
+class StreamingExportMixin:
+    """
+    Mix into a list view to serve its filtered rows as a download.
+
+    ``export_fields`` lists ``values_list()`` lookups; the column names are
+    the lookups with ``__`` replaced by ``.``. The format is picked with
+    ``?export_format=csv`` (default) or ``jsonl``.
+    """
+
+    export_fields = ()
+    export_filename = "export"
+    export_chunk_size = EXPORT_CHUNK_SIZE
+
+    def get(self, request, *args, **kwargs):
+        fmt = request.query_params.get(EXPORT_FORMAT_PARAM, "csv")
+        if fmt not in EXPORT_FORMATS:
+            raise ValidationError(
+                {EXPORT_FORMAT_PARAM: f"Must be one of {', '.join(EXPORT_FORMATS)}."}
+            )
+        encode, content_type = EXPORT_FORMATS[fmt]
+
+        queryset = self.filter_queryset(self.get_queryset())
+        rows = queryset.values_list(*self.export_fields).iterator(
+            chunk_size=self.export_chunk_size
+        )
+        columns = [field.replace("__", ".") for field in self.export_fields]
+        response = StreamingHttpResponse(
+            encode(columns, rows), content_type=content_type
+        )
+        response["Content-Disposition"] = (
+            f'attachment; filename="{self.export_filename}.{fmt}"'
+        )
+        return response
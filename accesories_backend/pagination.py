@@ -0,0 +1,73 @@
+import hashlib
+
+from django.core.cache import cache
+from django.core.paginator import Paginator
+from django.db import connections
+from django.utils.functional import cached_property
+
+from .cache import get_generation
+
+COUNT_CACHE_TIMEOUT = 300
+# Below this many rows the planner estimate is too rough to show and an
+# exact count is cheap anyway.
+ESTIMATE_THRESHOLD = 100_000
+
+
+def estimate_table_rows(model, using="default"):
+    """Planner row estimate from pg_class.reltuples, or None if unusable."""
+    connection = connections[using]
+    if connection.vendor != "postgresql":
+        return None
+    with connection.cursor() as cursor:
+        cursor.execute(
+            "SELECT reltuples::bigint FROM pg_class WHERE oid = %s::regclass",
+            [connection.ops.quote_name(model._meta.db_table)],
+        )
+        row = cursor.fetchone()
+    # reltuples is -1 until the table has been vacuumed or analyzed.
+    if not row or row[0] < 0:
+        return None
+    return row[0]
+
+
+def count_cache_key(queryset):
+    query = queryset.order_by().query
+    sql, params = query.sql_with_params()
+    digest = hashlib.md5(f"{sql}|{params!r}".encode()).hexdigest()
+    return f"count:{get_generation(queryset.model)}:{digest}"
+
+
+def get_total(queryset, allow_estimate=False):
+    """
+    Return ``(total, is_exact)`` for a paginated queryset.
+
+    Unfiltered querysets may use the planner estimate when allowed; other
+    counts are cached per normalized filter set until the model's write
+    generation changes (see order/signals.py and product/signals.py).
+    """
+    if allow_estimate and not queryset.query.where:
+        estimate = estimate_table_rows(queryset.model, queryset.db)
+        if estimate is not None and estimate >= ESTIMATE_THRESHOLD:
+            return estimate, False
+
+    key = count_cache_key(queryset)
+    total = cache.get(key)
+    if total is None:
+        total = queryset.count()
+        cache.set(key, total, COUNT_CACHE_TIMEOUT)
+    return total, True
+
+
+class CachedCountPaginator(Paginator):
+    allow_estimate = False
+
+    @cached_property
+    def count(self):
+        total, self.count_is_exact = get_total(
+            self.object_list, allow_estimate=self.allow_estimate
+        )
+        return total
+
+
+class EstimatedCountPaginator(CachedCountPaginator):
+    allow_estimate = True
@@ -0,0 +1,110 @@
+from rest_framework import serializers
+
+FIELDS_PARAM = "fields"
+OMIT_PARAM = "omit"
+EXPAND_PARAM = "expand"
+
+
+def _query_paths(request, param):
+    if request is None or param not in request.query_params:
+        return None
+    value = request.query_params.get(param, "")
+    return {path.strip() for path in value.split(",") if path.strip()}
+
+
+def select_fields(names, request, path=""):
+    """
+    Filter serializer field ``names`` at dotted ``path`` by ``?fields=`` and
+    ``?omit=``. Paths are relative to the response root, so
+    ``?fields=id,product.name`` on the cart keeps ``id`` and ``product`` at
+    the top level and only ``name`` inside ``product``.
+    """
+    prefix = f"{path}." if path else ""
+    include = _query_paths(request, FIELDS_PARAM)
+    if include and path not in include:
+        level = {
+            item[len(prefix) :].split(".")[0]
+            for item in include
+            if item.startswith(prefix)
+        }
+        if level:
+            names = [name for name in names if name in level]
+
+    omit = _query_paths(request, OMIT_PARAM) or set()
+    return [name for name in names if f"{prefix}{name}" not in omit]
+
+
+def is_expanded(request, path):
+    """
+    Nested relations are rendered in full unless ``?expand=`` is given and
+    does not list them; ``?expand=`` alone collapses them all to ids.
+    """
+    expand = _query_paths(request, EXPAND_PARAM)
+    return expand is None or path in expand
+
+
+def is_rendered(request, path):
+    parent, _, name = path.rpartition(".")
+    return bool(select_fields([name], request, parent)) and is_expanded(
+        request, path
+    )
+
+
+def defer_unselected(queryset, request, serializer_class, path="", keep=()):
+    """
+    Defer the columns of ``serializer_class``'s model that the response at
+    ``path`` (``"product"`` for a select_related product) will not render.
+    Relation columns are never deferred so select_related keeps working.
+    """
+    if request is None:
+        return queryset
+
+    meta = serializer_class.Meta
+    if path and not is_rendered(request, path):
+        selected = set()
+    else:
+        selected = set(select_fields(meta.fields, request, path))
+
+    prefix = f"{path.replace('.', '__')}__" if path else ""
+    deferred = [
+        f"{prefix}{field.name}"
+        for field in meta.model._meta.concrete_fields
+        if not field.primary_key
+        and not field.is_relation
+        and field.name not in selected
+        and field.name not in keep
+    ]
+    return queryset.defer(*deferred) if deferred else queryset
+
+
+class SparseFieldsetMixin:
+    """
+    Serializer mixin for ``?fields=``, ``?omit=`` and ``?expand=``.
+
+    Works at any nesting depth as long as the root serializer has the
+    request in its context. Relations listed in ``Meta.expandable_fields``
+    collapse to primary keys when not expanded.
+    """
+
+    def get_field_path(self):
+        names = []
+        node = self
+        while node.parent is not None:
+            if node.field_name:
+                names.append(node.field_name)
+            node = node.parent
+        return ".".join(reversed(names))
+
+    def get_fields(self):
+        fields = super().get_fields()
+        request = self.context.get("request")
+        if request is None:
+            return fields
+
+        path = self.get_field_path()
+        prefix = f"{path}." if path else ""
+        fields = {name: fields[name] for name in select_fields(fields, request, path)}
+        for name in getattr(self.Meta, "expandable_fields", ()):
+            if name in fields and not is_expanded(request, f"{prefix}{name}"):
+                fields[name] = serializers.PrimaryKeyRelatedField(read_only=True)
+        return fields
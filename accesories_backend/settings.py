@@ -3,6 +3,7 @@ Django settings for accesories_backend project.
 """
 
 import os
+import tempfile
 from datetime import timedelta
 from pathlib import Path
 from decouple import Config, RepositoryEnv, Csv
@@ -34,6 +35,7 @@ INSTALLED_APPS = [
     "django.contrib.sessions",
     "django.contrib.messages",
     "django.contrib.staticfiles",
+    "django.contrib.postgres",
     "rest_framework",
     "corsheaders",
     "Be_men_user",
@@ -90,9 +92,33 @@ DATABASES = {
         "PASSWORD": config("DB_PASSWORD"),
         "HOST": config("DB_HOST", default="localhost"),
         "PORT": config("DB_PORT", default="5432"),
+        # Word similarity cut-off for the admin's typo tolerant search
+        # (Be_men_admin/search.py). pg_trgm's default of 0.6 misses
+        # transposed letters: "jakcet" shares only 3 of its 7 trigrams with
+        # "jacket".
+        "OPTIONS": {"options": "-c pg_trgm.word_similarity_threshold=0.4"},
     }
 }
 
+# Cache
+# Catalog response caches, cached counts and the write generations that
+# invalidate them (accesories_backend/cache.py) only work across gunicorn
+# workers when every worker uses the same cache. Set REDIS_URL in production
+# (needs the ``redis`` package); without it each process gets its own
+# local-memory cache, which is only correct for a single process.
+REDIS_URL = config("REDIS_URL", default=None)
+if REDIS_URL:
+    CACHES = {
+        "default": {
+            "BACKEND": "django.core.cache.backends.redis.RedisCache",
+            "LOCATION": REDIS_URL,
+        }
+    }
+else:
+    CACHES = {
+        "default": {"BACKEND": "django.core.cache.backends.locmem.LocMemCache"}
+    }
+
 # Password validation
 AUTH_PASSWORD_VALIDATORS = [
     {
@@ -187,14 +213,28 @@ AWS_ACCESS_KEY_ID = config("AWS_ACCESS_KEY_ID", default=None)
 AWS_SECRET_ACCESS_KEY = config("AWS_SECRET_ACCESS_KEY", default=None)
 AWS_STORAGE_BUCKET_NAME = config("AWS_STORAGE_BUCKET_NAME", default=None)
 AWS_S3_REGION_NAME = config("AWS_S3_REGION_NAME", default=None)
+# Point at an S3-compatible stand-in (e.g. MinIO) for local testing.
+AWS_S3_ENDPOINT_URL = config("AWS_S3_ENDPOINT_URL", default=None)
 DEFAULT_FILE_STORAGE = config(
     "DEFAULT_FILE_STORAGE", default="django.core.files.storage.FileSystemStorage"
 )
+STATICFILES_STORAGE = "django.contrib.staticfiles.storage.StaticFilesStorage"
 
 # Optional: serve static from S3 in AWS
 if os.environ.get("DJANGO_ENV") == "aws":
     STATICFILES_STORAGE = "storages.backends.s3boto3.S3Boto3Storage"
 
+# Django 5.1+ only reads STORAGES, not the two settings above. Media is
+# stored under content hashes on top of DEFAULT_FILE_STORAGE
+# (accesories_backend/storage.py).
+STORAGES = {
+    "default": {
+        "BACKEND": "accesories_backend.storage.ContentAddressedStorage",
+        "OPTIONS": {"backend": DEFAULT_FILE_STORAGE},
+    },
+    "staticfiles": {"BACKEND": STATICFILES_STORAGE},
+}
+
 
 # --------------------------------------------------------------------
 # COOKIE & SESSION SETTINGS (important for frontend <-> backend auth)
@@ -205,5 +245,35 @@ CSRF_COOKIE_SECURE = True
 SESSION_COOKIE_SAMESITE = None
 CSRF_COOKIE_SAMESITE = None
 
-DATA_UPLOAD_MAX_MEMORY_SIZE = 10 * 1024 * 1024   # 10 MB
-FILE_UPLOAD_MAX_MEMORY_SIZE = 10 * 1024 * 1024   # 10 MB
+# --------------------------------------------------------------------
+# UPLOADS
+# --------------------------------------------------------------------
+# Uploaded files are always spooled to disk; only the non-file form fields
+# are held in memory. Image endpoints also validate size and file type
+# while streaming (accesories_backend/uploads.py).
+DATA_UPLOAD_MAX_MEMORY_SIZE = 2 * 1024 * 1024   # 2 MB
+FILE_UPLOAD_HANDLERS = ["django.core.files.uploadhandler.TemporaryFileUploadHandler"]
+FILE_UPLOAD_TEMP_DIR = config("FILE_UPLOAD_TEMP_DIR", default=None)
+IMAGE_UPLOAD_MAX_SIZE = 10 * 1024 * 1024   # 10 MB
+
+# Resumable chunked uploads for large product media
+CHUNKED_UPLOAD_DIR = config(
+    "CHUNKED_UPLOAD_DIR",
+    default=os.path.join(tempfile.gettempdir(), "be_men_chunked_uploads"),
+)
+CHUNKED_UPLOAD_MAX_SIZE = 50 * 1024 * 1024   # 50 MB
+CHUNKED_UPLOAD_EXPIRY = 24 * 60 * 60   # seconds
+
+# Presigned direct-to-storage uploads for product media
+DIRECT_UPLOAD_MAX_SIZE = 50 * 1024 * 1024   # 50 MB
+DIRECT_UPLOAD_EXPIRY = 15 * 60   # seconds
+
+# Bulk product imports (product/importer.py); image paths in files uploaded
+# to the admin import endpoint are relative to this server directory.
+PRODUCT_IMPORT_IMAGE_DIR = config("PRODUCT_IMPORT_IMAGE_DIR", default=None)
+
+# Cart storage (cart/store.py). CachedCartStore keeps carts in the cache and
+# writes them to the database every CART_FLUSH_INTERVAL seconds; it needs a
+# cache shared by all processes, such as Redis.
+CART_STORE = config("CART_STORE", default="cart.store.DatabaseCartStore")
+CART_FLUSH_INTERVAL = config("CART_FLUSH_INTERVAL", default=2.0, cast=float)
@@ -0,0 +1,261 @@
+"""
+Content-addressed media storage.
+
+ContentAddressedStorage wraps the configured backend and stores each file
+as ``<upload dir>/<aa>/<sha256><ext>``. Identical bytes map to one name, so
+a re-uploaded product shot is not written again, and a name's content never
+changes, so it can be cached forever. Because rows may share a file, files
+are deleted through ``release_media()``, which only removes names no row
+references any more.
+
+A save that reuses an existing name may race with a release of that name:
+the row being saved is not visible to the reference count until it
+commits. ``save()`` therefore claims the name for MEDIA_CLAIM_TIMEOUT
+under a short per-name cache lock, and releases skip claimed names. Files
+skipped that way are removed by the ``release_orphaned_media`` command.
+"""
+
+import hashlib
+import logging
+import posixpath
+import re
+import time
+import uuid
+from contextlib import contextmanager
+
+from django.apps import apps
+from django.core.cache import cache
+from django.core.files import File
+from django.db.models.fields.files import FieldFile
+from django.core.files.storage import Storage, default_storage
+from django.db import transaction
+from django.utils.module_loading import import_string
+from django.views.static import serve
+
+logger = logging.getLogger(__name__)
+
+IMMUTABLE_CACHE_CONTROL = "public, max-age=31536000, immutable"
+HASHED_NAME = re.compile(r"^[0-9a-f]{64}(\.[A-Za-z0-9]+)?$")
+
+MEDIA_LOCK_KEY = "media:lock:{}"
+MEDIA_CLAIM_KEY = "media:claim:{}"
+MEDIA_LOCK_TIMEOUT = 5
+# Longer than any transaction that saves a file takes to commit.
+MEDIA_CLAIM_TIMEOUT = 600
+
+# File fields whose values may point at the same stored file.
+MEDIA_REFERENCES = (
+    ("product.Product", "product_image"),
+    ("Be_men_user.User", "profile_picture"),
+)
+
+
+def is_hashed_name(name):
+    return bool(HASHED_NAME.match(posixpath.basename(name or "")))
+
+
+def stored_name(value):
+    """
+    The storage name of a file field value, or None for an upload not yet
+    saved, whose name is the client's file name rather than a stored file.
+    """
+    if isinstance(value, FieldFile):
+        return value.name if value._committed else None
+    if isinstance(value, File):
+        return None
+    return value
+
+
+class ContentAddressedStorage(Storage):
+    def __init__(
+        self, backend="django.core.files.storage.FileSystemStorage", options=None
+    ):
+        self.backend = import_string(backend)(**(options or {}))
+        # S3-style backends: mark hashed objects immutable as they are written.
+        if hasattr(self.backend, "get_object_parameters"):
+            object_parameters = self.backend.get_object_parameters
+
+            def get_object_parameters(name):
+                params = object_parameters(name)
+                if is_hashed_name(name):
+                    params.setdefault("CacheControl", IMMUTABLE_CACHE_CONTROL)
+                return params
+
+            self.backend.get_object_parameters = get_object_parameters
+
+    def __getattr__(self, name):
+        # Backend specifics such as ``bucket`` or ``base_url``.
+        if name == "backend":
+            raise AttributeError(name)
+        return getattr(self.backend, name)
+
+    def hashed_name(self, name, content):
+        digest = hashlib.sha256()
+        for chunk in content.chunks():
+            digest.update(chunk)
+        hexdigest = digest.hexdigest()
+        dirname, basename = posixpath.split(name.replace("\\", "/"))
+        extension = posixpath.splitext(basename)[1].lower()
+        return posixpath.join(dirname, hexdigest[:2], hexdigest + extension)
+
+    def save(self, name, content, max_length=None):
+        if name is None:
+            name = content.name
+        if not hasattr(content, "chunks"):
+            content = File(content, name)
+        name = self.hashed_name(self.generate_filename(name), content)
+        claim_media(name)
+        if self.backend.exists(name):
+            return name
+        return self.backend.save(name, content, max_length=max_length)
+
+    def generate_filename(self, filename):
+        return self.backend.generate_filename(filename)
+
+    def _open(self, name, mode="rb"):
+        return self.backend.open(name, mode)
+
+    def delete(self, name):
+        return self.backend.delete(name)
+
+    def exists(self, name):
+        return self.backend.exists(name)
+
+    def listdir(self, path):
+        return self.backend.listdir(path)
+
+    def size(self, name):
+        return self.backend.size(name)
+
+    def url(self, name):
+        return self.backend.url(name)
+
+    def path(self, name):
+        return self.backend.path(name)
+
+    def get_accessed_time(self, name):
+        return self.backend.get_accessed_time(name)
+
+    def get_created_time(self, name):
+        return self.backend.get_created_time(name)
+
+    def get_modified_time(self, name):
+        return self.backend.get_modified_time(name)
+
+
+class MediaBusy(Exception):
+    pass
+
+
+@contextmanager
+def media_lock(name):
+    """
+    Serialize claiming and deleting the stored file ``name`` across
+    processes. Raises MediaBusy if the lock is still held after
+    MEDIA_LOCK_TIMEOUT.
+    """
+    key = MEDIA_LOCK_KEY.format(name)
+    token = uuid.uuid4().hex
+    deadline = time.monotonic() + MEDIA_LOCK_TIMEOUT
+    while not cache.add(key, token, MEDIA_LOCK_TIMEOUT):
+        if time.monotonic() >= deadline:
+            raise MediaBusy(name)
+        time.sleep(0.005)
+    try:
+        yield
+    finally:
+        if cache.get(key) == token:
+            cache.delete(key)
+
+
+def claim_media(name):
+    """Keep ``name`` from being deleted while the row using it commits."""
+    with media_lock(name):
+        cache.set(MEDIA_CLAIM_KEY.format(name), True, MEDIA_CLAIM_TIMEOUT)
+
+
+def delete_unreferenced(name, storage=default_storage):
+    """
+    Delete the file ``name`` if no row references it and no save claimed it
+    recently; returns whether it was deleted.
+    """
+    with media_lock(name):
+        if cache.get(MEDIA_CLAIM_KEY.format(name)):
+            return False
+        if reference_count(name):
+            return False
+        storage.delete(name)
+    return True
+
+
+def reference_count(name):
+    """How many rows across MEDIA_REFERENCES point at the file ``name``."""
+    return sum(
+        apps.get_model(label)._default_manager.filter(**{field: name}).count()
+        for label, field in MEDIA_REFERENCES
+    )
+
+
+def protected_names():
+    """Field defaults (like ``default.png``) are shared and never deleted."""
+    names = set()
+    for label, field in MEDIA_REFERENCES:
+        default = apps.get_model(label)._meta.get_field(field).get_default()
+        if default:
+            names.add(default)
+    return names
+
+
+def orphaned_media(storage=default_storage):
+    """
+    Hashed files under the upload directories of MEDIA_REFERENCES that no
+    row references. Variant directories are not hash-prefix directories,
+    so they are not listed.
+    """
+    referenced = set()
+    for label, field in MEDIA_REFERENCES:
+        model = apps.get_model(label)
+        referenced.update(
+            model._default_manager.values_list(field, flat=True).distinct()
+        )
+    for label, field in MEDIA_REFERENCES:
+        upload_to = apps.get_model(label)._meta.get_field(field).upload_to
+        try:
+            directories, _ = storage.listdir(upload_to)
+        except FileNotFoundError:
+            continue
+        for directory in directories:
+            if not re.fullmatch(r"[0-9a-f]{2}", directory):
+                continue
+            path = posixpath.join(upload_to, directory)
+            for filename in storage.listdir(path)[1]:
+                name = posixpath.join(path, filename)
+                if is_hashed_name(name) and name not in referenced:
+                    yield name
+
+
+def release_media(*names, storage=default_storage):
+    """
+    Delete the files ``names`` once the current transaction commits, unless
+    some row still references them or a save claimed them meanwhile.
+    """
+    names = {name for name in names if name} - protected_names()
+    if not names:
+        return
+
+    def cleanup():
+        for name in names:
+            try:
+                delete_unreferenced(name, storage)
+            except MediaBusy:
+                logger.warning("Media %s is busy; left for the sweep", name)
+
+    transaction.on_commit(cleanup)
+
+
+def serve_media(request, path, document_root=None, show_indexes=False):
+    """django.views.static.serve with far-future caching for hashed files."""
+    response = serve(request, path, document_root, show_indexes)
+    if is_hashed_name(path):
+        response["Cache-Control"] = IMMUTABLE_CACHE_CONTROL
+    return response
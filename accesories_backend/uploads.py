@@ -0,0 +1,284 @@
+"""
+Disk-spooled, incrementally validated image uploads.
+
+StreamingImageUploadHandler writes multipart files straight to a temporary
+file and checks the size and the image signature chunk by chunk, so an
+oversized or non-image body is rejected after its first chunk instead of
+after the whole request has been buffered. ChunkedUpload assembles large
+media from sequential, resumable chunks on local disk.
+"""
+
+import fcntl
+import json
+import os
+import re
+import secrets
+import time
+
+from django.conf import settings
+from django.core.files import File
+from django.core.files.uploadhandler import TemporaryFileUploadHandler
+from rest_framework import exceptions, status
+
+# Enough bytes to recognize every signature below.
+HEADER_BYTES = 12
+READ_BLOCK_SIZE = 64 * 1024
+
+
+class UploadTooLarge(exceptions.APIException):
+    status_code = status.HTTP_413_REQUEST_ENTITY_TOO_LARGE
+    default_detail = "Upload is too large."
+    default_code = "upload_too_large"
+
+
+class NotAnImage(exceptions.APIException):
+    status_code = status.HTTP_415_UNSUPPORTED_MEDIA_TYPE
+    default_detail = "Upload is not a JPEG, PNG, GIF or WebP image."
+    default_code = "not_an_image"
+
+
+class UploadOffsetMismatch(exceptions.APIException):
+    status_code = status.HTTP_409_CONFLICT
+    default_detail = "Chunk does not start at the current upload offset."
+    default_code = "upload_offset_mismatch"
+
+
+def looks_like_image(header):
+    return header.startswith(
+        (b"\xff\xd8\xff", b"\x89PNG\r\n\x1a\n", b"GIF87a", b"GIF89a")
+    ) or (header[:4] == b"RIFF" and header[8:12] == b"WEBP")
+
+
+class StreamingImageUploadHandler(TemporaryFileUploadHandler):
+    """
+    Spool uploaded files to disk, rejecting them as soon as they exceed
+    ``max_size`` bytes or their first bytes are not an image signature.
+    """
+
+    def __init__(self, request=None, max_size=None):
+        super().__init__(request)
+        self.max_size = max_size or settings.IMAGE_UPLOAD_MAX_SIZE
+
+    def handle_raw_input(
+        self, input_data, META, content_length, boundary, encoding=None
+    ):
+        # Leave room for the multipart framing and the text fields.
+        if content_length > self.max_size + settings.DATA_UPLOAD_MAX_MEMORY_SIZE:
+            raise UploadTooLarge()
+
+    def new_file(self, *args, **kwargs):
+        super().new_file(*args, **kwargs)
+        self.received = 0
+        self.header = b""
+
+    def receive_data_chunk(self, raw_data, start):
+        self.received += len(raw_data)
+        if self.received > self.max_size:
+            self.reject(UploadTooLarge())
+        if len(self.header) < HEADER_BYTES:
+            self.header += raw_data[: HEADER_BYTES - len(self.header)]
+            if len(self.header) == HEADER_BYTES:
+                self.check_header()
+        return super().receive_data_chunk(raw_data, start)
+
+    def file_complete(self, file_size):
+        if len(self.header) < HEADER_BYTES:
+            self.check_header()
+        return super().file_complete(file_size)
+
+    def check_header(self):
+        if not looks_like_image(self.header):
+            self.reject(NotAnImage())
+
+    def reject(self, exc):
+        self.file.close()
+        raise exc
+
+
+class StreamingImageUploadMixin:
+    """Use StreamingImageUploadHandler for the files posted to a DRF view."""
+
+    upload_max_size = None
+
+    def initialize_request(self, request, *args, **kwargs):
+        request.upload_handlers = [
+            StreamingImageUploadHandler(request, self.upload_max_size)
+        ]
+        return super().initialize_request(request, *args, **kwargs)
+
+
+class ChunkedUploadFile(File):
+    # Lets ImageField validation and FileSystemStorage work from the file on
+    # disk instead of reading it into memory.
+    def temporary_file_path(self):
+        return self.file.name
+
+
+class ChunkedUpload:
+    """
+    A resumable upload built from sequential chunks.
+
+    ``<id>.part`` in CHUNKED_UPLOAD_DIR holds the bytes received so far and
+    its size is the offset a client resumes from; ``<id>.json`` holds who
+    started the upload, the file name and the announced total size.
+    Unfinished uploads are purged after CHUNKED_UPLOAD_EXPIRY seconds.
+    """
+
+    id_pattern = re.compile(r"^[A-Za-z0-9_-]{22}$")
+
+    def __init__(self, upload_id, meta):
+        self.id = upload_id
+        self.meta = meta
+        self._file = None
+
+    @staticmethod
+    def directory():
+        path = settings.CHUNKED_UPLOAD_DIR
+        os.makedirs(path, exist_ok=True)
+        return path
+
+    @classmethod
+    def path_for(cls, upload_id, suffix):
+        return os.path.join(cls.directory(), f"{upload_id}.{suffix}")
+
+    @classmethod
+    def create(cls, user, filename, size):
+        if size <= 0:
+            raise exceptions.ValidationError({"size": "Must be a positive integer."})
+        if size > settings.CHUNKED_UPLOAD_MAX_SIZE:
+            raise UploadTooLarge()
+        cls.purge_expired()
+
+        upload_id = secrets.token_urlsafe(16)
+        meta = {
+            "user_id": user.pk,
+            "filename": os.path.basename(filename) or "upload",
+            "size": size,
+        }
+        with open(cls.path_for(upload_id, "json"), "x") as f:
+            json.dump(meta, f)
+        open(cls.path_for(upload_id, "part"), "xb").close()
+        return cls(upload_id, meta)
+
+    @classmethod
+    def get(cls, upload_id, user):
+        """The upload ``upload_id`` started by ``user``, or None."""
+        if not cls.id_pattern.match(upload_id or ""):
+            return None
+        try:
+            with open(cls.path_for(upload_id, "json")) as f:
+                meta = json.load(f)
+        except (OSError, ValueError):
+            return None
+        if meta.get("user_id") != user.pk:
+            return None
+        return cls(upload_id, meta)
+
+    @classmethod
+    def purge_expired(cls):
+        """
+        Remove uploads untouched for CHUNKED_UPLOAD_EXPIRY seconds. The
+        ``.json`` is written once and the ``.part`` on every chunk, so an
+        upload expires by the newer of the two and both go together.
+        """
+        cutoff = time.time() - settings.CHUNKED_UPLOAD_EXPIRY
+        touched = {}
+        with os.scandir(cls.directory()) as entries:
+            for entry in entries:
+                upload_id = entry.name.split(".", 1)[0]
+                try:
+                    mtime = entry.stat().st_mtime
+                except FileNotFoundError:
+                    continue
+                touched[upload_id] = max(mtime, touched.get(upload_id, mtime))
+        for upload_id, mtime in touched.items():
+            if mtime < cutoff:
+                cls(upload_id, None).purge(cutoff)
+
+    @property
+    def part_path(self):
+        return self.path_for(self.id, "part")
+
+    @property
+    def size(self):
+        return self.meta["size"]
+
+    @property
+    def offset(self):
+        return os.path.getsize(self.part_path)
+
+    @property
+    def complete(self):
+        return self.offset == self.size
+
+    def describe(self):
+        offset = self.offset
+        return {
+            "upload_id": self.id,
+            "filename": self.meta["filename"],
+            "size": self.size,
+            "offset": offset,
+            "complete": offset == self.size,
+        }
+
+    def append(self, stream, offset, length):
+        """
+        Append ``length`` bytes read from ``stream`` at ``offset`` and return
+        the new offset. Chunks must arrive in order and the file must start
+        with an image signature.
+        """
+        with open(self.part_path, "ab") as part:
+            fcntl.flock(part, fcntl.LOCK_EX)
+            current = part.seek(0, os.SEEK_END)
+            if offset != current:
+                raise UploadOffsetMismatch()
+            if current + length > self.size:
+                raise UploadTooLarge()
+
+            # The signature is checked as soon as the first bytes are on disk,
+            # whichever chunk brings them.
+            checked = current >= HEADER_BYTES
+            remaining = length
+            while remaining:
+                block = stream.read(min(READ_BLOCK_SIZE, remaining))
+                if not block:
+                    break
+                part.write(block)
+                remaining -= len(block)
+                if not checked and part.tell() >= min(HEADER_BYTES, self.size):
+                    part.flush()
+                    with open(self.part_path, "rb") as head:
+                        if not looks_like_image(head.read(HEADER_BYTES)):
+                            part.truncate(0)
+                            raise NotAnImage()
+                    checked = True
+            return part.tell()
+
+    def open(self):
+        """The finished upload as a Django File, for assigning to a FileField."""
+        self._file = ChunkedUploadFile(
+            open(self.part_path, "rb"), name=self.meta["filename"]
+        )
+        return self._file
+
+    def delete(self):
+        if self._file is not None:
+            self._file.close()
+        for suffix in ("part", "json"):
+            try:
+                os.remove(self.path_for(self.id, suffix))
+            except FileNotFoundError:
+                pass
+
+    def purge(self, cutoff):
+        """Delete the upload unless a chunk arrived since ``cutoff``."""
+        try:
+            part = open(self.part_path, "rb")
+        except FileNotFoundError:
+            self.delete()
+            return
+        with part:
+            # Wait for a chunk being appended, then look again.
+            fcntl.flock(part, fcntl.LOCK_EX)
+            if os.fstat(part.fileno()).st_mtime < cutoff:
+                self.delete()
@@ -1,10 +1,11 @@
+from accesories_backend.serializers import SparseFieldsetMixin
 from Be_men_user.serializers import UserProfileSerializer
 from order.models import Order
 from product.serializer import ProductSerializer
 from rest_framework import serializers
 
 
-class AdminOrderSerializer(serializers.ModelSerializer):
+class AdminOrderSerializer(SparseFieldsetMixin, serializers.ModelSerializer):
     user = UserProfileSerializer(read_only=True)
     product = ProductSerializer(read_only=True)
 
@@ -28,9 +29,10 @@ class AdminOrderSerializer(serializers.ModelSerializer):
             "return_reason",
             "returned_at",
         ]
+        expandable_fields = ["user", "product"]
 
 
-class CancelledOrderSerializer(serializers.ModelSerializer):
+class CancelledOrderSerializer(SparseFieldsetMixin, serializers.ModelSerializer):
     user = UserProfileSerializer(read_only=True)
     product = ProductSerializer(read_only=True)
 
@@ -47,3 +49,4 @@ class CancelledOrderSerializer(serializers.ModelSerializer):
             "return_reason",
             "returned_at",
         ]
+        expandable_fields = ["user", "product"]
@@ -1,7 +1,11 @@
-from django.db.models import Q
+from accesories_backend.export import StreamingExportMixin
+from accesories_backend.pagination import EstimatedCountPaginator
+from accesories_backend.serializers import defer_unselected
+from Be_men_admin.search import AdminSearchFilter
 from django.utils import timezone
 from order.models import Order
-from rest_framework import generics, permissions, status
+from product.serializer import ProductSerializer
+from rest_framework import filters, generics, permissions, status
 from rest_framework.pagination import PageNumberPagination
 from rest_framework.response import Response
 from rest_framework.views import APIView
@@ -14,6 +18,12 @@ class OrderPagination(PageNumberPagination):
     page_query_param = "page"
     page_size_query_param = "page_size"
     max_page_size = 100
+    django_paginator_class = EstimatedCountPaginator
+
+    def get_paginated_response(self, data):
+        response = super().get_paginated_response(data)
+        response.data["count_exact"] = self.page.paginator.count_is_exact
+        return response
 
 
 class AdminOrderListView(generics.ListAPIView):
@@ -24,9 +34,12 @@ class AdminOrderListView(generics.ListAPIView):
     permission_classes = [permissions.IsAdminUser]
     serializer_class = AdminOrderSerializer
     pagination_class = OrderPagination
+    filter_backends = [AdminSearchFilter, filters.OrderingFilter]
+    search_fields = ["user__name", "user__email"]
+    search_by_id = True
 
     def get_queryset(self):
-        queryset = Order.objects.select_related("user", "product").all()
+        queryset = Order.objects.select_related("user", "product__category").all()
 
         status_filter = self.request.query_params.get("order_status")
         payment_filter = self.request.query_params.get("payment_status")
@@ -35,21 +48,38 @@ class AdminOrderListView(generics.ListAPIView):
         if payment_filter:
             queryset = queryset.filter(payment_status=payment_filter.upper())
 
-        search_query = self.request.query_params.get("search")
-        if search_query:
-            queryset = queryset.filter(
-                Q(id__icontains=search_query)
-                | Q(user__name__icontains=search_query)
-                | Q(user__email__icontains=search_query)
-            )
-
         sort_param = self.request.query_params.get("ordering")
         if sort_param in ["created_at", "-created_at"]:
             queryset = queryset.order_by(sort_param)
         else:
             queryset = queryset.order_by("-created_at")
 
-        return queryset
+        return defer_unselected(queryset, self.request, ProductSerializer, "product")
+
+
+class AdminOrderExportView(StreamingExportMixin, AdminOrderListView):
+    """The order list, with the same filters, as a CSV/JSONL download."""
+
+    export_filename = "orders"
+    export_fields = (
+        "id",
+        "user__name",
+        "user__email",
+        "product_id",
+        "product__name",
+        "quantity",
+        "price",
+        "total_amount",
+        "payment_method",
+        "payment_status",
+        "order_status",
+        "tracking_id",
+        "delivery_date",
+        "phone",
+        "shipping_address",
+        "created_at",
+        "updated_at",
+    )
 
 
 class AdminOrderDetailView(generics.RetrieveUpdateAPIView):
@@ -59,7 +89,7 @@ class AdminOrderDetailView(generics.RetrieveUpdateAPIView):
 
     permission_classes = [permissions.IsAdminUser]
     serializer_class = AdminOrderSerializer
-    queryset = Order.objects.all()
+    queryset = Order.objects.select_related("user", "product__category")
 
     def partial_update(self, request, *args, **kwargs):
         order = self.get_object()
@@ -68,7 +98,7 @@ class AdminOrderDetailView(generics.RetrieveUpdateAPIView):
         serializer.save()
 
         # Refresh the order instance to ensure latest data
-        order.refresh_from_db()
+        order.refresh_from_db(from_queryset=self.get_queryset())
 
         # --- If admin cancels order ---
         if order.order_status.upper() == "CANCELLED":
@@ -106,7 +136,7 @@ class ReturnedCancelledOrdersView(generics.ListAPIView):
     def get_queryset(self):
         valid_statuses = ["CANCELLED", "RETURN_PENDING", "RETURNED"]
         qs = (
-            Order.objects.select_related("user", "product")
+            Order.objects.select_related("user", "product__category")
             .filter(order_status__in=valid_statuses)
             .order_by("-updated_at")
         )
@@ -116,7 +146,7 @@ class ReturnedCancelledOrdersView(generics.ListAPIView):
         if order_type in valid_statuses:
             qs = qs.filter(order_status=order_type)
 
-        return qs
+        return defer_unselected(qs, self.request, ProductSerializer, "product")
 
 
 class ApproveReturnView(APIView):
@@ -124,7 +154,7 @@ class ApproveReturnView(APIView):
 
     def post(self, request, order_id):
         try:
-            order = Order.objects.get(id=order_id)
+            order = Order.objects.select_related("product").get(id=order_id)
         except Order.DoesNotExist:
             return Response(
                 {"detail": "Order not found."}, status=status.HTTP_404_NOT_FOUND
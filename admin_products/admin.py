@@ -1,3 +1,18 @@
 from django.contrib import admin
 
-# Register your models here.
+from .models import StockMovement
+
+
+@admin.register(StockMovement)
+class StockMovementAdmin(admin.ModelAdmin):
+    list_display = (
+        "product",
+        "previous_stock",
+        "new_stock",
+        "delta",
+        "user",
+        "reason",
+        "created_at",
+    )
+    list_select_related = ("product", "user")
+    readonly_fields = [field.name for field in StockMovement._meta.fields]
@@ -1,3 +1,30 @@
+from django.conf import settings
 from django.db import models
+from product.models import Product
 
-# Create your models here.
+
+class StockMovement(models.Model):
+    """Audit row for one stock change made through the admin stock API."""
+
+    # Kept when the product is deleted, so the history survives.
+    product = models.ForeignKey(
+        Product, on_delete=models.SET_NULL, null=True, related_name="stock_movements"
+    )
+    user = models.ForeignKey(
+        settings.AUTH_USER_MODEL, on_delete=models.SET_NULL, null=True, blank=True
+    )
+    previous_stock = models.PositiveIntegerField()
+    new_stock = models.PositiveIntegerField()
+    delta = models.IntegerField()
+    reason = models.CharField(max_length=255, blank=True)
+    created_at = models.DateTimeField(auto_now_add=True)
+
+    class Meta:
+        indexes = [
+            models.Index(
+                fields=["product", "-created_at"], name="stockmovement_product"
+            ),
+        ]
+
+    def __str__(self):
+        return f"{self.product_id}: {self.previous_stock} -> {self.new_stock}"
@@ -1,3 +1,4 @@
+from accesories_backend.uploads import ChunkedUpload
 from product.models import Product, ProductCategory
 from rest_framework import serializers
 
@@ -13,20 +14,77 @@ class AdminProductSerializer(serializers.ModelSerializer):
     category_id = serializers.PrimaryKeyRelatedField(
         queryset=ProductCategory.objects.all(), source="category", write_only=True
     )
+    product_image = serializers.ImageField(required=False)
+    # A finished resumable upload (ProductMediaUploadView) to use as the image.
+    upload_id = serializers.CharField(write_only=True, required=False)
 
     class Meta:
         model = Product
         fields = [
             "id",
             "name",
+            "sku",
             "category",
             "category_id",
             "description",
             "price",
             "old_price",
             "product_image",
+            "upload_id",
             "product_stock",
             "active",
             "created_at",
             "updated_at",
         ]
+
+    def validate(self, attrs):
+        upload_id = attrs.pop("upload_id", None)
+        if upload_id:
+            upload = ChunkedUpload.get(upload_id, self.context["request"].user)
+            if upload is None or not upload.complete:
+                raise serializers.ValidationError(
+                    {"upload_id": "No finished upload with this id."}
+                )
+            attrs["product_image"] = self.fields["product_image"].run_validation(
+                upload.open()
+            )
+            self.upload = upload
+        elif self.instance is None and "product_image" not in attrs:
+            raise serializers.ValidationError(
+                {"product_image": "No file was submitted."}
+            )
+        return attrs
+
+    def save(self, **kwargs):
+        instance = super().save(**kwargs)
+        if getattr(self, "upload", None) is not None:
+            self.upload.delete()
+        return instance
+
+
+class StockAdjustmentSerializer(serializers.Serializer):
+    product_id = serializers.IntegerField(min_value=1)
+    delta = serializers.IntegerField(
+        required=False, min_value=-2147483647, max_value=2147483647
+    )
+    absolute = serializers.IntegerField(
+        required=False, min_value=0, max_value=2147483647
+    )
+
+    def validate(self, attrs):
+        if ("delta" in attrs) == ("absolute" in attrs):
+            raise serializers.ValidationError("Give exactly one of delta or absolute.")
+        return attrs
+
+
+class StockAdjustmentBatchSerializer(serializers.Serializer):
+    adjustments = StockAdjustmentSerializer(
+        many=True, allow_empty=False, max_length=1000
+    )
+    reason = serializers.CharField(max_length=255, required=False, default="")
+
+    def validate_adjustments(self, adjustments):
+        ids = [item["product_id"] for item in adjustments]
+        if len(set(ids)) != len(ids):
+            raise serializers.ValidationError("Each product may appear only once.")
+        return adjustments
@@ -0,0 +1,131 @@
+"""
+Set-based stock adjustments.
+
+adjust_stock() locks the affected products, checks every requested change
+against the locked stock, and applies the valid ones with one UPDATE. On
+PostgreSQL that is ``UPDATE ... FROM (VALUES ...)``, so each row's delta or
+absolute value is computed in the database. StockMovement audit rows are
+written with one bulk insert in the same transaction.
+"""
+
+from accesories_backend.cache import bump_generation
+from django.db import connection, transaction
+from django.db.models import Case, F, Value, When
+from django.utils import timezone
+from product.models import Product
+
+from .models import StockMovement
+
+# PositiveIntegerField upper bound on PostgreSQL.
+MAX_STOCK = 2147483647
+
+UPDATE_FROM_VALUES = """
+UPDATE {table} AS p
+SET product_stock = CASE WHEN v.is_absolute THEN v.amount
+                         ELSE p.product_stock + v.amount END,
+    updated_at = %s
+FROM (VALUES {values}) AS v(id, amount, is_absolute)
+WHERE p.id = v.id
+RETURNING p.id, p.product_stock
+"""
+
+
+def _update_from_values(changes, now):
+    """Apply ``(product_id, amount, is_absolute)`` changes; returns id -> stock."""
+    sql = UPDATE_FROM_VALUES.format(
+        table=connection.ops.quote_name(Product._meta.db_table),
+        values=", ".join(["(%s::bigint, %s::integer, %s::boolean)"] * len(changes)),
+    )
+    params = [now] + [value for change in changes for value in change]
+    with connection.cursor() as cursor:
+        cursor.execute(sql, params)
+        return dict(cursor.fetchall())
+
+
+def _update_case_when(changes, now):
+    # Same single statement for backends without UPDATE ... FROM VALUES.
+    Product.objects.filter(pk__in=[pk for pk, _, _ in changes]).update(
+        product_stock=Case(
+            *[
+                When(
+                    pk=pk,
+                    then=Value(amount) if absolute else F("product_stock") + amount,
+                )
+                for pk, amount, absolute in changes
+            ]
+        ),
+        updated_at=now,
+    )
+    return None
+
+
+def adjust_stock(adjustments, user=None, reason=""):
+    """
+    Apply ``{"product_id", "delta" | "absolute"}`` adjustments and return one
+    result per adjustment, in order. Unknown products and changes that would
+    take the stock below zero are reported and skipped; the rest are applied.
+    """
+    ids = [item["product_id"] for item in adjustments]
+    results = []
+    changes = []
+    with transaction.atomic():
+        # Lock in id order so concurrent batches cannot deadlock.
+        stock = dict(
+            Product.objects.select_for_update()
+            .filter(pk__in=ids)
+            .order_by("pk")
+            .values_list("pk", "product_stock")
+        )
+        for item in adjustments:
+            pk = item["product_id"]
+            result = {"product_id": pk}
+            results.append(result)
+            if pk not in stock:
+                result.update(status="not_found", error="Product not found.")
+                continue
+            absolute = "absolute" in item
+            amount = item["absolute"] if absolute else item["delta"]
+            new_stock = amount if absolute else stock[pk] + amount
+            if not 0 <= new_stock <= MAX_STOCK:
+                result.update(
+                    status="rejected",
+                    error=f"Stock must stay between 0 and {MAX_STOCK}.",
+                    product_stock=stock[pk],
+                )
+                continue
+            result.update(
+                status="updated", previous_stock=stock[pk], product_stock=new_stock
+            )
+            changes.append((pk, amount, absolute))
+
+        if not changes:
+            return results
+
+        now = timezone.now()
+        if connection.vendor == "postgresql":
+            updated = _update_from_values(changes, now)
+        else:
+            updated = _update_case_when(changes, now)
+        if updated is not None:
+            # The rows are locked, so this only differs if a trigger changed them.
+            for result in results:
+                if result["status"] == "updated":
+                    result["product_stock"] = updated[result["product_id"]]
+
+        StockMovement.objects.bulk_create(
+            [
+                StockMovement(
+                    product_id=result["product_id"],
+                    user=user,
+                    previous_stock=result["previous_stock"],
+                    new_stock=result["product_stock"],
+                    delta=result["product_stock"] - result["previous_stock"],
+                    reason=reason,
+                )
+                for result in results
+                if result["status"] == "updated"
+            ]
+        )
+    # update() skips post_save, so invalidate cached catalog responses here.
+    bump_generation(Product)
+    return results
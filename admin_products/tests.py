@@ -1,3 +1,103 @@
+from unittest import mock, skipUnless
+
+from accesories_backend.cache import bump_generation
+from accesories_backend.pagination import (
+    ESTIMATE_THRESHOLD,
+    estimate_table_rows,
+    get_total,
+)
+from Be_men_user.models import User
+from Be_men_user.tests import seed_catalog
+from django.core.cache import cache
+from django.db import connection
 from django.test import TestCase
+from product.models import Product
+from rest_framework.test import APIClient
+
+ESTIMATE = "accesories_backend.pagination.estimate_table_rows"
+
+
+class PageTotalTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.products = seed_catalog(5)
+        cls.admin = User.objects.create_superuser(
+            email="admin@example.com",
+            name="Admin",
+            phone_number="9000000000",
+            password="Str0ng-passw0rd",
+        )
+
+    def setUp(self):
+        cache.clear()
+        self.client = APIClient()
+        self.client.force_authenticate(self.admin)
+
+    def test_count_is_cached_until_the_generation_changes(self):
+        queryset = Product.objects.filter(active=True)
+        self.assertEqual(get_total(queryset), (5, True))
+        with self.assertNumQueries(0):
+            self.assertEqual(get_total(Product.objects.filter(active=True)), (5, True))
+        # A different filter set is counted separately.
+        with self.assertNumQueries(1):
+            self.assertEqual(get_total(queryset.filter(price__lt=501)), (2, True))
+
+        # bulk_create sends no signals; the count stays cached until the
+        # Product generation is bumped.
+        Product.objects.bulk_create(
+            [Product(name="Extra", category=self.products[0].category, price=1)]
+        )
+        self.assertEqual(get_total(queryset), (5, True))
+        bump_generation(Product)
+        with self.assertNumQueries(1):
+            self.assertEqual(get_total(queryset), (6, True))
+
+    def test_count_is_shared_across_requests(self):
+        url = "/api/v1/admin/products/?category=%d" % self.products[0].category_id
+        with self.assertNumQueries(2):
+            first = self.client.get(url)
+        with self.assertNumQueries(1):
+            second = self.client.get(url)
+        self.assertEqual(first.data["count"], second.data["count"])
+
+    def test_estimate_only_for_large_unfiltered_lists(self):
+        large = ESTIMATE_THRESHOLD + 1
+        queryset = Product.objects.all()
+        with mock.patch(ESTIMATE, return_value=large) as estimate:
+            self.assertEqual(get_total(queryset, allow_estimate=True), (large, False))
+            self.assertEqual(get_total(queryset), (5, True))
+            self.assertEqual(
+                get_total(queryset.filter(active=True), allow_estimate=True), (5, True)
+            )
+        self.assertEqual(estimate.call_count, 1)
+        with mock.patch(ESTIMATE, return_value=ESTIMATE_THRESHOLD - 1):
+            self.assertEqual(get_total(queryset, allow_estimate=True), (5, True))
+        with mock.patch(ESTIMATE, return_value=None):
+            self.assertEqual(get_total(queryset, allow_estimate=True), (5, True))
+
+    def test_exact_flag_in_responses(self):
+        large = ESTIMATE_THRESHOLD + 1
+        with mock.patch(ESTIMATE, return_value=large):
+            response = self.client.get("/api/v1/admin/products/")
+            self.assertEqual(response.data["count"], large)
+            self.assertFalse(response.data["count_exact"])
+
+            response = self.client.get(
+                "/api/v1/admin/products/?category=%d" % self.products[0].category_id
+            )
+            self.assertTrue(response.data["count_exact"])
+
+            # The storefront list never shows an estimate.
+            response = self.client.get("/api/v1/user/products/")
+            self.assertEqual(response.data["total_items"], 5)
+            self.assertTrue(response.data["total_items_exact"])
+
+        response = self.client.get("/api/v1/admin/products/")
+        self.assertEqual(response.data["count"], 5)
+        self.assertTrue(response.data["count_exact"])
 
-# Create your tests here.
+    @skipUnless(connection.vendor == "postgresql", "reltuples is PostgreSQL specific")
+    def test_estimate_table_rows(self):
+        with connection.cursor() as cursor:
+            cursor.execute(f"ANALYZE {Product._meta.db_table}")
+        self.assertEqual(estimate_table_rows(Product), 5)
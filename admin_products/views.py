@@ -1,31 +1,52 @@
-from django.db.models import Q
-from product.models import Product,ProductCategory
-from rest_framework import generics, permissions, viewsets
+from accesories_backend.direct_uploads import (
+    claim_upload,
+    issue_upload,
+    receive_local_upload,
+)
+from accesories_backend.export import StreamingExportMixin
+from accesories_backend.pagination import EstimatedCountPaginator
+from accesories_backend.uploads import ChunkedUpload, StreamingImageUploadMixin
+from Be_men_admin.search import AdminSearchFilter
+from product.importer import ProductImporter, import_format, read_rows
+from product.models import Product, ProductCategory
+from django.conf import settings
+from django.shortcuts import get_object_or_404
+from rest_framework import filters, generics, permissions, status, viewsets
+from rest_framework.exceptions import NotFound
 from rest_framework.pagination import PageNumberPagination
+from rest_framework.response import Response
+from rest_framework.views import APIView
 from .permissions import IsAdminOrReadOnly
-from .serializer import AdminProductSerializer,ProductCategorySerializer
+from .serializer import (
+    AdminProductSerializer,
+    ProductCategorySerializer,
+    StockAdjustmentBatchSerializer,
+)
+from .stock import adjust_stock
 
 
 class ProductPagination(PageNumberPagination):
     page_size = 10
     page_size_query_param = "page_size"
     max_page_size = 50
+    django_paginator_class = EstimatedCountPaginator
+
+    def get_paginated_response(self, data):
+        response = super().get_paginated_response(data)
+        response.data["count_exact"] = self.page.paginator.count_is_exact
+        return response
 
 
 class AdminProductListView(generics.ListAPIView):
     permission_classes = [permissions.IsAdminUser]
     serializer_class = AdminProductSerializer
     pagination_class = ProductPagination
+    filter_backends = [AdminSearchFilter, filters.OrderingFilter]
+    search_fields = ["name", "description"]
 
     def get_queryset(self):
         queryset = Product.objects.select_related("category").all()
 
-        search_query = self.request.query_params.get("search")
-        if search_query:
-            queryset = queryset.filter(
-                Q(name__icontains=search_query) | Q(description__icontains=search_query)
-            )
-
         category_filter = self.request.query_params.get("category")
         if category_filter:
             queryset = queryset.filter(category__id=category_filter)
@@ -55,22 +76,42 @@ class AdminProductListView(generics.ListAPIView):
         return queryset
 
 
+class AdminProductExportView(StreamingExportMixin, AdminProductListView):
+    """The product list, with the same filters, as a CSV/JSONL download."""
+
+    export_filename = "products"
+    export_fields = (
+        "id",
+        "sku",
+        "name",
+        "category__category",
+        "description",
+        "price",
+        "old_price",
+        "product_stock",
+        "active",
+        "product_image",
+        "created_at",
+        "updated_at",
+    )
+
+
 class AdminProductDetailView(generics.RetrieveAPIView):
     permission_classes = [permissions.IsAdminUser]
     serializer_class = AdminProductSerializer
-    queryset = Product.objects.all()
+    queryset = Product.objects.select_related("category")
     lookup_field = "id"
 
 
-class AdminProductCreateView(generics.CreateAPIView):
+class AdminProductCreateView(StreamingImageUploadMixin, generics.CreateAPIView):
     permission_classes = [permissions.IsAdminUser]
     serializer_class = AdminProductSerializer
 
 
-class AdminProductUpdateView(generics.UpdateAPIView):
+class AdminProductUpdateView(StreamingImageUploadMixin, generics.UpdateAPIView):
     permission_classes = [permissions.IsAdminUser]
     serializer_class = AdminProductSerializer
-    queryset = Product.objects.all()
+    queryset = Product.objects.select_related("category")
     lookup_field = "id"
 
 
@@ -80,8 +121,166 @@ class AdminProductDeleteView(generics.DestroyAPIView):
     lookup_field = "id"
 
 
+class ProductMediaUploadView(APIView):
+    """
+    Start a resumable upload for product media too large for one request.
+    Send ``filename`` and total ``size``; the returned ``upload_id`` is used
+    for the chunks and then passed to the product create/update endpoints.
+    """
+
+    permission_classes = [permissions.IsAdminUser]
+
+    def post(self, request):
+        try:
+            size = int(request.data.get("size"))
+        except (TypeError, ValueError):
+            return Response(
+                {"error": "size must be an integer"}, status=status.HTTP_400_BAD_REQUEST
+            )
+        upload = ChunkedUpload.create(
+            request.user, str(request.data.get("filename", "")), size
+        )
+        return Response(upload.describe(), status=status.HTTP_201_CREATED)
+
+
+class ProductMediaUploadChunkView(APIView):
+    """
+    ``GET`` returns the offset to resume from. ``PATCH`` appends the raw
+    request body at the offset given in the ``Upload-Offset`` header.
+    """
+
+    permission_classes = [permissions.IsAdminUser]
+
+    def get_upload(self, request, upload_id):
+        upload = ChunkedUpload.get(upload_id, request.user)
+        if upload is None:
+            raise NotFound("Upload not found.")
+        return upload
+
+    def get(self, request, upload_id):
+        return Response(self.get_upload(request, upload_id).describe())
+
+    def patch(self, request, upload_id):
+        upload = self.get_upload(request, upload_id)
+        try:
+            offset = int(request.headers["Upload-Offset"])
+            length = int(request.headers["Content-Length"])
+        except (KeyError, ValueError):
+            return Response(
+                {"error": "Upload-Offset and Content-Length headers are required"},
+                status=status.HTTP_400_BAD_REQUEST,
+            )
+        if length > 0:
+            upload.append(request.stream, offset, length)
+        return Response(upload.describe())
+
+    def delete(self, request, upload_id):
+        self.get_upload(request, upload_id).delete()
+        return Response(status=status.HTTP_204_NO_CONTENT)
+
+
+class ProductDirectUploadView(APIView):
+    """
+    Issue a presigned target for uploading product media straight to
+    storage. Send ``filename``, ``content_type`` and ``size``; upload to the
+    returned ``upload`` target, then pass ``token`` to the finalize endpoint.
+    """
+
+    permission_classes = [permissions.IsAdminUser]
+
+    def post(self, request):
+        try:
+            size = int(request.data.get("size"))
+        except (TypeError, ValueError):
+            return Response(
+                {"error": "size must be an integer"}, status=status.HTTP_400_BAD_REQUEST
+            )
+        data = issue_upload(
+            request,
+            str(request.data.get("filename", "")),
+            str(request.data.get("content_type", "")),
+            size,
+        )
+        return Response(data, status=status.HTTP_201_CREATED)
+
+
+class ProductDirectUploadReceiveView(APIView):
+    """
+    Upload target used when the default storage is not S3. The signed URL
+    is the credential, like a presigned S3 URL.
+    """
+
+    authentication_classes = []
+    permission_classes = [permissions.AllowAny]
+
+    def put(self, request, token):
+        name = receive_local_upload(request, token)
+        return Response({"name": name}, status=status.HTTP_201_CREATED)
+
+
+class ProductFinalizeUploadView(APIView):
+    """Attach a directly uploaded object to a product as its image."""
+
+    permission_classes = [permissions.IsAdminUser]
+
+    def post(self, request, id):
+        product = get_object_or_404(Product.objects.select_related("category"), id=id)
+        product.product_image.name = claim_upload(
+            request.data.get("token"), request.user
+        )
+        # Saving the image queues the resized variants (product/images.py).
+        product.save(update_fields=["product_image", "updated_at"])
+        return Response(
+            AdminProductSerializer(product, context={"request": request}).data
+        )
+
+
+class ProductImportView(APIView):
+    """
+    Create or update products from an uploaded CSV or JSON Lines ``file``,
+    matching on ``sku``. Image paths are resolved in PRODUCT_IMPORT_IMAGE_DIR.
+    Rows that fail are listed with their line numbers; the rest are saved.
+    """
+
+    permission_classes = [permissions.IsAdminUser]
+
+    def post(self, request):
+        upload = request.FILES.get("file")
+        if upload is None:
+            return Response(
+                {"error": "file is required"}, status=status.HTTP_400_BAD_REQUEST
+            )
+        fmt = request.data.get("format") or import_format(upload.name)
+        if fmt not in ("csv", "jsonl"):
+            return Response(
+                {"error": "format must be csv or jsonl"},
+                status=status.HTTP_400_BAD_REQUEST,
+            )
+        importer = ProductImporter(settings.PRODUCT_IMPORT_IMAGE_DIR)
+        return Response(importer.run(read_rows(upload.file, fmt)))
+
+
+class ProductStockAdjustView(APIView):
+    """
+    Adjust the stock of many products at once. Each adjustment gives a
+    ``product_id`` and either a ``delta`` or an ``absolute`` stock level;
+    the response lists the outcome for each one.
+    """
+
+    permission_classes = [permissions.IsAdminUser]
+
+    def post(self, request):
+        serializer = StockAdjustmentBatchSerializer(data=request.data)
+        serializer.is_valid(raise_exception=True)
+        results = adjust_stock(
+            serializer.validated_data["adjustments"],
+            user=request.user,
+            reason=serializer.validated_data["reason"],
+        )
+        return Response({"results": results})
+
+
 class AdminCategoryViewSet(viewsets.ModelViewSet):
     queryset = ProductCategory.objects.all()
     serializer_class = ProductCategorySerializer
     permission_classes = [IsAdminOrReadOnly]
-
@@ -1,3 +1,4 @@
+from accesories_backend.export import StreamingExportMixin
 from Be_men_user.models import User
 from rest_framework import generics, status, filters
 from rest_framework.permissions import IsAdminUser
@@ -5,28 +6,34 @@ from rest_framework.response import Response
 from rest_framework.views import APIView
 from django_filters.rest_framework import DjangoFilterBackend
 from .serializer import AdminUserSerializer
-from django.db.models import Q  # ✅ imported Q properly
+from Be_men_admin.search import AdminSearchFilter
 
 
 class AdminUserListView(generics.ListAPIView):
     queryset = User.objects.filter(is_staff=False)
     serializer_class = AdminUserSerializer
     permission_classes = [IsAdminUser]
+    filter_backends = [AdminSearchFilter, filters.OrderingFilter]
+    search_fields = ["name", "email", "phone_number"]
 
     def get_queryset(self):
-        queryset = super().get_queryset()
-
-        # ✅ Case-insensitive search
-        search = self.request.query_params.get('search')
-        if search:
-            queryset = queryset.filter(
-                Q(name__icontains=search) |
-                Q(email__icontains=search) |
-                Q(phone_number__icontains=search)
-            )
-
-        return queryset.order_by('-id')
-
+        return super().get_queryset().order_by("-id")
+
+
+class AdminUserExportView(StreamingExportMixin, AdminUserListView):
+    """The customer list, with the same search, as a CSV/JSONL download."""
+
+    export_filename = "users"
+    export_fields = (
+        "id",
+        "name",
+        "email",
+        "phone_number",
+        "is_active",
+        "is_banned",
+        "date_joined",
+        "last_login",
+    )
 
 
 class AdminUserDetailView(generics.RetrieveAPIView):
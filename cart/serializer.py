@@ -1,11 +1,37 @@
+from accesories_backend.serializers import SparseFieldsetMixin
 from cart.models import Cart
+from product.fast_serializer import nested_product_row_serializer
 from product.serializer import ProductSerializer
 from rest_framework import serializers
 
 
-class CartSerializer(serializers.ModelSerializer):
+class CartSerializer(SparseFieldsetMixin, serializers.ModelSerializer):
     product = ProductSerializer(read_only=True)
 
     class Meta:
         model = Cart
         fields = ["id", "product", "quantity"]
+        expandable_fields = ["product"]
+
+
+class CartChangeSerializer(serializers.Serializer):
+    product_id = serializers.IntegerField(min_value=1)
+    quantity = serializers.IntegerField(min_value=1, max_value=2147483647)
+    mode = serializers.ChoiceField(choices=["add", "set"], default="add")
+
+
+class CartBatchSerializer(serializers.Serializer):
+    items = CartChangeSerializer(many=True, allow_empty=False, max_length=1000)
+
+    def validate_items(self, items):
+        ids = [item["product_id"] for item in items]
+        if len(set(ids)) != len(ids):
+            raise serializers.ValidationError("Each product may appear only once.")
+        return items
+
+
+def cart_row_serializer(request):
+    """Fast, read-only equivalent of CartSerializer for .values() rows."""
+    return nested_product_row_serializer(
+        request, CartSerializer, {"id": ("id", None), "quantity": ("quantity", None)}
+    )
@@ -0,0 +1,407 @@
+"""
+Pluggable cart storage.
+
+The CART_STORE setting names the class that holds carts:
+
+``DatabaseCartStore`` (the default) reads and writes the Cart table on every
+request.
+
+``CachedCartStore`` keeps each user's cart in the cache and writes it back
+behind the request. A cart is one cache entry, ``{product_id: [cart row id,
+quantity, added_at]}`` plus bookkeeping, changed under a short per-user
+cache lock. Each process remembers which carts it changed, and a daemon
+thread flushes them to the Cart table every CART_FLUSH_INTERVAL seconds, a
+batch of carts at a time. The flush writes the cart as it is in the cache,
+so a cart flushed twice or by two processes ends up the same. Reads never
+query the Cart table; product details still come from one Product query.
+
+Both stores bump the user's Cart generation (accesories_backend.cache)
+whenever the user's Cart rows change, so responses derived from them can
+embed it in their ETags.
+
+Checkout calls ``discard()`` inside its transaction. The cached store first
+flushes that user's pending changes, so the Cart table matches the cart the
+customer checked out, and drops the items from the cache once the
+transaction commits.
+
+The cached store needs a cache shared by every process, such as Redis; with
+the default per-process local-memory cache keep DatabaseCartStore.
+"""
+
+import atexit
+import logging
+import threading
+import time
+import uuid
+from collections import Counter, defaultdict
+from contextlib import contextmanager
+
+from accesories_backend.cache import bump_generation
+from Be_men_user.models import User
+from django.conf import settings
+from django.core.cache import cache
+from django.db import connections, transaction
+from django.db.models import Q
+from django.utils import timezone
+from django.utils.module_loading import import_string
+from product.models import Product
+from product.popularity import record_events
+from rest_framework.exceptions import APIException
+
+from .models import Cart
+from .upsert import MAX_QUANTITY, apply_cart_changes, check_changes, fill_results
+
+logger = logging.getLogger(__name__)
+
+CART_KEY = "cart:{}"
+LOCK_KEY = "cart:lock:{}"
+LOCK_TIMEOUT = 5
+FLUSH_BATCH_SIZE = 500
+PRODUCT = "product__"
+
+
+def get_cart_store():
+    return import_string(settings.CART_STORE)()
+
+
+class DatabaseCartStore:
+    """Carts in the Cart table, read and written synchronously."""
+
+    def rows(self, user, lookups, product_ids=None):
+        """
+        ``values(*lookups)`` dicts of the cart's rows, newest first. Lookups
+        are relative to Cart ("quantity", "product__price", ...).
+        """
+        items = Cart.objects.filter(user=user)
+        if product_ids is not None:
+            items = items.filter(product_id__in=product_ids)
+        return list(items.order_by("-added_at", "pk").values(*lookups))
+
+    def apply(self, user, items):
+        results = apply_cart_changes(user, items)
+        bump_generation(Cart, user.pk)
+        return results
+
+    def remove(self, user, product_ids=None):
+        """Remove ``product_ids``, or everything; returns how many were removed."""
+        items = Cart.objects.filter(user=user)
+        if product_ids is not None:
+            items = items.filter(product_id__in=product_ids)
+        deleted, _ = items.delete()
+        if deleted:
+            bump_generation(Cart, user.pk)
+        return deleted
+
+    def discard(self, user, product_ids):
+        """Drop checked-out products; called inside the checkout transaction."""
+        self.remove(user, product_ids)
+
+
+class CartBusy(APIException):
+    status_code = 503
+    default_detail = "The cart is being updated, please try again."
+    default_code = "cart_busy"
+
+
+@contextmanager
+def user_lock(user_pk):
+    """
+    Serialize changes to one cached cart across processes. Raises CartBusy
+    if the lock is still held after LOCK_TIMEOUT; the holder's entry expires
+    by then, so a crashed holder only blocks the cart that long.
+    """
+    key = LOCK_KEY.format(user_pk)
+    token = uuid.uuid4().hex
+    deadline = time.monotonic() + LOCK_TIMEOUT
+    while not cache.add(key, token, LOCK_TIMEOUT):
+        if time.monotonic() >= deadline:
+            raise CartBusy()
+        time.sleep(0.005)
+    try:
+        yield
+    finally:
+        # Only release our own lock; after LOCK_TIMEOUT it may belong to
+        # another holder.
+        if cache.get(key) == token:
+            cache.delete(key)
+
+
+def load_state(user_pk):
+    """The cached cart of ``user_pk``, read from the Cart table on a miss."""
+    key = CART_KEY.format(user_pk)
+    state = cache.get(key)
+    if state is None:
+        rows = Cart.objects.filter(user_id=user_pk).values_list(
+            "product_id", "id", "quantity", "added_at"
+        )
+        state = {
+            "items": {pk: [row_id, quantity, at] for pk, row_id, quantity, at in rows},
+            "added": [],
+            "version": 0,
+            "dirty": False,
+        }
+        # A cart written by another request in the meantime wins.
+        if not cache.add(key, state, None):
+            state = cache.get(key, state)
+    elif state["dirty"]:
+        # The process that changed it may have exited before flushing.
+        mark_dirty(user_pk)
+    return state
+
+
+def save_state(user_pk, state):
+    state["version"] += 1
+    state["dirty"] = True
+    cache.set(CART_KEY.format(user_pk), state, None)
+    mark_dirty(user_pk)
+
+
+class CachedCartStore:
+    """Carts in the cache, written to the Cart table by the flusher."""
+
+    def rows(self, user, lookups, product_ids=None):
+        items = load_state(user.pk)["items"]
+        if product_ids is not None:
+            items = {pk: items[pk] for pk in product_ids if pk in items}
+        if not items:
+            return []
+        product_lookups = [
+            lookup[len(PRODUCT) :] for lookup in lookups if lookup.startswith(PRODUCT)
+        ]
+        # Also drops products deleted since they were added.
+        products = {
+            product["id"]: product
+            for product in Product.objects.filter(pk__in=items).values(
+                "id", *product_lookups
+            )
+        }
+        rows = []
+        newest_first = sorted(items.items(), key=lambda item: item[1][2], reverse=True)
+        for pk, (row_id, quantity, added_at) in newest_first:
+            if pk not in products:
+                continue
+            row = {
+                "id": row_id,
+                "product_id": pk,
+                "quantity": quantity,
+                "added_at": added_at,
+            }
+            row.update((PRODUCT + name, value) for name, value in products[pk].items())
+            rows.append(row)
+        return rows
+
+    def apply(self, user, items):
+        results, changes = check_changes(items)
+        if not changes:
+            return results
+        now = timezone.now()
+        written = {}
+        with user_lock(user.pk):
+            state = load_state(user.pk)
+            entries = state["items"]
+            for pk, quantity, is_set in changes:
+                entry = entries.get(pk)
+                if entry is None:
+                    entries[pk] = [None, quantity, now]
+                    state["added"].append(pk)
+                    written[pk] = (quantity, True)
+                    continue
+                entry[1] = (
+                    quantity if is_set else min(entry[1] + quantity, MAX_QUANTITY)
+                )
+                written[pk] = (entry[1], False)
+            save_state(user.pk, state)
+        return fill_results(results, written)
+
+    def remove(self, user, product_ids=None):
+        with user_lock(user.pk):
+            state = load_state(user.pk)
+            entries = state["items"]
+            if product_ids is None:
+                removed = list(entries)
+            else:
+                removed = [pk for pk in product_ids if pk in entries]
+            for pk in removed:
+                del entries[pk]
+            if removed:
+                save_state(user.pk, state)
+        return len(removed)
+
+    def discard(self, user, product_ids):
+        flush([user.pk])
+        Cart.objects.filter(user=user, product_id__in=product_ids).delete()
+        bump_generation(Cart, user.pk)
+        transaction.on_commit(lambda: self.remove(user, product_ids))
+
+
+def claim_states(user_pks):
+    """
+    Read the cached carts of ``user_pks`` for a flush. Their pending
+    cart-add events are taken out of the cache under the lock, so a
+    concurrent flush of the same cart cannot count them again.
+    """
+    states = {}
+    for user_pk in user_pks:
+        key = CART_KEY.format(user_pk)
+        with user_lock(user_pk):
+            state = cache.get(key)
+            if state is None:
+                continue
+            if state["added"]:
+                cache.set(key, {**state, "added": []}, None)
+        states[user_pk] = state
+    return states
+
+
+def unclaim_events(states):
+    """Put back the cart-add events of a flush that failed."""
+    for user_pk, flushed in states.items():
+        if not flushed["added"]:
+            continue
+        key = CART_KEY.format(user_pk)
+        with user_lock(user_pk):
+            state = cache.get(key)
+            if state is not None:
+                state["added"] = flushed["added"] + state["added"]
+                cache.set(key, state, None)
+
+
+def flush(user_pks):
+    """Write the cached carts of ``user_pks`` to the Cart table; returns how many."""
+    states = claim_states(user_pks)
+    if not states:
+        return 0
+    try:
+        row_ids = write_states(states)
+    except Exception:
+        unclaim_events(states)
+        raise
+    mark_flushed(states, row_ids)
+    return len(states)
+
+
+def write_states(states):
+    """Upsert ``states`` into the Cart table; returns (user, product) -> row id."""
+    # Skip users and products deleted since the cart was cached.
+    users = set(User.objects.filter(pk__in=states).values_list("pk", flat=True))
+    products = set(
+        Product.objects.filter(
+            pk__in={pk for state in states.values() for pk in state["items"]}
+        ).values_list("pk", flat=True)
+    )
+
+    stale = Q()
+    rows = []
+    added = Counter()
+    for user_pk, state in states.items():
+        if user_pk not in users:
+            continue
+        # A quantity the Cart table would reject must not fail the whole
+        # batch; such lines are dropped and large ones capped.
+        kept = {
+            pk: (min(quantity, MAX_QUANTITY), at)
+            for pk, (_, quantity, at) in state["items"].items()
+            if pk in products and isinstance(quantity, int) and quantity > 0
+        }
+        stale |= Q(user_id=user_pk) & ~Q(product_id__in=kept)
+        rows.extend(
+            Cart(user_id=user_pk, product_id=pk, quantity=quantity, added_at=at)
+            for pk, (quantity, at) in kept.items()
+        )
+        added.update(pk for pk in state["added"] if pk in kept)
+
+    # Products added to several carts get one UPDATE per distinct count.
+    by_count = defaultdict(list)
+    for pk, count in added.items():
+        by_count[count].append(pk)
+    now = timezone.now()
+    with transaction.atomic():
+        if stale:
+            Cart.objects.filter(stale).delete()
+        rows = Cart.objects.bulk_create(
+            rows,
+            update_conflicts=True,
+            unique_fields=["user", "product"],
+            update_fields=["quantity"],
+            batch_size=1000,
+        )
+        for count, product_ids in by_count.items():
+            record_events(product_ids, "cart", now, count)
+
+    return {(row.user_id, row.product_id): row.pk for row in rows}
+
+
+def mark_flushed(states, row_ids):
+    """Give flushed items their row ids and clear carts unchanged since."""
+    for user_pk, flushed in states.items():
+        bump_generation(Cart, user_pk)
+        key = CART_KEY.format(user_pk)
+        with user_lock(user_pk):
+            state = cache.get(key)
+            if state is None:
+                continue
+            for pk, entry in state["items"].items():
+                if entry[0] is None:
+                    entry[0] = row_ids.get((user_pk, pk))
+            if state["version"] == flushed["version"]:
+                state["dirty"] = False
+            else:
+                # Changed while being written; the next flush picks it up.
+                mark_dirty(user_pk)
+            cache.set(key, state, None)
+
+
+_dirty = set()
+_dirty_lock = threading.Lock()
+_flusher = None
+
+
+def mark_dirty(user_pk):
+    with _dirty_lock:
+        _dirty.add(user_pk)
+    start_flusher()
+
+
+def flush_pending():
+    """Flush every cart this process changed; returns how many were written."""
+    with _dirty_lock:
+        pending = list(_dirty)
+        _dirty.clear()
+    written = 0
+    for start in range(0, len(pending), FLUSH_BATCH_SIZE):
+        try:
+            written += flush(pending[start : start + FLUSH_BATCH_SIZE])
+        except Exception:
+            # Keep the rest for the next run.
+            with _dirty_lock:
+                _dirty.update(pending[start:])
+            raise
+    return written
+
+
+def _flush_loop(interval):
+    while True:
+        time.sleep(interval)
+        try:
+            flush_pending()
+        except Exception:
+            logger.exception("Could not flush cached carts")
+        finally:
+            # The flusher thread opens its own connections; don't leak them.
+            connections.close_all()
+
+
+def start_flusher():
+    """Start this process's flusher thread; CART_FLUSH_INTERVAL = 0 disables it."""
+    global _flusher
+    interval = settings.CART_FLUSH_INTERVAL
+    if _flusher is not None or not interval:
+        return
+    with _dirty_lock:
+        if _flusher is not None:
+            return
+        _flusher = threading.Thread(
+            target=_flush_loop, args=(interval,), name="cart-flusher", daemon=True
+        )
+        _flusher.start()
+    atexit.register(flush_pending)
@@ -0,0 +1,87 @@
+"""
+Cart totals and availability, computed on the server.
+
+cart_summary() reads every line of a cart with its product's price, stock
+and status from the cart store, which is one query, and derives the
+subtotal, the savings against ``old_price`` and each line's status from
+those rows. Inactive products and lines above the product's stock are
+flagged here, before checkout rejects them.
+"""
+
+import decimal
+
+from .store import get_cart_store
+
+_CENTS = decimal.Decimal(".01")
+
+OK = "ok"
+INACTIVE = "inactive"
+OUT_OF_STOCK = "out_of_stock"
+INSUFFICIENT_STOCK = "insufficient_stock"
+
+SUMMARY_LOOKUPS = (
+    "product_id",
+    "product__name",
+    "quantity",
+    "product__price",
+    "product__old_price",
+    "product__product_stock",
+    "product__active",
+)
+
+
+def money(value):
+    return f"{value.quantize(_CENTS):f}"
+
+
+def line_status(active, stock, quantity):
+    if not active:
+        return INACTIVE
+    if stock == 0:
+        return OUT_OF_STOCK
+    if stock < quantity:
+        return INSUFFICIENT_STOCK
+    return OK
+
+
+def cart_summary(user):
+    """
+    Totals over the lines whose product is still active; inactive lines are
+    listed but not charged. ``can_checkout`` is true when every line is ok.
+    """
+    rows = get_cart_store().rows(user, SUMMARY_LOOKUPS)
+    lines = []
+    subtotal = savings = decimal.Decimal(0)
+    item_count = 0
+    for row in rows:
+        product_id, name, quantity, price, old_price, stock, active = (
+            row[lookup] for lookup in SUMMARY_LOOKUPS
+        )
+        status = line_status(active, stock, quantity)
+        line_total = price * quantity
+        if active:
+            subtotal += line_total
+            item_count += quantity
+            if old_price is not None and old_price > price:
+                savings += (old_price - price) * quantity
+        lines.append(
+            {
+                "product_id": product_id,
+                "name": name,
+                "quantity": quantity,
+                "price": money(price),
+                "line_total": money(line_total),
+                "product_stock": stock,
+                "status": status,
+            }
+        )
+    return {
+        "lines": lines,
+        "item_count": item_count,
+        "subtotal": money(subtotal),
+        "savings": money(savings),
+        "inactive": [
+            line["product_id"] for line in lines if line["status"] == INACTIVE
+        ],
+        "can_checkout": bool(lines) and all(line["status"] == OK for line in lines),
+    }
@@ -1,3 +1,266 @@
-from django.test import TestCase
+from unittest import mock
 
-# Create your tests here.
+from Be_men_user.models import User
+from Be_men_user.tests import checkout_payload, seed_activity, seed_catalog
+from django.core.cache import cache
+from django.db import connection
+from django.test import TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.utils import timezone
+from product.models import Product
+from product.popularity import event_score
+from rest_framework.test import APIClient
+
+from . import store as cart_store
+from .models import Cart
+from .upsert import MAX_QUANTITY
+
+
+def create_user(i):
+    return User.objects.create_user(
+        email=f"shopper{i}@example.com",
+        name=f"Shopper {i}",
+        phone_number=f"90000000{i:02d}",
+        password="Str0ng-passw0rd",
+    )
+
+
+class CartTestCase(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.client = APIClient()
+        self.user = create_user(1)
+        self.products = seed_catalog(3)
+        self.client.force_authenticate(self.user)
+
+
+class CartRouteTests(CartTestCase):
+    def setUp(self):
+        super().setUp()
+        seed_activity(self.user, self.products[:2])
+
+    def test_post_rejects_invalid_input(self):
+        product = self.products[2]
+        for field, data in [
+            ("product_id", {"product_id": "abc"}),
+            ("quantity", {"product_id": product.id, "quantity": "two"}),
+            ("quantity", {"product_id": product.id, "quantity": 0}),
+            ("quantity", {"product_id": product.id, "quantity": -3}),
+        ]:
+            with self.subTest(data=data):
+                response = self.client.post("/api/v1/user/cart/", data)
+                self.assertEqual(response.status_code, 400)
+                self.assertIn(field, response.data)
+        self.assertFalse(Cart.objects.filter(product=product).exists())
+
+    def test_batch(self):
+        in_cart, new = self.products[0], self.products[2]
+        Cart.objects.filter(user=self.user, product=in_cart).update(quantity=3)
+        popularity = Product.objects.get(pk=new.pk).popularity
+        response = self.client.post(
+            "/api/v1/user/cart/batch/",
+            {
+                "items": [
+                    {"product_id": in_cart.id, "quantity": 2},
+                    {"product_id": new.id, "quantity": 5, "mode": "set"},
+                    {"product_id": 999999, "quantity": 1},
+                ]
+            },
+            format="json",
+        )
+        self.assertEqual(
+            [(r["status"], r.get("quantity")) for r in response.data["results"]],
+            [("updated", 5), ("created", 5), ("not_found", None)],
+        )
+        self.assertEqual(
+            dict(
+                Cart.objects.filter(user=self.user).values_list("product", "quantity")
+            ),
+            {in_cart.id: 5, self.products[1].id: 1, new.id: 5},
+        )
+        self.assertGreater(Product.objects.get(pk=new.pk).popularity, popularity)
+
+        response = self.client.post(
+            "/api/v1/user/cart/batch/",
+            {"items": [{"product_id": new.id, "quantity": 1, "mode": "set"}]},
+            format="json",
+        )
+        self.assertEqual(response.data["results"][0]["quantity"], 1)
+
+    def test_summary(self):
+        url = "/api/v1/user/cart/summary/"
+        first, second = self.products[:2]
+        Cart.objects.filter(user=self.user, product=first).update(quantity=60)
+        Product.objects.filter(pk=second.pk).update(active=False)
+        response = self.client.get(url)
+        summary = response.data
+        self.assertEqual(
+            [(line["product_id"], line["status"]) for line in summary["lines"]],
+            [(second.id, "inactive"), (first.id, "insufficient_stock")],
+        )
+        self.assertEqual(summary["item_count"], 60)
+        self.assertEqual(summary["subtotal"], f"{first.price * 60:f}")
+        self.assertEqual(
+            summary["savings"], f"{(first.old_price - first.price) * 60:f}"
+        )
+        self.assertEqual(summary["inactive"], [second.id])
+        self.assertFalse(summary["can_checkout"])
+
+        etag = response["ETag"]
+        self.assertEqual(self.client.get(url, HTTP_IF_NONE_MATCH=etag).status_code, 304)
+        Product.objects.filter(pk=first.pk).update(product_stock=100)
+        self.assertEqual(self.client.get(url, HTTP_IF_NONE_MATCH=etag).status_code, 200)
+
+    def test_nested_product_images_are_relative(self):
+        image = "/media/products/seed.png"
+        responses = [
+            self.client.get("/api/v1/user/cart/").data[0],
+            self.client.post(
+                "/api/v1/user/cart/", {"product_id": self.products[2].id}
+            ).data,
+        ]
+        for data in responses:
+            self.assertEqual(data["product"]["product_image"], image)
+
+
+@override_settings(CART_STORE="cart.store.CachedCartStore", CART_FLUSH_INTERVAL=0)
+class CachedCartStoreTests(CartTestCase):
+    def test_post_rejects_invalid_quantities(self):
+        product = self.products[0]
+        for quantity in (-1, 0, "two", MAX_QUANTITY + 1):
+            with self.subTest(quantity=quantity):
+                response = self.client.post(
+                    "/api/v1/user/cart/",
+                    {"product_id": product.id, "quantity": quantity},
+                )
+                self.assertEqual(response.status_code, 400)
+                self.assertIn("quantity", response.data)
+        self.assertEqual(cart_store.load_state(self.user.pk)["items"], {})
+
+    def test_bad_cart_does_not_block_the_batch(self):
+        first, second, third = self.products
+        other = create_user(2)
+        self.client.post("/api/v1/user/cart/", {"product_id": first.id})
+        self.client.force_authenticate(other)
+        self.client.post("/api/v1/user/cart/", {"product_id": second.id, "quantity": 2})
+
+        # A cart cached with quantities the Cart table would reject.
+        state = cart_store.load_state(self.user.pk)
+        state["items"][second.id] = [None, -1, state["items"][first.id][2]]
+        state["items"][third.id] = [None, MAX_QUANTITY + 5, state["items"][first.id][2]]
+        cart_store.save_state(self.user.pk, state)
+
+        self.assertEqual(cart_store.flush_pending(), 2)
+        self.assertEqual(
+            set(Cart.objects.values_list("user", "product", "quantity")),
+            {
+                (self.user.pk, first.id, 1),
+                (self.user.pk, third.id, MAX_QUANTITY),
+                (other.pk, second.id, 2),
+            },
+        )
+        self.assertEqual(cart_store.flush_pending(), 0)
+
+    def test_writes_are_left_to_the_flusher(self):
+        seed_activity(self.user, self.products[:2])
+        kept, bought, new = self.products
+        popularity = Product.objects.get(pk=new.pk).popularity
+
+        def cart_queries(call):
+            with CaptureQueriesContext(connection) as queries:
+                response = call()
+            return response, [q["sql"] for q in queries if "cart_cart" in q["sql"]]
+
+        response, queries = cart_queries(
+            lambda: self.client.post(
+                "/api/v1/user/cart/batch/",
+                {
+                    "items": [
+                        {"product_id": kept.id, "quantity": 2},
+                        {"product_id": new.id, "quantity": 4},
+                    ]
+                },
+                format="json",
+            )
+        )
+        self.assertEqual(
+            [(r["status"], r["quantity"]) for r in response.data["results"]],
+            [("updated", 3), ("created", 4)],
+        )
+        # Loaded once into the cache; the write itself is left to the flusher.
+        self.assertEqual(len(queries), 1, queries)
+        self.assertFalse(Cart.objects.filter(user=self.user, product=new).exists())
+
+        response, queries = cart_queries(lambda: self.client.get("/api/v1/user/cart/"))
+        self.assertEqual(queries, [])
+        self.assertEqual(
+            [(row["product"]["id"], row["quantity"]) for row in response.data],
+            [(new.id, 4), (bought.id, 1), (kept.id, 3)],
+        )
+        response, queries = cart_queries(
+            lambda: self.client.get("/api/v1/user/cart/summary/")
+        )
+        self.assertEqual(queries, [])
+        self.assertEqual(response.data["item_count"], 8)
+
+        self.assertEqual(cart_store.flush_pending(), 1)
+        self.assertEqual(
+            dict(
+                Cart.objects.filter(user=self.user).values_list("product", "quantity")
+            ),
+            {kept.id: 3, bought.id: 1, new.id: 4},
+        )
+        self.assertGreater(Product.objects.get(pk=new.pk).popularity, popularity)
+        # Flushed rows get their ids back in the cached cart.
+        response = self.client.get("/api/v1/user/cart/")
+        self.assertEqual(
+            {row["id"] for row in response.data},
+            set(Cart.objects.filter(user=self.user).values_list("id", flat=True)),
+        )
+
+        # Checkout flushes pending changes first and removes only what was bought.
+        self.client.delete(f"/api/v1/user/cart/{kept.id}/")
+        with self.captureOnCommitCallbacks(execute=True):
+            response = self.client.post(
+                "/api/v1/user/checkout/cod/",
+                checkout_payload([bought]),
+                format="json",
+            )
+        self.assertEqual(response.status_code, 201)
+        self.assertEqual(
+            list(Cart.objects.filter(user=self.user).values_list("product", flat=True)),
+            [new.id],
+        )
+        response = self.client.get("/api/v1/user/cart/")
+        self.assertEqual([row["product"]["id"] for row in response.data], [new.id])
+        cart_store.flush_pending()
+        self.assertEqual(
+            list(Cart.objects.filter(user=self.user).values_list("product", flat=True)),
+            [new.id],
+        )
+
+    def test_concurrent_flushes(self):
+        product = self.products[2]
+        self.client.post("/api/v1/user/cart/", {"product_id": product.id})
+        before = Product.objects.get(pk=product.pk).popularity
+
+        # Two flushes of the same cart: the one that claims the pending
+        # events first counts them, the other writes the rows only.
+        claimed = cart_store.claim_states([self.user.pk])
+        cart_store.flush([self.user.pk])
+        cart_store.write_states(claimed)
+        self.assertEqual(claimed[self.user.pk]["added"], [product.id])
+        gained = Product.objects.get(pk=product.pk).popularity - before
+        self.assertAlmostEqual(
+            gained / event_score("cart", timezone.now()), 1.0, places=3
+        )
+
+        # A lock held by someone else is neither skipped nor released.
+        key = cart_store.LOCK_KEY.format(self.user.pk)
+        cache.set(key, "other-holder", 60)
+        with mock.patch.object(cart_store, "LOCK_TIMEOUT", 0.05):
+            response = self.client.post(
+                "/api/v1/user/cart/", {"product_id": product.id}
+            )
+        self.assertEqual(response.status_code, 503)
+        self.assertEqual(cache.get(key), "other-holder")
@@ -0,0 +1,127 @@
+"""
+Set-based cart changes.
+
+apply_cart_changes() checks every product id with one query and writes the
+whole batch with one statement. On PostgreSQL that is
+``INSERT ... ON CONFLICT (user_id, product_id) DO UPDATE``, so "add"
+quantities are summed in the database and concurrent requests cannot lose
+an update. Syncing a guest cart at login is therefore one round trip.
+"""
+
+from django.db import connection, transaction
+from django.utils import timezone
+from product.models import Product
+from product.popularity import record_events
+
+from .models import Cart
+
+# PositiveIntegerField upper bound on PostgreSQL.
+MAX_QUANTITY = 2147483647
+
+UPSERT = """
+INSERT INTO {table} AS c (user_id, product_id, quantity, added_at)
+VALUES {values}
+ON CONFLICT (user_id, product_id) DO UPDATE
+SET quantity = CASE WHEN c.product_id = ANY(%s) THEN EXCLUDED.quantity
+                    ELSE LEAST(c.quantity + EXCLUDED.quantity, {max_quantity}) END
+RETURNING c.product_id, c.quantity, c.xmax = 0
+"""
+
+
+def _upsert(user, changes, now):
+    """Write ``(product_id, quantity, is_set)``; returns id -> (quantity, created)."""
+    sql = UPSERT.format(
+        table=connection.ops.quote_name(Cart._meta.db_table),
+        values=", ".join(["(%s, %s, %s, %s)"] * len(changes)),
+        max_quantity=MAX_QUANTITY,
+    )
+    params = [
+        value for pk, quantity, _ in changes for value in (user.pk, pk, quantity, now)
+    ]
+    params.append([pk for pk, _, is_set in changes if is_set])
+    with connection.cursor() as cursor:
+        cursor.execute(sql, params)
+        return {pk: (quantity, created) for pk, quantity, created in cursor.fetchall()}
+
+
+def _upsert_bulk_create(user, changes, now):
+    # Backends without UPDATE expressions on conflict: read the locked rows
+    # and write the summed quantities with one bulk upsert.
+    current = dict(
+        Cart.objects.select_for_update()
+        .filter(user=user, product_id__in=[pk for pk, _, _ in changes])
+        .values_list("product_id", "quantity")
+    )
+    rows = {}
+    for pk, quantity, is_set in changes:
+        if not is_set and pk in current:
+            quantity = min(current[pk] + quantity, MAX_QUANTITY)
+        rows[pk] = (quantity, pk not in current)
+    Cart.objects.bulk_create(
+        [
+            Cart(user=user, product_id=pk, quantity=quantity, added_at=now)
+            for pk, (quantity, _) in rows.items()
+        ],
+        update_conflicts=True,
+        unique_fields=["user", "product"],
+        update_fields=["quantity"],
+    )
+    return rows
+
+
+def check_changes(items):
+    """
+    Check ``{"product_id", "quantity", "mode"}`` items against the catalog
+    with one query. Returns one result per item, with unknown products
+    already marked, and the ``(product_id, quantity, is_set)`` changes to
+    apply for the others.
+    """
+    existing = set(
+        Product.objects.filter(
+            pk__in=[item["product_id"] for item in items]
+        ).values_list("pk", flat=True)
+    )
+    results = []
+    changes = []
+    for item in items:
+        pk = item["product_id"]
+        result = {"product_id": pk}
+        results.append(result)
+        if pk not in existing:
+            result.update(status="not_found", error="Product not found.")
+            continue
+        changes.append((pk, item["quantity"], item["mode"] == "set"))
+    return results, changes
+
+
+def fill_results(results, written):
+    """Complete check_changes() results from product id -> (quantity, created)."""
+    for result in results:
+        if "status" not in result:
+            quantity, is_new = written[result["product_id"]]
+            result.update(status="created" if is_new else "updated", quantity=quantity)
+    return results
+
+
+def apply_cart_changes(user, items):
+    """
+    Apply ``{"product_id", "quantity", "mode"}`` items to ``user``'s cart and
+    return one result per item, in order. ``mode`` "add" adds to the quantity
+    already in the cart, "set" replaces it. Unknown products are reported and
+    skipped; the rest are applied.
+    """
+    results, changes = check_changes(items)
+    if not changes:
+        return results
+
+    now = timezone.now()
+    with transaction.atomic():
+        if connection.vendor == "postgresql":
+            written = _upsert(user, changes, now)
+        else:
+            written = _upsert_bulk_create(user, changes, now)
+        # The upsert skips post_save, so count the cart-add events here.
+        created = [pk for pk, (_, is_new) in written.items() if is_new]
+        if created:
+            record_events(created, "cart", now)
+    return fill_results(results, written)
@@ -1,11 +1,12 @@
+from accesories_backend.conditional import conditional_response, make_etag
 from django.shortcuts import render
-from product.models import Product
 from rest_framework import permissions
 from rest_framework.response import Response
 from rest_framework.views import APIView
 
-from .models import Cart
-from .serializer import CartSerializer
+from .serializer import CartBatchSerializer, CartChangeSerializer, cart_row_serializer
+from .store import get_cart_store
+from .summary import SUMMARY_LOOKUPS, cart_summary
 
 
 class CartAPIView(APIView):
@@ -13,50 +14,77 @@ class CartAPIView(APIView):
 
     def get(self, request):
         """List all cart items with product details efficiently"""
-        items = (
-            Cart.objects.filter(user=request.user)
-            .select_related("product")
-            .order_by("-added_at")
-        )
-        serializer = CartSerializer(items, many=True)
-        return Response(serializer.data)
+        row_serializer = cart_row_serializer(request)
+        rows = get_cart_store().rows(request.user, row_serializer.lookups())
+        return Response(row_serializer.serialize(rows))
 
     def post(self, request):
         """Add a product to cart or update quantity"""
         product_id = request.data.get("product_id")
-        quantity = int(request.data.get("quantity", 1))
-
         if not product_id:
             return Response({"error": "product_id is required"}, status=400)
-        try:
-            product = Product.objects.get(id=product_id)
-        except Product.DoesNotExist:
+        serializer = CartChangeSerializer(
+            data={"product_id": product_id, "quantity": request.data.get("quantity", 1)}
+        )
+        serializer.is_valid(raise_exception=True)
+        product_id = serializer.validated_data["product_id"]
+        store = get_cart_store()
+        # Same upsert as the batch endpoint, so concurrent adds are summed
+        # instead of overwriting each other.
+        (result,) = store.apply(request.user, [serializer.validated_data])
+        if result["status"] == "not_found":
             return Response({"error": "Product not found"}, status=404)
 
-        cart_item, created = Cart.objects.get_or_create(
-            user=request.user, product=product
+        row_serializer = cart_row_serializer(request)
+        (row,) = store.rows(
+            request.user, row_serializer.lookups(), product_ids=[product_id]
         )
-        if not created:
-            cart_item.quantity += quantity
-            cart_item.save()
-        else:
-            cart_item.quantity = quantity
-            cart_item.save()
-
-        serializer = CartSerializer(cart_item)
-        return Response(serializer.data, status=200)
+        return Response(row_serializer.to_dict(row), status=200)
 
     def delete(self, request, product_id=None):
         """Remove a product from cart or empty the cart"""
         if product_id is not None:
             # Delete the specific product
-            deleted, _ = Cart.objects.filter(
-                user=request.user, product_id=product_id
-            ).delete()
-            if deleted:
+            if get_cart_store().remove(request.user, [product_id]):
                 return Response({"message": "Product removed from cart"}, status=204)
             return Response({"error": "Product not found in cart"}, status=404)
 
         # No product_id → empty the cart
-        Cart.objects.filter(user=request.user).delete()
+        get_cart_store().remove(request.user)
         return Response({"message": "All cart items removed"}, status=204)
+
+
+class CartSummaryAPIView(APIView):
+    """
+    Subtotal, savings and per-line stock status of the cart. The summary
+    is one query; its ETag is a hash of the body, so polling clients get
+    a 304 while nothing they would display has changed.
+    """
+
+    permission_classes = [permissions.IsAuthenticated]
+
+    def get(self, request):
+        summary = cart_summary(request.user)
+        # Cart rows have no updated_at and stock changes touch no cart row,
+        # so the validator is derived from the computed summary itself.
+        etag = make_etag(request.user.pk, summary)
+        return conditional_response(request, etag, None, lambda: Response(summary))
+
+
+class CartBatchAPIView(APIView):
+    """
+    Add or set the quantity of many cart items at once, e.g. to merge a
+    guest cart at login. Each item gives ``product_id``, ``quantity`` and
+    ``mode`` ("add", the default, or "set"); the response lists the
+    outcome for each one.
+    """
+
+    permission_classes = [permissions.IsAuthenticated]
+
+    def post(self, request):
+        serializer = CartBatchSerializer(data=request.data)
+        serializer.is_valid(raise_exception=True)
+        results = get_cart_store().apply(
+            request.user, serializer.validated_data["items"]
+        )
+        return Response({"results": results})
@@ -1,3 +1,7 @@
+from accesories_backend.serializers import SparseFieldsetMixin
+from product.fast_serializer import (date_repr, datetime_converter,
+                                     decimal_repr,
+                                     nested_product_row_serializer)
 from product.models import Product
 from product.serializer import ProductSerializer
 from rest_framework import serializers
@@ -5,7 +9,7 @@ from rest_framework import serializers
 from .models import Notification, Order
 
 
-class UserOrderSerializer(serializers.ModelSerializer):
+class UserOrderSerializer(SparseFieldsetMixin, serializers.ModelSerializer):
     product = ProductSerializer(read_only=True)
 
     class Meta:
@@ -34,6 +38,29 @@ class UserOrderSerializer(serializers.ModelSerializer):
             "order_status",
             "payment_method",
         ]
+        expandable_fields = ["product"]
+
+
+def user_order_row_serializer(request):
+    """Fast, read-only equivalent of UserOrderSerializer for .values() rows."""
+    columns = {
+        name: (name, None)
+        for name in (
+            "id",
+            "quantity",
+            "payment_status",
+            "payment_method",
+            "order_status",
+            "tracking_id",
+            "shipping_address",
+            "phone",
+        )
+    }
+    columns["price"] = ("price", decimal_repr)
+    columns["total_amount"] = ("total_amount", decimal_repr)
+    columns["delivery_date"] = ("delivery_date", date_repr)
+    columns["created_at"] = ("created_at", datetime_converter())
+    return nested_product_row_serializer(request, UserOrderSerializer, columns)
 
 
 class CheckoutOrderSerializer(serializers.ModelSerializer):
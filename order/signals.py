@@ -1,23 +1,47 @@
-from django.db.models.signals import pre_save
+from accesories_backend.cache import bump_generation
+from django.db.models.signals import post_delete, post_init, post_save, pre_save
 from django.dispatch import receiver
 
 from .models import Notification, Order
 
 
+@receiver(post_init, sender=Order)
+def remember_order_status(sender, instance, **kwargs):
+    # Remember the loaded status so pre_save doesn't have to re-fetch the row.
+    # Deferred fields are left alone (reading them would cost a query).
+    instance._loaded_order_status = instance.__dict__.get("order_status")
+
+
 @receiver(pre_save, sender=Order)
 def create_notification_on_status_change(sender, instance, **kwargs):
     # Skip new orders
     if not instance.pk:
         return
 
-    try:
-        old_order = Order.objects.get(pk=instance.pk)
-    except Order.DoesNotExist:
-        return
+    old_status = getattr(instance, "_loaded_order_status", None)
+    if old_status is None:
+        old_status = (
+            Order.objects.filter(pk=instance.pk)
+            .values_list("order_status", flat=True)
+            .first()
+        )
+        if old_status is None:
+            return
 
     # If status changed, create a notification
-    if old_order.order_status != instance.order_status:
+    if old_status != instance.order_status:
         Notification.objects.create(
-            user=instance.user,
+            user_id=instance.user_id,
             message=f"Your order #{instance.id}  was {instance.order_status}.",
         )
+
+
+@receiver(post_save, sender=Order)
+def reset_loaded_order_status(sender, instance, **kwargs):
+    instance._loaded_order_status = instance.order_status
+
+
+@receiver(post_save, sender=Order)
+@receiver(post_delete, sender=Order)
+def bump_order_generation(sender, **kwargs):
+    bump_generation(Order)
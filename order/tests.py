@@ -1,3 +1,51 @@
+from Be_men_user.models import User
+from Be_men_user.tests import checkout_payload, seed_activity, seed_catalog
+from django.core.cache import cache
 from django.test import TestCase
+from rest_framework.test import APIClient
 
-# Create your tests here.
+
+class OrderTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.client = APIClient()
+        self.user = User.objects.create_user(
+            email="shopper@example.com",
+            name="Shopper",
+            phone_number="9000000001",
+            password="Str0ng-passw0rd",
+        )
+        self.products = seed_catalog(3)
+        self.orders = seed_activity(self.user, self.products[:2])
+
+    def test_checkout_invalidates_catalog(self):
+        product = self.products[2]
+        url = f"/api/v1/user/products/{product.id}/"
+        etag = self.client.get(url)["ETag"]
+        self.assertEqual(self.client.get(url)["X-Cache"], "HIT")
+
+        self.client.force_authenticate(self.user)
+        with self.captureOnCommitCallbacks(execute=True):
+            response = self.client.post(
+                "/api/v1/user/checkout/cod/",
+                checkout_payload([product]),
+                format="json",
+            )
+        self.assertEqual(response.status_code, 201)
+
+        self.client.force_authenticate(None)
+        response = self.client.get(url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response["X-Cache"], "MISS")
+        self.assertEqual(response.data["product_stock"], product.product_stock - 1)
+
+    def test_nested_product_images_are_relative(self):
+        self.client.force_authenticate(self.user)
+        order = self.orders[0]
+        image = "/media/products/seed.png"
+        responses = [
+            self.client.get("/api/v1/user/my-orders/").data[0],
+            self.client.get(f"/api/v1/user/orders/{order.id}/").data,
+        ]
+        for data in responses:
+            self.assertEqual(data["product"]["product_image"], image)
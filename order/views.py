@@ -1,50 +1,129 @@
+from collections import Counter, defaultdict
+
 import razorpay
+from accesories_backend.cache import bump_generation, get_generation
+from accesories_backend.conditional import (conditional_response, make_etag,
+                                            queryset_validators)
+from accesories_backend.serializers import defer_unselected
 from django.conf import settings
 from django.utils import timezone
 from product.models import Product
+from product.popularity import record_events
+from product.serializer import ProductSerializer
 from rest_framework import mixins, permissions, status, viewsets
 from rest_framework.response import Response
 from rest_framework.views import APIView
 
 from .models import Notification, Order
 from .serializer import (CheckoutOrderSerializer, NotificationSerializer,
-                         OrderReturnSerializer, UserOrderSerializer)
+                         OrderReturnSerializer, UserOrderSerializer,
+                         user_order_row_serializer)
 
 razorpay_client = razorpay.Client(
     auth=(settings.RAZORPAY_KEY_ID, settings.RAZORPAY_KEY_SECRET)
 )
-from cart.models import Cart
+from cart.store import get_cart_store
 from django.db import transaction
-from django.db.models import F
+from django.db.models import Case, Count, F, IntegerField, Max, Q, Value, When
+from django.db.models.functions import Now
 from rest_framework import generics
 from rest_framework.permissions import IsAuthenticated
 
 
+def reduce_stock(orders):
+    """
+    Decrement stock for every ordered product in a single UPDATE. Neither
+    bulk_create() nor update() sends signals, so the Product and Order
+    generations are bumped once the checkout transaction commits.
+    """
+    quantities = defaultdict(int)
+    for order in orders:
+        quantities[order.product_id] += order.quantity
+    Product.objects.filter(id__in=quantities).update(
+        product_stock=F("product_stock")
+        - Case(
+            *[When(id=pk, then=Value(qty)) for pk, qty in quantities.items()],
+            output_field=IntegerField(),
+        ),
+        updated_at=Now(),
+    )
+    transaction.on_commit(bump_checkout_generations)
+
+
+def record_order_events(orders):
+    """
+    Popularity events for checkout orders. bulk_create() skips the post_save
+    receiver that records them for single saves (product/signals.py).
+    """
+    orders_per_product = Counter(order.product_id for order in orders)
+    by_count = defaultdict(list)
+    for product_id, count in orders_per_product.items():
+        by_count[count].append(product_id)
+    now = timezone.now()
+    for count, product_ids in by_count.items():
+        record_events(product_ids, "order", now, count)
+
+
+def bump_checkout_generations():
+    # Invalidates cached catalog pages, facets, counts and their ETags.
+    bump_generation(Product)
+    bump_generation(Order)
+
+
 class UserOrdersAPIView(APIView):
     permission_classes = [permissions.IsAuthenticated]
 
     def get(self, request, order_id=None):
+        # Orders embed product details, so product writes change the ETag too
+        catalog_generation = get_generation(Product)
+
         # If order_id is provided, return single order
         if order_id:
-            try:
-                order = Order.objects.select_related("product").get(
-                    id=order_id, user=request.user
-                )
-                serializer = UserOrderSerializer(order)
-                return Response(serializer.data, status=status.HTTP_200_OK)
-            except Order.DoesNotExist:
+            last_modified = (
+                Order.objects.filter(id=order_id, user=request.user)
+                .values_list("updated_at", flat=True)
+                .first()
+            )
+            if last_modified is None:
                 return Response(
                     {"error": "Order not found"}, status=status.HTTP_404_NOT_FOUND
                 )
 
+            def build_detail():
+                order = defer_unselected(
+                    Order.objects.select_related("product__category"),
+                    request,
+                    ProductSerializer,
+                    "product",
+                ).get(id=order_id, user=request.user)
+                serializer = UserOrderSerializer(
+                    order, context={"request": request, "relative_media_urls": True}
+                )
+                return Response(serializer.data, status=status.HTTP_200_OK)
+
+            return conditional_response(
+                request,
+                make_etag(last_modified, catalog_generation, request.get_full_path()),
+                last_modified,
+                build_detail,
+            )
+
         # Otherwise, return all orders for the user
         orders = (
             Order.objects.filter(user=request.user)
             .select_related("product")
             .order_by("-created_at")
         )
-        serializer = UserOrderSerializer(orders, many=True)
-        return Response(serializer.data, status=status.HTTP_200_OK)
+        etag, last_modified = queryset_validators(
+            orders, request.user.pk, catalog_generation
+        )
+
+        def build_list():
+            row_serializer = user_order_row_serializer(request)
+            rows = orders.values(*row_serializer.lookups())
+            return Response(row_serializer.serialize(rows), status=status.HTTP_200_OK)
+
+        return conditional_response(request, etag, last_modified, build_list)
 
     def delete(self, request, order_id=None):
         if not order_id:
@@ -204,13 +283,11 @@ class CODCheckoutAPIView(APIView):
             orders = Order.objects.bulk_create(order_objs)
 
             # Bulk update stock
-            for order in orders:
-                Product.objects.filter(id=order.product.id).update(
-                    product_stock=F("product_stock") - order.quantity
-                )
+            reduce_stock(orders)
+            record_order_events(orders)
 
-            # Bulk delete cart items
-            Cart.objects.filter(user=request.user, product_id__in=product_ids).delete()
+            # Remove the ordered products from the cart
+            get_cart_store().discard(request.user, product_ids)
 
         serializer = CheckoutOrderSerializer(orders, many=True)
         return Response(
@@ -231,9 +308,15 @@ class RazorpayCheckoutAPIView(APIView):
         if not orders_data:
             return Response({"error": "No orders provided"}, status=400)
 
+        product_map = Product.objects.in_bulk([o["product"] for o in orders_data])
+
         total_amount = 0
         for order_data in orders_data:
-            product = Product.objects.get(id=order_data["product"])
+            product = product_map.get(order_data["product"])
+            if not product:
+                return Response(
+                    {"error": f'Product {order_data["product"]} not found'}, status=404
+                )
             if product.product_stock < order_data["quantity"]:
                 return Response(
                     {"error": f"Not enough stock for {product.name}"}, status=400
@@ -329,13 +412,11 @@ class RazorpayVerifyAPIView(APIView):
             orders = Order.objects.bulk_create(order_objs)
 
             # Step 4: Bulk reduce stock
-            for order in orders:
-                Product.objects.filter(id=order.product.id).update(
-                    product_stock=F("product_stock") - order.quantity
-                )
+            reduce_stock(orders)
+            record_order_events(orders)
 
-            # Step 5: Bulk delete cart items
-            Cart.objects.filter(user=request.user, product_id__in=product_ids).delete()
+            # Step 5: Remove the ordered products from the cart
+            get_cart_store().discard(request.user, product_ids)
 
         serializer = CheckoutOrderSerializer(orders, many=True)
         return Response(
@@ -356,7 +437,7 @@ class UpdateOrderAddressView(generics.UpdateAPIView):
     def get_queryset(self):
         return Order.objects.filter(
             user=self.request.user, order_status__in=["PENDING", "PROCESSING"]
-        )
+        ).select_related("product__category")
 
     def update(self, request, *args, **kwargs):
         order = self.get_object()
@@ -388,6 +469,32 @@ class NotificationViewSet(
             "-created_at"
         )
 
+    def list(self, request, *args, **kwargs):
+        # Notifications have no updated_at and marking one read changes no
+        # timestamp, so the unread count goes into the ETag instead.
+        stats = (
+            self.filter_queryset(self.get_queryset())
+            .order_by()
+            .aggregate(
+                latest=Max("created_at"),
+                total=Count("pk"),
+                unread=Count("pk", filter=Q(read=False)),
+            )
+        )
+        etag = make_etag(
+            stats["latest"],
+            stats["total"],
+            stats["unread"],
+            request.user.pk,
+            request.get_full_path(),
+        )
+        return conditional_response(
+            request,
+            etag,
+            None,
+            lambda: super(NotificationViewSet, self).list(request, *args, **kwargs),
+        )
+
     def perform_update(self, serializer):
         """
         Only allow updating the 'read' field
@@ -0,0 +1,104 @@
+import hashlib
+
+from accesories_backend.cache import get_generation
+from django.core.cache import cache
+from rest_framework.response import Response
+
+from .models import Product
+from .popularity import is_popularity_ordering, popularity_window
+
+RESPONSE_CACHE_TIMEOUT = 60 * 60 * 24
+HITS_KEY = "catalog_cache:hits"
+MISSES_KEY = "catalog_cache:misses"
+
+# Query parameters that change a catalog response; anything else is ignored
+# so tracking parameters don't fragment the cache.
+CACHE_QUERY_PARAMS = (
+    "category",
+    "search",
+    "ordering",
+    "page",
+    "page_size",
+    "pagination",
+    "cursor",
+    "fields",
+    "omit",
+    "expand",
+    "limit",
+)
+
+
+def _incr(key):
+    cache.add(key, 0, None)
+    try:
+        cache.incr(key)
+    except ValueError:
+        pass
+
+
+def cache_stats():
+    """Hit/miss counters of the catalog response cache."""
+    counts = cache.get_many([HITS_KEY, MISSES_KEY])
+    return {"hits": counts.get(HITS_KEY, 0), "misses": counts.get(MISSES_KEY, 0)}
+
+
+def normalize_query(request):
+    params = request.query_params
+    parts = []
+    for name in CACHE_QUERY_PARAMS:
+        value = params.get(name, "").strip()
+        if name == "category":
+            value = value.lower()
+        if value:
+            parts.append(f"{name}={value}")
+    return "&".join(parts)
+
+
+class CatalogResponseCacheMixin:
+    """
+    Serve anonymous list/retrieve responses from Django's cache.
+
+    Keys embed the catalog generation, which Product and ProductCategory
+    writes bump (product/signals.py), so every write invalidates all cached
+    pages at once. Responses carry ``X-Cache: HIT`` or ``MISS``.
+    """
+
+    def get_response_cache_key(self, request):
+        raw = "|".join(
+            [
+                self.action,
+                str(self.kwargs.get(self.lookup_url_kwarg or self.lookup_field, "")),
+                request.get_host(),
+                normalize_query(request),
+            ]
+        )
+        if is_popularity_ordering(request):
+            # Popularity updates don't bump the generation; expire instead.
+            raw += f"|{popularity_window()}"
+        digest = hashlib.md5(raw.encode()).hexdigest()
+        return f"catalog:{get_generation(Product)}:{digest}"
+
+    def cached_response(self, request, handler, *args, **kwargs):
+        if request.user.is_authenticated:
+            return handler(request, *args, **kwargs)
+
+        key = self.get_response_cache_key(request)
+        data = cache.get(key)
+        if data is not None:
+            _incr(HITS_KEY)
+            response = Response(data)
+            response["X-Cache"] = "HIT"
+            return response
+
+        _incr(MISSES_KEY)
+        response = handler(request, *args, **kwargs)
+        if response.status_code == 200:
+            cache.set(key, response.data, RESPONSE_CACHE_TIMEOUT)
+        response["X-Cache"] = "MISS"
+        return response
+
+    def list(self, request, *args, **kwargs):
+        return self.cached_response(request, super().list, *args, **kwargs)
+
+    def retrieve(self, request, *args, **kwargs):
+        return self.cached_response(request, super().retrieve, *args, **kwargs)
@@ -0,0 +1,86 @@
+import hashlib
+from decimal import Decimal
+
+from accesories_backend.cache import get_generation
+from django.db.models import Case, Count, IntegerField, Max, Min, Value, When
+
+from .fast_serializer import decimal_repr
+from .models import Product
+
+FACETS_CACHE_TIMEOUT = 60 * 60 * 24
+FACET_QUERY_PARAMS = ("category", "search")
+
+# Lower edges of the price ranges; the last range is open-ended.
+PRICE_BUCKETS = tuple(Decimal(edge) for edge in ("0", "500", "1000", "2000", "5000"))
+
+
+def facets_cache_key(request):
+    params = request.query_params
+    raw = "&".join(
+        f"{name}={params.get(name, '').strip().lower()}" for name in FACET_QUERY_PARAMS
+    )
+    digest = hashlib.md5(raw.encode()).hexdigest()
+    return f"facets:{get_generation(Product)}:{digest}"
+
+
+def price_bucket():
+    return Case(
+        *[
+            When(price__lt=upper, then=Value(index))
+            for index, upper in enumerate(PRICE_BUCKETS[1:])
+        ],
+        default=Value(len(PRICE_BUCKETS) - 1),
+        output_field=IntegerField(),
+    )
+
+
+def product_facets(queryset):
+    """
+    Category counts and price ranges for a filtered product queryset.
+
+    Both come from one query grouped by (category, price bucket); the two
+    facets are the row sums along each axis.
+    """
+    groups = (
+        queryset.order_by()
+        .annotate(bucket=price_bucket())
+        .values("category_id", "category__category", "bucket")
+        .annotate(count=Count("id"), min_price=Min("price"), max_price=Max("price"))
+    )
+
+    categories = {}
+    bucket_counts = [0] * len(PRICE_BUCKETS)
+    min_price = max_price = None
+    for group in groups:
+        category = categories.setdefault(
+            group["category_id"],
+            {
+                "id": group["category_id"],
+                "category": group["category__category"],
+                "count": 0,
+            },
+        )
+        category["count"] += group["count"]
+        bucket_counts[group["bucket"]] += group["count"]
+        if min_price is None or group["min_price"] < min_price:
+            min_price = group["min_price"]
+        if max_price is None or group["max_price"] > max_price:
+            max_price = group["max_price"]
+
+    uppers = [*PRICE_BUCKETS[1:], None]
+    return {
+        "total": sum(bucket_counts),
+        "categories": sorted(
+            categories.values(), key=lambda c: (-c["count"], c["category"])
+        ),
+        "price_ranges": [
+            {
+                "min": decimal_repr(lower),
+                "max": decimal_repr(upper),
+                "count": count,
+            }
+            for lower, upper, count in zip(PRICE_BUCKETS, uppers, bucket_counts)
+        ],
+        "min_price": decimal_repr(min_price),
+        "max_price": decimal_repr(max_price),
+    }
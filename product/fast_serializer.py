@@ -0,0 +1,171 @@
+"""
+Read-only fast path for the hot product list endpoints.
+
+Rows come straight from ``.values()`` and are turned into dicts by a
+precompiled list of converters, skipping DRF's per-field get_attribute /
+to_representation dispatch. The output must stay byte-identical to the
+regular serializers (ProductSerializer and the serializers nesting it);
+``python manage.py benchmark_serializers`` checks that and times both.
+"""
+
+import decimal
+
+from accesories_backend.serializers import is_expanded, select_fields
+from django.core.files.storage import FileSystemStorage, default_storage
+from django.utils import timezone
+from django.utils.encoding import filepath_to_uri
+
+from .images import variant_urls
+from .serializer import MEMBERSHIP_FIELDS, ProductSerializer
+
+# Model DecimalFields are max_digits=10, decimal_places=2; quantize the same
+# way rest_framework.fields.DecimalField does.
+_DECIMAL_CONTEXT = decimal.Context(prec=10)
+_CENTS = decimal.Decimal(".01")
+
+
+def decimal_repr(value):
+    if value is None:
+        return None
+    return f"{value.quantize(_CENTS, context=_DECIMAL_CONTEXT):f}"
+
+
+def date_repr(value):
+    return value.isoformat() if value else None
+
+
+def datetime_converter():
+    tz = timezone.get_current_timezone()
+
+    def datetime_repr(value):
+        if not value:
+            return None
+        value = value.astimezone(tz).isoformat()
+        if value.endswith("+00:00"):
+            value = value[:-6] + "Z"
+        return value
+
+    return datetime_repr
+
+
+def media_url_converter(request, storage=default_storage):
+    """
+    Build absolute media URLs like ImageField(use_url=True) does. For local
+    storage the absolute prefix is computed once per request.
+    """
+    # Content addressing does not change URLs; look at the wrapped backend.
+    storage = getattr(storage, "backend", storage)
+    if isinstance(storage, FileSystemStorage):
+        base_url = storage.base_url
+        if request is not None:
+            base_url = request.build_absolute_uri(base_url)
+
+        def media_url(name):
+            if not name:
+                return None
+            return base_url + filepath_to_uri(name).lstrip("/")
+
+        return media_url
+
+    def media_url(name):
+        if not name:
+            return None
+        url = storage.url(name)
+        return request.build_absolute_uri(url) if request is not None else url
+
+    return media_url
+
+
+class RowSerializer:
+    """
+    Describes one response object as ``(field name, values() lookup,
+    converter)`` triples, or ``(field name, RowSerializer)`` for a nested
+    object, and serializes ``.values()`` rows with it.
+    """
+
+    def __init__(self, columns):
+        self.columns = columns
+
+    def lookups(self):
+        for column in self.columns:
+            if isinstance(column[1], RowSerializer):
+                yield from column[1].lookups()
+            else:
+                yield column[1]
+
+    def to_dict(self, row):
+        data = {}
+        for column in self.columns:
+            if isinstance(column[1], RowSerializer):
+                data[column[0]] = column[1].to_dict(row)
+                continue
+            name, lookup, convert = column
+            value = row[lookup]
+            data[name] = value if convert is None or value is None else convert(value)
+        return data
+
+    def serialize(self, rows):
+        to_dict = self.to_dict
+        return [to_dict(row) for row in rows]
+
+
+def image_variants_converter(request):
+    media_url = media_url_converter(request)
+    return lambda variants: variant_urls(variants, media_url)
+
+
+def product_columns(request, path="", prefix="", relative_media_urls=False):
+    datetime_repr = datetime_converter()
+    media_request = None if relative_media_urls else request
+    converters = {
+        "id": ("id", None),
+        "name": ("name", None),
+        "category": ("category__category", None),
+        "description": ("description", None),
+        "price": ("price", decimal_repr),
+        "old_price": ("old_price", decimal_repr),
+        "product_stock": ("product_stock", None),
+        "active": ("active", None),
+        "product_image": ("product_image", media_url_converter(media_request)),
+        "image_variants": ("image_variants", image_variants_converter(media_request)),
+        "created_at": ("created_at", datetime_repr),
+        "updated_at": ("updated_at", datetime_repr),
+    }
+    return [
+        (name, prefix + converters[name][0], converters[name][1])
+        for name in select_fields(ProductSerializer.Meta.fields, request, path)
+    ]
+
+
+def product_row_serializer(request, membership=False):
+    """
+    Fast equivalent of ProductSerializer for ProductViewSet.list, or of
+    ProductMembershipSerializer with ``membership``.
+    """
+    columns = product_columns(request)
+    if membership:
+        columns += [
+            (name, name, None) for name in select_fields(MEMBERSHIP_FIELDS, request)
+        ]
+    return RowSerializer(columns)
+
+
+def nested_product_row_serializer(request, serializer_class, columns):
+    """
+    Fast equivalent of a serializer nesting ProductSerializer under
+    ``product`` (CartSerializer, WishlistSerializer, UserOrderSerializer).
+    ``columns`` maps the serializer's own fields to (lookup, converter).
+    Media URLs are relative, as with ``relative_media_urls`` in the context.
+    """
+    result = []
+    for name in select_fields(serializer_class.Meta.fields, request):
+        if name != "product":
+            result.append((name, *columns[name]))
+        elif not is_expanded(request, "product"):
+            result.append(("product", "product_id", None))
+        else:
+            nested = product_columns(
+                request, "product", "product__", relative_media_urls=True
+            )
+            result.append(("product", RowSerializer(nested)))
+    return RowSerializer(result)
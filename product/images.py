@@ -0,0 +1,143 @@
+"""
+Resized WebP/JPEG variants of product images.
+
+Variants are generated after the product is saved, on a small worker pool
+so uploads return without waiting for Pillow. ``Product.image_variants``
+records them as ``{"source": <original name>, "webp": {"200": <name>, ...},
+"jpeg": {...}}``; ``source`` tells whether they still match the current
+``product_image``.
+"""
+
+import logging
+import posixpath
+from concurrent.futures import ThreadPoolExecutor
+from io import BytesIO
+
+from accesories_backend.cache import bump_generation
+from django.core.files.base import ContentFile
+from django.core.files.storage import default_storage
+from django.db import connections, transaction
+from PIL import Image, ImageOps
+
+from .models import Product
+
+logger = logging.getLogger(__name__)
+
+VARIANT_WIDTHS = (200, 400, 800)
+VARIANT_FORMATS = {
+    "webp": {"format": "WEBP", "quality": 80, "method": 4},
+    "jpeg": {"format": "JPEG", "quality": 82, "optimize": True, "progressive": True},
+}
+VARIANT_DIR = "products/variants"
+
+_executor = ThreadPoolExecutor(max_workers=2, thread_name_prefix="image-variants")
+
+
+def variants_are_current(product):
+    name = product.product_image.name
+    return not name or (product.image_variants or {}).get("source") == name
+
+
+def variant_urls(variants, media_url):
+    """Public form of ``image_variants``: format -> width -> URL."""
+    return {
+        fmt: {width: media_url(name) for width, name in sizes.items()}
+        for fmt, sizes in (variants or {}).items()
+        if fmt in VARIANT_FORMATS
+    }
+
+
+def render_variants(name, storage=default_storage):
+    """Resize the stored image ``name`` and save every variant to storage."""
+    with storage.open(name) as original:
+        image = Image.open(original)
+        image = ImageOps.exif_transpose(image)
+        image.load()
+
+    stem = posixpath.splitext(posixpath.basename(name))[0]
+    variants = {"source": name}
+    for width in VARIANT_WIDTHS:
+        resized = image.copy()
+        # thumbnail() keeps the aspect ratio and never upscales.
+        resized.thumbnail((width, width * 4), Image.Resampling.LANCZOS)
+        for fmt, options in VARIANT_FORMATS.items():
+            converted = resized
+            if options["format"] == "JPEG" and resized.mode not in ("RGB", "L"):
+                converted = resized.convert("RGB")
+            buffer = BytesIO()
+            converted.save(buffer, **options)
+            path = storage.save(
+                f"{VARIANT_DIR}/{stem}-{width}w.{fmt}", ContentFile(buffer.getvalue())
+            )
+            variants.setdefault(fmt, {})[str(width)] = path
+    return variants
+
+
+def delete_variants(variants, storage=default_storage):
+    for fmt in VARIANT_FORMATS:
+        for path in (variants or {}).get(fmt, {}).values():
+            storage.delete(path)
+
+
+def release_variants(variants):
+    """
+    Delete a variant set after commit unless another product still uses its
+    source image; identical images produce identical (shared) variants.
+    """
+    source = (variants or {}).get("source")
+    if not source:
+        return
+
+    def cleanup():
+        if not Product.objects.filter(product_image=source).exists():
+            delete_variants(variants)
+
+    transaction.on_commit(cleanup)
+
+
+def generate_variants(product_id, force=False):
+    """
+    Build the variants for a product's current image and store them, unless
+    the image was replaced meanwhile. Returns True if variants were written.
+    """
+    product = (
+        Product.objects.filter(pk=product_id)
+        .only("product_image", "image_variants")
+        .first()
+    )
+    if product is None or not product.product_image:
+        return False
+    if not force and variants_are_current(product):
+        return False
+
+    source = product.product_image.name
+    variants = render_variants(source)
+    updated = Product.objects.filter(pk=product_id, product_image=source).update(
+        image_variants=variants
+    )
+    if not updated:
+        release_variants(variants)
+        return False
+
+    release_variants(product.image_variants)
+    # update() skips post_save, so invalidate cached catalog responses here.
+    bump_generation(Product)
+    return True
+
+
+def _run(product_id):
+    try:
+        generate_variants(product_id)
+    except Exception:
+        logger.exception("Could not generate image variants for product %s", product_id)
+    finally:
+        # Worker threads open their own connections; don't leak them.
+        connections.close_all()
+
+
+def schedule_variants(product):
+    """Queue variant generation for ``product`` once the transaction commits."""
+    if variants_are_current(product):
+        return
+    product_id = product.pk
+    transaction.on_commit(lambda: _executor.submit(_run, product_id))
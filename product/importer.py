@@ -0,0 +1,240 @@
+"""
+Bulk product import from CSV or JSON Lines files.
+
+Rows are read lazily and written in batches, so memory stays flat however
+long the file is. Each batch resolves its categories with one query
+(creating missing ones with one insert) and upserts products on ``sku``
+with bulk_create(update_conflicts=True); the search_vector trigger indexes
+the rows inside the database. Invalid rows are reported by line number and
+skipped without aborting the import.
+
+Updates only write the columns a row supplies. Rows are upserted in groups
+that supply the same optional columns, each with its own update_fields, so
+a row with just sku, name, category and price keeps the stock, description,
+old price, active flag and image already stored.
+
+bulk_create sends no signals: the catalog generation is bumped per batch
+here, and resized variants for new images are left to the
+``generate_image_variants`` command.
+"""
+
+import csv
+import io
+import json
+import os
+from collections import defaultdict
+
+from accesories_backend.cache import bump_generation
+from accesories_backend.storage import release_media
+from accesories_backend.uploads import HEADER_BYTES, looks_like_image
+from django.core.files import File
+from django.core.files.storage import default_storage
+from django.db import DatabaseError, transaction
+from rest_framework import serializers
+
+from .models import Product, ProductCategory
+from .serializer import ProductImportRowSerializer
+
+IMPORT_FORMATS = {".csv": "csv", ".jsonl": "jsonl", ".ndjson": "jsonl"}
+BATCH_SIZE = 1000
+# Per-row errors beyond this are only counted.
+MAX_REPORTED_ERRORS = 1000
+# Written on every update; the row serializer requires them.
+UPDATE_FIELDS = ["name", "category", "price", "updated_at"]
+# Row key -> model field, written only when the row has the key.
+OPTIONAL_FIELDS = {
+    "description": "description",
+    "old_price": "old_price",
+    "product_stock": "product_stock",
+    "active": "active",
+    "image": "product_image",
+}
+
+
+def import_format(filename):
+    """``csv`` or ``jsonl`` from a file name's extension, or None."""
+    return IMPORT_FORMATS.get(os.path.splitext(filename or "")[1].lower())
+
+
+def read_rows(stream, fmt):
+    """
+    Yield ``(line number, row)`` from a binary stream. Blank CSV cells are
+    left out of the row, so optional columns fall back to their defaults.
+    """
+    text = io.TextIOWrapper(stream, encoding="utf-8-sig", newline="")
+    if fmt == "csv":
+        reader = csv.DictReader(text)
+        for row in reader:
+            yield reader.line_num, {
+                key.strip(): value.strip()
+                for key, value in row.items()
+                if key and isinstance(value, str) and value.strip()
+            }
+        return
+
+    for number, line in enumerate(text, 1):
+        if not line.strip():
+            continue
+        try:
+            yield number, json.loads(line)
+        except ValueError:
+            yield number, None
+
+
+class ProductImporter:
+    """
+    Upsert products from ``(line number, row)`` pairs, see read_rows().
+    Images are read from ``image_dir`` and saved to media storage.
+    """
+
+    def __init__(self, image_dir=None, batch_size=BATCH_SIZE, storage=None):
+        self.image_dir = os.path.realpath(image_dir) if image_dir else None
+        self.batch_size = batch_size
+        self.storage = storage or default_storage
+        self.image_field = Product._meta.get_field("product_image")
+        # One serializer validates every row; building its fields per row
+        # would cost more than the rest of the import.
+        self.row_serializer = ProductImportRowSerializer()
+        # Image path -> stored name, so a shared image is hashed once.
+        self.images = {}
+        # Category name -> id, filled as batches need them.
+        self.categories = {}
+        self.created = self.updated = self.failed = 0
+        self.errors = []
+
+    def run(self, rows):
+        batch = {}
+        for line, row in rows:
+            data = self.validate(line, row)
+            if data is None:
+                continue
+            # A later row for the same SKU wins, as it would row by row.
+            batch[data["sku"]] = (line, data)
+            if len(batch) >= self.batch_size:
+                self.flush(batch)
+                batch = {}
+        if batch:
+            self.flush(batch)
+        return self.report()
+
+    def report(self):
+        return {
+            "created": self.created,
+            "updated": self.updated,
+            "failed": self.failed,
+            "errors": self.errors,
+        }
+
+    def error(self, line, errors):
+        self.failed += 1
+        if len(self.errors) < MAX_REPORTED_ERRORS:
+            self.errors.append({"line": line, "errors": errors})
+
+    def validate(self, line, row):
+        if not isinstance(row, dict):
+            self.error(line, {"row": ["Not a JSON object."]})
+            return None
+        try:
+            data = self.row_serializer.run_validation(row)
+        except serializers.ValidationError as exc:
+            self.error(line, serializers.as_serializer_error(exc))
+            return None
+        if "image" in data:
+            try:
+                data["image"] = self.image_name(data["image"])
+            except ValueError as exc:
+                self.error(line, {"image": [str(exc)]})
+                return None
+        return data
+
+    def image_name(self, path):
+        if path not in self.images:
+            self.images[path] = self.store_image(path)
+        return self.images[path]
+
+    def store_image(self, path):
+        if self.image_dir is None:
+            raise ValueError("No image directory was given for this import.")
+        full_path = os.path.realpath(os.path.join(self.image_dir, path))
+        if os.path.commonpath([self.image_dir, full_path]) != self.image_dir:
+            raise ValueError("Image path is outside the image directory.")
+        try:
+            f = open(full_path, "rb")
+        except OSError:
+            raise ValueError(f"Image file {path!r} not found.")
+        with f:
+            if not looks_like_image(f.read(HEADER_BYTES)):
+                raise ValueError("Not a JPEG, PNG, GIF or WebP image.")
+            f.seek(0)
+            name = self.image_field.generate_filename(None, os.path.basename(path))
+            # Content-addressed, so images shared by many rows are stored once.
+            return self.storage.save(name, File(f, name=name))
+
+    def resolve_categories(self, names):
+        missing = set(names) - self.categories.keys()
+        if not missing:
+            return
+        ProductCategory.objects.bulk_create(
+            [ProductCategory(category=name) for name in missing],
+            ignore_conflicts=True,
+        )
+        self.categories.update(
+            ProductCategory.objects.filter(category__in=missing).values_list(
+                "category", "id"
+            )
+        )
+
+    def flush(self, batch):
+        existing = dict(
+            Product.objects.filter(sku__in=batch.keys()).values_list(
+                "sku", "product_image"
+            )
+        )
+        groups, replaced = defaultdict(list), []
+        for sku, (line, data) in list(batch.items()):
+            image = data.get("image")
+            if image is None and sku not in existing:
+                self.error(line, {"image": ["New products need an image."]})
+                del batch[sku]
+                continue
+            if image is not None and existing.get(sku) not in (None, image):
+                replaced.append(existing[sku])
+            groups[tuple(key for key in OPTIONAL_FIELDS if key in data)].append(data)
+        if not batch:
+            return
+
+        self.resolve_categories(data["category"] for _, data in batch.values())
+        try:
+            with transaction.atomic():
+                for supplied, rows in groups.items():
+                    Product.objects.bulk_create(
+                        [self.build(data) for data in rows],
+                        update_conflicts=True,
+                        unique_fields=["sku"],
+                        update_fields=UPDATE_FIELDS
+                        + [OPTIONAL_FIELDS[key] for key in supplied],
+                    )
+                release_media(*replaced, storage=self.storage)
+        except DatabaseError as exc:
+            for line, _ in batch.values():
+                self.error(line, {"row": [f"Batch failed: {exc}"]})
+            return
+
+        updated = sum(sku in existing for sku in batch)
+        self.updated += updated
+        self.created += len(batch) - updated
+        bump_generation(Product)
+
+    def build(self, data):
+        # Defaults only matter for new products; updates skip missing columns.
+        return Product(
+            sku=data["sku"],
+            name=data["name"],
+            category_id=self.categories[data["category"]],
+            description=data.get("description", ""),
+            price=data["price"],
+            old_price=data.get("old_price"),
+            product_stock=data.get("product_stock", 0),
+            active=data.get("active", True),
+            product_image=data.get("image", ""),
+        )
@@ -0,0 +1,103 @@
+import time
+from datetime import timedelta
+from decimal import Decimal
+
+from django.core.management.base import BaseCommand, CommandError
+from django.utils import timezone
+from product.fast_serializer import product_row_serializer
+from product.models import Product, ProductCategory
+from product.serializer import ProductSerializer
+from rest_framework.renderers import JSONRenderer
+from rest_framework.request import Request
+from rest_framework.test import APIRequestFactory
+
+
+class Command(BaseCommand):
+    help = (
+        "Micro-benchmark ProductSerializer against the fast .values() row "
+        "serializer on in-memory data and check both render identical JSON."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--rows", type=int, default=100)
+        parser.add_argument("--repeat", type=int, default=200)
+        parser.add_argument("--query", default="", help="e.g. 'fields=id,name'")
+
+    def handle(self, *args, **options):
+        rows = options["rows"]
+        repeat = options["repeat"]
+        request = Request(APIRequestFactory().get(f"/products/?{options['query']}"))
+
+        instances, values = self.build_rows(rows)
+        row_serializer = product_row_serializer(request)
+        context = {"request": request}
+
+        renderer = JSONRenderer()
+        slow_json = renderer.render(
+            ProductSerializer(instances, many=True, context=context).data
+        )
+        fast_json = renderer.render(row_serializer.serialize(values))
+        if slow_json != fast_json:
+            raise CommandError("Fast serializer output differs from ProductSerializer")
+
+        slow = self.time(
+            lambda: ProductSerializer(instances, many=True, context=context).data,
+            repeat,
+        )
+        fast = self.time(
+            lambda: product_row_serializer(request).serialize(values), repeat
+        )
+        self.stdout.write(f"rows per call:     {rows}")
+        self.stdout.write(f"ProductSerializer: {slow * 1000:.3f} ms/call")
+        self.stdout.write(f"row serializer:    {fast * 1000:.3f} ms/call")
+        self.stdout.write(self.style.SUCCESS(f"speedup:           {slow / fast:.1f}x"))
+
+    def time(self, func, repeat):
+        best = float("inf")
+        for _ in range(repeat):
+            start = time.perf_counter()
+            func()
+            best = min(best, time.perf_counter() - start)
+        return best
+
+    def build_rows(self, count):
+        category = ProductCategory(id=1, category="Wallets")
+        now = timezone.now()
+        instances, values = [], []
+        for i in range(1, count + 1):
+            product = Product(
+                id=i,
+                name=f"Leather wallet {i}",
+                category=category,
+                description="Full grain leather, hand stitched. " * 20,
+                price=Decimal("1499.00") + i,
+                old_price=Decimal("1999.50") if i % 2 else None,
+                product_image=f"products/wallet {i}.jpg",
+                image_variants={
+                    "source": f"products/wallet {i}.jpg",
+                    "webp": {"200": f"products/variants/wallet {i}-200w.webp"},
+                    "jpeg": {"200": f"products/variants/wallet {i}-200w.jpeg"},
+                },
+                product_stock=i % 7,
+                active=True,
+                created_at=now - timedelta(hours=i),
+                updated_at=now,
+            )
+            instances.append(product)
+            values.append(
+                {
+                    "id": product.id,
+                    "name": product.name,
+                    "category__category": category.category,
+                    "description": product.description,
+                    "price": product.price,
+                    "old_price": product.old_price,
+                    "product_stock": product.product_stock,
+                    "active": product.active,
+                    "product_image": product.product_image.name,
+                    "image_variants": product.image_variants,
+                    "created_at": product.created_at,
+                    "updated_at": product.updated_at,
+                }
+            )
+        return instances, values
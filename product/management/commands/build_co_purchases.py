@@ -0,0 +1,21 @@
+from django.core.management.base import BaseCommand
+from product.recommendations import CHUNK_SIZE, update_co_purchases
+
+
+class Command(BaseCommand):
+    help = (
+        "Add orders placed since the last run to the frequently-bought-together "
+        "counts. Run it nightly or more often; each run only reads new orders."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--rebuild",
+            action="store_true",
+            help="Drop the counts and recount the whole order history.",
+        )
+        parser.add_argument("--chunk-size", type=int, default=CHUNK_SIZE)
+
+    def handle(self, *args, **options):
+        chunks = update_co_purchases(options["chunk_size"], options["rebuild"])
+        self.stdout.write(self.style.SUCCESS(f"Counted {chunks} new order ranges"))
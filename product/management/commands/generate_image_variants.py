@@ -0,0 +1,46 @@
+from django.core.management.base import BaseCommand
+from product.images import generate_variants, variants_are_current
+from product.models import Product
+
+
+class Command(BaseCommand):
+    help = (
+        "Generate resized WebP/JPEG variants for products whose variants are "
+        "missing or were built from a previous image."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--force",
+            action="store_true",
+            help="Rebuild variants even if they match the current image.",
+        )
+        parser.add_argument("--chunk-size", type=int, default=200)
+
+    def handle(self, *args, **options):
+        force = options["force"]
+        products = (
+            Product.objects.exclude(product_image="")
+            .only("product_image", "image_variants")
+            .order_by("pk")
+        )
+        done = skipped = failed = 0
+        for product in products.iterator(chunk_size=options["chunk_size"]):
+            if not force and variants_are_current(product):
+                skipped += 1
+                continue
+            try:
+                if generate_variants(product.pk, force=force):
+                    done += 1
+                else:
+                    skipped += 1
+            except Exception as exc:
+                failed += 1
+                self.stderr.write(f"Product {product.pk}: {exc}")
+
+        self.stdout.write(
+            self.style.SUCCESS(
+                f"Generated variants for {done} products "
+                f"({skipped} skipped, {failed} failed)"
+            )
+        )
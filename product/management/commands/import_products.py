@@ -0,0 +1,52 @@
+from django.core.management.base import BaseCommand, CommandError
+from product.importer import (
+    BATCH_SIZE,
+    MAX_REPORTED_ERRORS,
+    ProductImporter,
+    import_format,
+    read_rows,
+)
+
+
+class Command(BaseCommand):
+    help = (
+        "Create or update products from a CSV or JSON Lines file, matching "
+        "existing products on sku. Run generate_image_variants afterwards."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("path")
+        parser.add_argument(
+            "--format",
+            choices=["csv", "jsonl"],
+            help="File format; guessed from the extension by default.",
+        )
+        parser.add_argument(
+            "--images",
+            help="Directory the image column's paths are relative to.",
+        )
+        parser.add_argument("--batch-size", type=int, default=BATCH_SIZE)
+
+    def handle(self, *args, **options):
+        fmt = options["format"] or import_format(options["path"])
+        if fmt is None:
+            raise CommandError("Unknown file format, pass --format.")
+        try:
+            stream = open(options["path"], "rb")
+        except OSError as exc:
+            raise CommandError(exc)
+
+        importer = ProductImporter(options["images"], options["batch_size"])
+        with stream:
+            report = importer.run(read_rows(stream, fmt))
+
+        for error in report["errors"]:
+            self.stderr.write(f"Line {error['line']}: {error['errors']}")
+        if report["failed"] > MAX_REPORTED_ERRORS:
+            self.stderr.write(f"... and {report['failed'] - MAX_REPORTED_ERRORS} more")
+        self.stdout.write(
+            self.style.SUCCESS(
+                f"Created {report['created']} and updated {report['updated']} "
+                f"products ({report['failed']} rows failed)"
+            )
+        )
@@ -0,0 +1,25 @@
+from django.core.management.base import BaseCommand
+from django.db import transaction
+from product.models import Product
+from product.popularity import historical_scores
+
+
+class Command(BaseCommand):
+    help = (
+        "Recompute product popularity scores from all orders, cart rows and "
+        "wishlist rows. Needed once after the field is added; the scores are "
+        "kept up to date by signals afterwards."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--chunk-size", type=int, default=2000)
+
+    def handle(self, *args, **options):
+        scores = historical_scores(options["chunk_size"])
+        products = [Product(pk=pk, popularity=score) for pk, score in scores.items()]
+        with transaction.atomic():
+            Product.objects.update(popularity=0)
+            Product.objects.bulk_update(
+                products, ["popularity"], batch_size=options["chunk_size"]
+            )
+        self.stdout.write(self.style.SUCCESS(f"Scored {len(products)} products"))
@@ -0,0 +1,27 @@
+from accesories_backend.storage import MediaBusy, delete_unreferenced, orphaned_media
+from django.core.management.base import BaseCommand
+
+
+class Command(BaseCommand):
+    help = (
+        "Delete stored product images and profile pictures that no row "
+        "references, such as files a release skipped because a concurrent "
+        "save had just claimed them. Run it periodically."
+    )
+
+    def handle(self, *args, **options):
+        deleted = skipped = 0
+        for name in orphaned_media():
+            try:
+                if delete_unreferenced(name):
+                    deleted += 1
+                    continue
+            except MediaBusy:
+                pass
+            skipped += 1
+
+        self.stdout.write(
+            self.style.SUCCESS(
+                f"Deleted {deleted} orphaned files ({skipped} claimed or busy)"
+            )
+        )
@@ -0,0 +1,37 @@
+"""
+Per-user "in wishlist" / "in cart" flags on product responses.
+
+annotate_membership() adds ``in_wishlist`` (EXISTS) and ``cart_quantity``
+(a correlated subquery, 0 when the product is not in the cart) to a product
+queryset, so the flags come back in the same statement as the products.
+Cart and wishlist writes bump the user's Cart / Wishlist generations, which
+go into the ETags of responses carrying the flags.
+"""
+
+from accesories_backend.cache import get_generation
+from cart.models import Cart
+from django.db.models import Exists, IntegerField, OuterRef, Subquery, Value
+from django.db.models.functions import Coalesce
+from wishlist.models import Wishlist
+
+MEMBERSHIP_MAX_IDS = 100
+
+
+def annotate_membership(queryset, user):
+    in_cart = Cart.objects.filter(user=user, product=OuterRef("pk"))
+    return queryset.annotate(
+        in_wishlist=Exists(Wishlist.objects.filter(user=user, product=OuterRef("pk"))),
+        cart_quantity=Coalesce(
+            Subquery(in_cart.values("quantity")[:1]),
+            Value(0),
+            output_field=IntegerField(),
+        ),
+    )
+
+
+def membership_validators(request):
+    """ETag parts for responses that carry the flags of ``request.user``."""
+    user = request.user
+    if not user.is_authenticated:
+        return []
+    return [user.pk, get_generation(Cart, user.pk), get_generation(Wishlist, user.pk)]
@@ -0,0 +1,75 @@
+# Generated by Django 5.2.7 on 2026-10-17 17:12
+
+import django.contrib.postgres.indexes
+import django.contrib.postgres.search
+from django.db import migrations
+
+# Keep product.search_vector in sync inside the database so bulk writes
+# (bulk_create, queryset.update, raw SQL) are indexed as well.
+# Weights: name (A) > category (B) > description (C).
+CREATE_TRIGGERS = """
+CREATE OR REPLACE FUNCTION product_search_vector_update() RETURNS trigger AS $$
+BEGIN
+    NEW.search_vector :=
+        setweight(to_tsvector('english', coalesce(NEW.name, '')), 'A') ||
+        setweight(to_tsvector('english', coalesce(
+            (SELECT category FROM product_productcategory WHERE id = NEW.category_id),
+            ''
+        )), 'B') ||
+        setweight(to_tsvector('english', coalesce(NEW.description, '')), 'C');
+    RETURN NEW;
+END
+$$ LANGUAGE plpgsql;
+
+CREATE TRIGGER product_search_vector_trigger
+    BEFORE INSERT OR UPDATE OF name, description, category_id
+    ON product_product
+    FOR EACH ROW EXECUTE FUNCTION product_search_vector_update();
+
+CREATE OR REPLACE FUNCTION product_category_search_vector_update() RETURNS trigger AS $$
+BEGIN
+    UPDATE product_product SET name = name WHERE category_id = NEW.id;
+    RETURN NULL;
+END
+$$ LANGUAGE plpgsql;
+
+CREATE TRIGGER product_category_search_vector_trigger
+    AFTER UPDATE OF category
+    ON product_productcategory
+    FOR EACH ROW
+    WHEN (OLD.category IS DISTINCT FROM NEW.category)
+    EXECUTE FUNCTION product_category_search_vector_update();
+
+UPDATE product_product SET name = name;
+"""
+
+DROP_TRIGGERS = """
+DROP TRIGGER IF EXISTS product_category_search_vector_trigger ON product_productcategory;
+DROP FUNCTION IF EXISTS product_category_search_vector_update();
+DROP TRIGGER IF EXISTS product_search_vector_trigger ON product_product;
+DROP FUNCTION IF EXISTS product_search_vector_update();
+"""
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("product", "0001_initial"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="product",
+            name="search_vector",
+            field=django.contrib.postgres.search.SearchVectorField(
+                editable=False, null=True
+            ),
+        ),
+        migrations.AddIndex(
+            model_name="product",
+            index=django.contrib.postgres.indexes.GinIndex(
+                fields=["search_vector"], name="product_search_vector_gin"
+            ),
+        ),
+        migrations.RunSQL(CREATE_TRIGGERS, DROP_TRIGGERS),
+    ]
@@ -0,0 +1,53 @@
+# Generated by Django 5.2.7 on 2026-10-17 17:27
+
+from django.contrib.postgres.operations import AddIndexConcurrently
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+    # Build the indexes without locking product writes.
+    atomic = False
+
+    dependencies = [
+        ("product", "0003_trigram_indexes"),
+    ]
+
+    operations = [
+        AddIndexConcurrently(
+            model_name="product",
+            index=models.Index(
+                fields=["active", "-created_at"], name="product_active_created"
+            ),
+        ),
+        AddIndexConcurrently(
+            model_name="product",
+            index=models.Index(
+                fields=["category", "active", "price"],
+                name="product_category_active_price",
+            ),
+        ),
+        AddIndexConcurrently(
+            model_name="product",
+            index=models.Index(fields=["created_at"], name="product_created_at"),
+        ),
+        AddIndexConcurrently(
+            model_name="product",
+            index=models.Index(fields=["price"], name="product_price"),
+        ),
+        AddIndexConcurrently(
+            model_name="product",
+            index=models.Index(fields=["name"], name="product_name"),
+        ),
+        AddIndexConcurrently(
+            model_name="product",
+            index=models.Index(fields=["product_stock"], name="product_stock"),
+        ),
+        AddIndexConcurrently(
+            model_name="product",
+            index=models.Index(
+                condition=models.Q(("product_stock", 0)),
+                fields=["-created_at"],
+                name="product_out_of_stock",
+            ),
+        ),
+    ]
@@ -0,0 +1,27 @@
+# Generated by Django 5.2.7 on 2026-10-17 18:06
+
+from django.contrib.postgres.operations import AddIndexConcurrently
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+    # Build the index without locking product writes.
+    atomic = False
+
+    dependencies = [
+        ("product", "0007_co_purchases"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="product",
+            name="popularity",
+            field=models.FloatField(default=0, editable=False),
+        ),
+        AddIndexConcurrently(
+            model_name="product",
+            index=models.Index(
+                fields=["active", "-popularity"], name="product_active_popularity"
+            ),
+        ),
+    ]
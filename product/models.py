@@ -1,3 +1,5 @@
+from django.contrib.postgres.indexes import GinIndex
+from django.contrib.postgres.search import SearchVectorField
 from django.db import models
 
 
@@ -12,6 +14,8 @@ class ProductCategory(models.Model):
 class Product(models.Model):
 
     name = models.CharField(max_length=255)
+    # Supplier stock keeping unit; the key bulk imports upsert on.
+    sku = models.CharField(max_length=64, unique=True, null=True, blank=True)
     category = models.ForeignKey(ProductCategory, on_delete=models.CASCADE)
     description = models.TextField()
     price = models.DecimalField(max_digits=10, decimal_places=2)
@@ -23,6 +27,81 @@ class Product(models.Model):
     active = models.BooleanField(default=True)
     created_at = models.DateTimeField(auto_now_add=True)
     updated_at = models.DateTimeField(auto_now=True)
+    # Time-decayed order/cart/wishlist activity, see product/popularity.py.
+    popularity = models.FloatField(default=0, editable=False)
+    # Resized copies of product_image, see product/images.py.
+    image_variants = models.JSONField(default=dict, blank=True, editable=False)
+
+    # Maintained by a database trigger, never written from Python.
+    search_vector = SearchVectorField(null=True, editable=False)
+
+    class Meta:
+        indexes = [
+            GinIndex(fields=["search_vector"], name="product_search_vector_gin"),
+            GinIndex(
+                fields=["name"], name="product_name_trgm", opclasses=["gin_trgm_ops"]
+            ),
+            GinIndex(
+                fields=["description"],
+                name="product_description_trgm",
+                opclasses=["gin_trgm_ops"],
+            ),
+            # Storefront list: active products, newest first or by price
+            # within a category.
+            models.Index(
+                fields=["active", "-created_at"], name="product_active_created"
+            ),
+            models.Index(
+                fields=["active", "-popularity"], name="product_active_popularity"
+            ),
+            models.Index(
+                fields=["category", "active", "price"],
+                name="product_category_active_price",
+            ),
+            # Admin list sorts run over all rows, active or not.
+            models.Index(fields=["created_at"], name="product_created_at"),
+            models.Index(fields=["price"], name="product_price"),
+            models.Index(fields=["name"], name="product_name"),
+            models.Index(fields=["product_stock"], name="product_stock"),
+            models.Index(
+                fields=["-created_at"],
+                name="product_out_of_stock",
+                condition=models.Q(product_stock=0),
+            ),
+        ]
 
     def __str__(self):
         return self.name
+
+
+class ProductCoPurchase(models.Model):
+    """
+    How often ``related`` was bought by the same customer within
+    CO_PURCHASE_WINDOW of ``product``; maintained by product/recommendations.py.
+    Each pair is stored in both directions so top-N reads hit one index.
+    """
+
+    product = models.ForeignKey(
+        Product, on_delete=models.CASCADE, related_name="co_purchases"
+    )
+    related = models.ForeignKey(
+        Product, on_delete=models.CASCADE, related_name="co_purchased_by"
+    )
+    count = models.PositiveIntegerField(default=0)
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(
+                fields=["product", "related"], name="product_copurchase_pair"
+            ),
+        ]
+        indexes = [
+            models.Index(fields=["product", "-count"], name="product_copurchase_top"),
+        ]
+
+
+class CoPurchaseProgress(models.Model):
+    """Single row: the last order already counted into ProductCoPurchase."""
+
+    last_order_id = models.BigIntegerField(default=0)
+    updated_at = models.DateTimeField(auto_now=True)
@@ -0,0 +1,188 @@
+import base64
+import binascii
+import json
+import math
+from collections import OrderedDict
+
+from django.core.exceptions import ValidationError
+from django.db.models import Q
+from rest_framework.exceptions import NotFound
+from rest_framework.pagination import BasePagination
+from rest_framework.response import Response
+from rest_framework.settings import api_settings
+from rest_framework.utils.urls import remove_query_param, replace_query_param
+
+# Largest primary key a cursor may carry (bigint).
+MAX_CURSOR_ID = 2**63 - 1
+
+
+class ProductKeysetPagination(BasePagination):
+    """
+    Opt-in cursor pagination for the product list (``?pagination=cursor``).
+
+    Pages seek on ``(created_at, id)``, ``(price, id)`` or ``(popularity,
+    id)`` depending on the requested ordering instead of using OFFSET, and
+    no COUNT(*) is run, so every page costs the same no matter how deep the
+    client scrolls.
+    Cursors are opaque base64 tokens returned in ``next`` / ``previous``.
+    """
+
+    cursor_query_param = "cursor"
+    mode_query_param = "pagination"
+    ordering_param = api_settings.ORDERING_PARAM
+    page_size = 10
+    page_size_query_param = "page_size"
+    max_page_size = 100
+    invalid_cursor_message = "Invalid cursor"
+
+    # Requested ordering -> seek keys (the id tie-breaker keeps keys unique).
+    orderings = {
+        "-created_at": ("created_at", True),
+        "created_at": ("created_at", False),
+        "-price": ("price", True),
+        "price": ("price", False),
+        "-popularity": ("popularity", True),
+        "popularity": ("popularity", False),
+    }
+    default_ordering = "-created_at"
+
+    @classmethod
+    def is_requested(cls, request):
+        params = request.query_params
+        return (
+            cls.cursor_query_param in params
+            or params.get(cls.mode_query_param) == "cursor"
+        )
+
+    def get_page_size(self, request):
+        try:
+            size = int(request.query_params[self.page_size_query_param])
+        except (KeyError, ValueError):
+            return self.page_size
+        if size <= 0:
+            return self.page_size
+        return min(size, self.max_page_size)
+
+    def get_ordering(self, request):
+        requested = request.query_params.get(self.ordering_param, "")
+        first = requested.split(",")[0].strip()
+        return first if first in self.orderings else self.default_ordering
+
+    def encode_cursor(self, value, pk, reverse):
+        payload = {"o": self.ordering, "v": str(value), "id": pk, "r": reverse}
+        raw = json.dumps(payload, separators=(",", ":")).encode()
+        return base64.urlsafe_b64encode(raw).decode().rstrip("=")
+
+    def decode_cursor(self, request):
+        encoded = request.query_params.get(self.cursor_query_param)
+        if not encoded:
+            return None
+        try:
+            padded = encoded + "=" * (-len(encoded) % 4)
+            payload = json.loads(base64.urlsafe_b64decode(padded))
+            if payload["o"] != self.ordering:
+                raise ValueError("cursor was issued for another ordering")
+            field = self.model._meta.get_field(self.orderings[self.ordering][0])
+            value = field.to_python(payload["v"])
+            pk = int(payload["id"])
+            if value is None or isinstance(value, float) and not math.isfinite(value):
+                raise ValueError("cursor value is missing or not finite")
+            if not 0 < pk <= MAX_CURSOR_ID or not isinstance(payload["r"], bool):
+                raise ValueError("cursor id or direction is out of range")
+            return value, pk, payload["r"]
+        except (binascii.Error, KeyError, TypeError, ValueError, ValidationError):
+            raise NotFound(self.invalid_cursor_message)
+
+    def seek(self, queryset, field, descending, value, pk):
+        if descending:
+            after = Q(**{f"{field}__lt": value}) | Q(**{field: value, "pk__lt": pk})
+        else:
+            after = Q(**{f"{field}__gt": value}) | Q(**{field: value, "pk__gt": pk})
+        return queryset.filter(after)
+
+    def paginate_queryset(self, queryset, request, view=None):
+        self.request = request
+        self.base_url = request.build_absolute_uri()
+        self.model = queryset.model
+        self.page_size = self.get_page_size(request)
+        self.ordering = self.get_ordering(request)
+        field, descending = self.orderings[self.ordering]
+
+        cursor = self.decode_cursor(request)
+        reverse = bool(cursor and cursor[2])
+        # Walking backwards is a forward walk over the flipped ordering.
+        walk_descending = descending != reverse
+        prefix = "-" if walk_descending else ""
+        queryset = queryset.order_by(f"{prefix}{field}", f"{prefix}pk")
+        if cursor:
+            queryset = self.seek(queryset, field, walk_descending, *cursor[:2])
+
+        rows = list(queryset[: self.page_size + 1])
+        has_more = len(rows) > self.page_size
+        rows = rows[: self.page_size]
+        if reverse:
+            rows.reverse()
+
+        self.field = field
+        self.has_next = has_more if not reverse else cursor is not None
+        self.has_previous = has_more if reverse else cursor is not None
+        self.first = rows[0] if rows else None
+        self.last = rows[-1] if rows else None
+        return rows
+
+    def get_link(self, row, reverse):
+        if row is None:
+            return None
+        if isinstance(row, dict):
+            value, pk = row[self.field], row["id"]
+        else:
+            value, pk = getattr(row, self.field), row.pk
+        token = self.encode_cursor(value, pk, reverse)
+        url = remove_query_param(self.base_url, self.mode_query_param)
+        return replace_query_param(url, self.cursor_query_param, token)
+
+    def get_next_link(self):
+        return self.get_link(self.last, False) if self.has_next else None
+
+    def get_previous_link(self):
+        return self.get_link(self.first, True) if self.has_previous else None
+
+    def get_paginated_response(self, data):
+        return Response(
+            OrderedDict(
+                [
+                    ("next", self.get_next_link()),
+                    ("previous", self.get_previous_link()),
+                    ("results", data),
+                ]
+            )
+        )
+
+    def get_paginated_response_schema(self, schema):
+        return {
+            "type": "object",
+            "required": ["results"],
+            "properties": {
+                "next": {"type": "string", "nullable": True, "format": "uri"},
+                "previous": {"type": "string", "nullable": True, "format": "uri"},
+                "results": schema,
+            },
+        }
+
+    def get_schema_operation_parameters(self, view):
+        return [
+            {
+                "name": self.mode_query_param,
+                "required": False,
+                "in": "query",
+                "description": "Set to 'cursor' to use keyset pagination.",
+                "schema": {"type": "string", "enum": ["cursor"]},
+            },
+            {
+                "name": self.cursor_query_param,
+                "required": False,
+                "in": "query",
+                "description": "Opaque cursor from a previous next/previous link.",
+                "schema": {"type": "string"},
+            },
+        ]
@@ -0,0 +1,74 @@
+"""
+Time-decayed popularity scores.
+
+A product's popularity is the sum of its order, cart-add and wishlist-add
+events, each weighted by EVENT_WEIGHTS and halved every HALF_LIFE. Instead
+of decaying every row as time passes, each event adds
+``weight * 2 ** ((event time - EPOCH) / HALF_LIFE)`` (forward decay).
+Every score would be scaled by the same factor at read time, so ordering
+by the stored column gives the decayed ranking. Each event is a single
+``popularity = popularity + x`` UPDATE, and the column is indexed like
+price. With a 14 day half-life the values stay within float range for
+decades; ``rebuild_popularity`` recomputes them from the history.
+"""
+
+import math
+import time
+from collections import defaultdict
+from datetime import datetime, timedelta, timezone
+
+from cart.models import Cart
+from django.db.models import F
+from order.models import Order
+from wishlist.models import Wishlist
+
+from .models import Product
+
+EPOCH = datetime(2025, 1, 1, tzinfo=timezone.utc)
+HALF_LIFE = timedelta(days=14)
+EVENT_WEIGHTS = {"order": 5.0, "cart": 2.0, "wishlist": 1.0}
+
+# Responses sorted by popularity are cached for at most this long; score
+# updates do not bump the catalog generation.
+POPULARITY_REFRESH = 15 * 60
+
+
+def event_score(event, at):
+    elapsed = (at - EPOCH) / HALF_LIFE
+    return EVENT_WEIGHTS[event] * math.pow(2.0, elapsed)
+
+
+def record_event(product_id, event, at):
+    Product.objects.filter(pk=product_id).update(
+        popularity=F("popularity") + event_score(event, at)
+    )
+
+
+def record_events(product_ids, event, at, count=1):
+    """record_event() ``count`` times for several products with one UPDATE."""
+    Product.objects.filter(pk__in=product_ids).update(
+        popularity=F("popularity") + count * event_score(event, at)
+    )
+
+
+def popularity_window():
+    """Changes every POPULARITY_REFRESH seconds; part of cache keys/ETags."""
+    return int(time.time() // POPULARITY_REFRESH)
+
+
+def is_popularity_ordering(request):
+    return "popularity" in request.query_params.get("ordering", "")
+
+
+def historical_scores(chunk_size=2000):
+    """Scores recomputed from all orders, cart rows and wishlist rows."""
+    scores = defaultdict(float)
+    sources = (
+        ("order", Order.objects.values_list("product_id", "created_at")),
+        ("cart", Cart.objects.values_list("product_id", "added_at")),
+        ("wishlist", Wishlist.objects.values_list("product_id", "added_at")),
+    )
+    for event, rows in sources:
+        for product_id, at in rows.iterator(chunk_size=chunk_size):
+            scores[product_id] += event_score(event, at)
+    return scores
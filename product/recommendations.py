@@ -0,0 +1,139 @@
+"""
+"Frequently bought together" recommendations from the order history.
+
+update_co_purchases() handles orders placed since its last run. For each
+one it counts the other products the same customer ordered within
+CO_PURCHASE_WINDOW before it, and adds those counts to ProductCoPurchase.
+A pair of orders is counted once, when the later of the two is processed.
+CoPurchaseProgress stores how far the job got. Each run therefore reads
+only new orders, in id ranges committed together with the new watermark.
+
+Cancelled and returned orders are not counted. Counts are not taken back
+when an order is cancelled later; ``build_co_purchases --rebuild`` starts
+over from the full history.
+"""
+
+from collections import defaultdict
+from datetime import timedelta
+
+from accesories_backend.cache import bump_generation
+from django.db import transaction
+from django.db.models import Count, F, Max
+from django.utils import timezone
+from order.models import Order
+
+from .models import CoPurchaseProgress, Product, ProductCoPurchase
+
+CO_PURCHASE_WINDOW = timedelta(days=90)
+EXCLUDED_STATUSES = ("CANCELLED", "RETURNED")
+# Orders younger than this are left for the next run, so rows from
+# transactions that commit out of id order are not skipped.
+SETTLE_DELAY = timedelta(minutes=5)
+CHUNK_SIZE = 10000
+
+RELATED_LIMIT = 10
+RELATED_MAX_LIMIT = 50
+
+
+def counted_statuses():
+    return [
+        status
+        for status, _ in Order.ORDER_STATUS_CHOICES
+        if status not in EXCLUDED_STATUSES
+    ]
+
+
+def pair_counts(low, high):
+    """
+    Co-purchase counts for the orders with ``low < id <= high``, as
+    ``{(product_id, related_id): count}`` in both directions.
+    """
+    statuses = counted_statuses()
+    # Each row is an earlier order joined to a later order of the same
+    # customer (user__orders) in the id range.
+    rows = (
+        Order.objects.filter(
+            order_status__in=statuses,
+            user__orders__id__gt=low,
+            user__orders__id__lte=high,
+            user__orders__order_status__in=statuses,
+            id__lt=F("user__orders__id"),
+            created_at__gte=F("user__orders__created_at") - CO_PURCHASE_WINDOW,
+        )
+        .order_by()
+        .values_list("product_id", "user__orders__product_id")
+        .annotate(orders=Count("id"))
+    )
+    pairs = defaultdict(int)
+    for earlier, later, orders in rows:
+        if earlier != later:
+            pairs[earlier, later] += orders
+            pairs[later, earlier] += orders
+    return pairs
+
+
+def add_counts(pairs):
+    existing = {
+        (product_id, related_id): count
+        for product_id, related_id, count in ProductCoPurchase.objects.filter(
+            product_id__in={product_id for product_id, _ in pairs},
+            related_id__in={related_id for _, related_id in pairs},
+        ).values_list("product_id", "related_id", "count")
+    }
+    ProductCoPurchase.objects.bulk_create(
+        [
+            ProductCoPurchase(
+                product_id=product_id,
+                related_id=related_id,
+                count=existing.get((product_id, related_id), 0) + count,
+            )
+            for (product_id, related_id), count in pairs.items()
+        ],
+        update_conflicts=True,
+        unique_fields=["product", "related"],
+        update_fields=["count"],
+        batch_size=1000,
+    )
+
+
+def update_co_purchases(chunk_size=CHUNK_SIZE, rebuild=False):
+    """Count the orders placed since the last run; returns how many ranges ran."""
+    CoPurchaseProgress.objects.get_or_create(pk=1)
+    if rebuild:
+        with transaction.atomic():
+            CoPurchaseProgress.objects.select_for_update().filter(pk=1).update(
+                last_order_id=0
+            )
+            ProductCoPurchase.objects.all().delete()
+        bump_generation(ProductCoPurchase)
+
+    cutoff = timezone.now() - SETTLE_DELAY
+    last_id = (
+        Order.objects.filter(created_at__lt=cutoff).aggregate(Max("id"))["id__max"] or 0
+    )
+    chunks = 0
+    while True:
+        with transaction.atomic():
+            # The lock keeps concurrent runs from counting a range twice.
+            progress = CoPurchaseProgress.objects.select_for_update().get(pk=1)
+            low = progress.last_order_id
+            if low >= last_id:
+                break
+            high = min(low + chunk_size, last_id)
+            pairs = pair_counts(low, high)
+            if pairs:
+                add_counts(pairs)
+            progress.last_order_id = high
+            progress.save(update_fields=["last_order_id", "updated_at"])
+        chunks += 1
+
+    if chunks:
+        bump_generation(ProductCoPurchase)
+    return chunks
+
+
+def related_products(product_id):
+    """Active products bought together with ``product_id``, most often first."""
+    return Product.objects.filter(
+        active=True, co_purchased_by__product_id=product_id
+    ).order_by("-co_purchased_by__count", "pk")
@@ -0,0 +1,67 @@
+from django.contrib.postgres.search import SearchQuery, SearchRank
+from django.db.models import F
+from rest_framework import filters
+from rest_framework.settings import api_settings
+
+# Text search configuration used by the search_vector trigger (see
+# product/migrations/0002_product_search_vector.py). Queries must use the
+# same configuration or stemmed terms will not match.
+SEARCH_CONFIG = "english"
+
+
+class ProductSearchFilter(filters.BaseFilterBackend):
+    """
+    Full-text search over Product.search_vector (GIN indexed).
+
+    The vector is weighted name (A) > category (B) > description (C) and
+    matching rows are annotated with ``relevance``. When no explicit
+    ordering is requested, results are returned most relevant first.
+    """
+
+    search_param = api_settings.SEARCH_PARAM
+    ordering_param = api_settings.ORDERING_PARAM
+
+    def get_search_query(self, request):
+        term = request.query_params.get(self.search_param, "")
+        term = term.replace("\x00", "").strip()
+        if not term:
+            return None
+        return SearchQuery(term, config=SEARCH_CONFIG, search_type="websearch")
+
+    def filter_queryset(self, request, queryset, view):
+        query = self.get_search_query(request)
+        if query is None:
+            return queryset
+
+        queryset = queryset.filter(search_vector=query).annotate(
+            relevance=SearchRank(F("search_vector"), query)
+        )
+        if not request.query_params.get(self.ordering_param):
+            queryset = queryset.order_by("-relevance", "-created_at")
+        return queryset
+
+    def get_schema_operation_parameters(self, view):
+        return [
+            {
+                "name": self.search_param,
+                "required": False,
+                "in": "query",
+                "description": "Full-text search on name, category and description.",
+                "schema": {"type": "string"},
+            },
+        ]
+
+
+class ProductOrderingFilter(filters.OrderingFilter):
+    """
+    OrderingFilter that understands ``relevance``.
+
+    ``relevance`` only exists when ProductSearchFilter annotated the
+    queryset, so it is dropped silently for requests without a search term.
+    """
+
+    def remove_invalid_fields(self, queryset, fields, view, request):
+        valid = super().remove_invalid_fields(queryset, fields, view, request)
+        if "relevance" not in queryset.query.annotations:
+            valid = [term for term in valid if term.lstrip("-") != "relevance"]
+        return valid
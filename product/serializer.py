@@ -1,7 +1,52 @@
+from decimal import Decimal
+
+from accesories_backend.serializers import SparseFieldsetMixin
 from rest_framework import serializers
 
+from .images import variant_urls
 from .models import Product, ProductCategory
 
+# Largest value of Product.price and old_price (max_digits=10, 2 places).
+MAX_PRICE = Decimal("99999999.99")
+
+
+def media_request(context):
+    """
+    The request to build absolute media URLs with, or None for relative ones.
+    Cart, wishlist and user order responses have always had relative image
+    URLs; their views set ``relative_media_urls`` and pass the request only
+    for ?fields=, ?omit= and ?expand=.
+    """
+    if context.get("relative_media_urls"):
+        return None
+    return context.get("request")
+
+
+class MediaImageField(serializers.ImageField):
+    """ImageField(use_url=True) honouring ``relative_media_urls``."""
+
+    def to_representation(self, value):
+        if not value:
+            return None
+        request = media_request(self.context)
+        return (
+            request.build_absolute_uri(value.url) if request is not None else value.url
+        )
+
+
+class ImageVariantsField(serializers.ReadOnlyField):
+    """``image_variants`` as format -> width -> URL."""
+
+    def to_representation(self, value):
+        request = media_request(self.context)
+        storage = Product._meta.get_field("product_image").storage
+
+        def media_url(name):
+            url = storage.url(name)
+            return request.build_absolute_uri(url) if request is not None else url
+
+        return variant_urls(value, media_url)
+
 
 class ProductCategorySerializer(serializers.ModelSerializer):
     class Meta:
@@ -9,9 +54,10 @@ class ProductCategorySerializer(serializers.ModelSerializer):
         fields = ["id", "category"]
 
 
-class ProductSerializer(serializers.ModelSerializer):
+class ProductSerializer(SparseFieldsetMixin, serializers.ModelSerializer):
     category = serializers.StringRelatedField()
-    product_image = serializers.ImageField(use_url=True)
+    product_image = MediaImageField()
+    image_variants = ImageVariantsField()
 
     class Meta:
         model = Product
@@ -25,6 +71,50 @@ class ProductSerializer(serializers.ModelSerializer):
             "product_stock",
             "active",
             "product_image",
+            "image_variants",
             "created_at",
             "updated_at",
         ]
+
+
+MEMBERSHIP_FIELDS = ["in_wishlist", "cart_quantity"]
+
+
+class ProductMembershipSerializer(ProductSerializer):
+    """ProductSerializer plus the flags added by annotate_membership()."""
+
+    in_wishlist = serializers.BooleanField(read_only=True)
+    cart_quantity = serializers.IntegerField(read_only=True)
+
+    class Meta(ProductSerializer.Meta):
+        fields = ProductSerializer.Meta.fields + MEMBERSHIP_FIELDS
+
+
+class ProductImportRowSerializer(serializers.Serializer):
+    """
+    One row of a bulk import file (product/importer.py). Optional columns
+    have no defaults here: a missing column leaves an existing product's
+    value alone, and new products get the model defaults.
+    """
+
+    sku = serializers.CharField(max_length=64)
+    name = serializers.CharField(max_length=255)
+    category = serializers.CharField(max_length=50)
+    description = serializers.CharField(required=False, allow_blank=True)
+    price = serializers.DecimalField(
+        max_digits=10, decimal_places=2, min_value=0, max_value=MAX_PRICE
+    )
+    old_price = serializers.DecimalField(
+        max_digits=10,
+        decimal_places=2,
+        min_value=0,
+        max_value=MAX_PRICE,
+        required=False,
+        allow_null=True,
+    )
+    product_stock = serializers.IntegerField(
+        min_value=0, max_value=2147483647, required=False
+    )
+    active = serializers.BooleanField(required=False)
+    # Path of the image file, relative to the import's image directory.
+    image = serializers.CharField(required=False)
@@ -0,0 +1,64 @@
+from accesories_backend.cache import bump_generation
+from accesories_backend.storage import release_media, stored_name
+from django.db.models.signals import post_delete, post_init, post_save
+from django.dispatch import receiver
+
+from .images import release_variants, schedule_variants
+from .popularity import record_event
+from .models import Product, ProductCategory
+
+
+@receiver(post_save, sender=Product)
+@receiver(post_delete, sender=Product)
+@receiver(post_save, sender=ProductCategory)
+@receiver(post_delete, sender=ProductCategory)
+def bump_catalog_generation(sender, **kwargs):
+    # Category names are part of product filters, so both bump Product.
+    bump_generation(Product)
+
+
+@receiver(post_save, sender=Product)
+def queue_image_variants(sender, instance, raw=False, update_fields=None, **kwargs):
+    if raw or (update_fields is not None and "product_image" not in update_fields):
+        return
+    # Partially loaded instances did not touch the image.
+    if {"product_image", "image_variants"} & instance.get_deferred_fields():
+        return
+    schedule_variants(instance)
+
+
+@receiver(post_init, sender=Product)
+def remember_loaded_image(sender, instance, **kwargs):
+    instance._loaded_image = stored_name(instance.__dict__.get("product_image"))
+
+
+@receiver(post_save, sender=Product)
+def release_replaced_image(sender, instance, created=False, raw=False, **kwargs):
+    if raw or "product_image" in instance.get_deferred_fields():
+        return
+    # A new row replaced nothing. The old variants are released once the
+    # new ones exist (images.py).
+    loaded = instance._loaded_image
+    if not created and loaded and loaded != instance.product_image.name:
+        release_media(loaded)
+    instance._loaded_image = instance.product_image.name
+
+
+@receiver(post_delete, sender=Product)
+def release_product_media(sender, instance, **kwargs):
+    if "product_image" not in instance.get_deferred_fields():
+        release_media(instance.product_image.name)
+    if "image_variants" not in instance.get_deferred_fields():
+        release_variants(instance.image_variants)
+
+
+@receiver(post_save, sender="order.Order")
+@receiver(post_save, sender="cart.Cart")
+@receiver(post_save, sender="wishlist.Wishlist")
+def record_popularity_event(sender, instance, created=False, raw=False, **kwargs):
+    if not created or raw:
+        return
+    # EVENT_WEIGHTS is keyed by the sender's app label.
+    event = sender._meta.app_label
+    at = instance.created_at if event == "order" else instance.added_at
+    record_event(instance.product_id, event, at)
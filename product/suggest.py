@@ -0,0 +1,116 @@
+"""
+Typeahead suggestions for product names.
+
+Each process keeps a SuggestIndex in memory. It holds every word of every
+active product name, case-folded and sorted, so finding the words that
+start with a prefix is one bisect. The index is rebuilt from one query
+when the catalog generation changes. A suggestion request therefore costs
+one cache read for the generation and a lookup in memory, with no SQL.
+
+Every typed word must start a word of the name. Names that start with the
+whole query rank first, then the more popular products.
+"""
+
+import heapq
+import re
+import threading
+from bisect import bisect_left
+from collections import namedtuple
+
+from accesories_backend.cache import get_generation
+
+from .models import Product
+
+SUGGEST_LIMIT = 8
+SUGGEST_MAX_LIMIT = 20
+MIN_QUERY_LENGTH = 2
+WORD = re.compile(r"\w+")
+
+Suggestion = namedtuple("Suggestion", "id name image words folded_name")
+
+
+def fold_words(text):
+    return WORD.findall(text.casefold())
+
+
+def thumbnail_name(image, variants):
+    """The smallest WebP variant if it matches the image, else the image."""
+    variants = variants or {}
+    if image and variants.get("source") == image:
+        sizes = variants.get("webp") or {}
+        if sizes:
+            return sizes[min(sizes, key=int)]
+    return image
+
+
+class SuggestIndex:
+    def __init__(self, rows, generation=None):
+        """``rows`` are (id, name, product_image, image_variants), best first."""
+        self.generation = generation
+        self.products = []
+        entries = []
+        for rank, (pk, name, image, variants) in enumerate(rows):
+            words = tuple(fold_words(name))
+            self.products.append(
+                Suggestion(
+                    pk, name, thumbnail_name(image, variants), words, " ".join(words)
+                )
+            )
+            entries.extend((word, rank) for word in set(words))
+        entries.sort()
+        self.words = [word for word, _ in entries]
+        self.ranks = [rank for _, rank in entries]
+
+    def prefix_ranks(self, prefix):
+        start = bisect_left(self.words, prefix)
+        end = bisect_left(self.words, prefix + "\U0010ffff", start)
+        return self.ranks[start:end]
+
+    def search(self, query, limit=SUGGEST_LIMIT):
+        tokens = fold_words(query)
+        if not tokens:
+            return []
+        # The longest word has the narrowest range; check the rest per product.
+        narrowest = max(tokens, key=len)
+        others = list(tokens)
+        others.remove(narrowest)
+        products = self.products
+
+        def matches(rank):
+            words = products[rank].words
+            return all(any(word.startswith(t) for word in words) for t in others)
+
+        phrase = " ".join(tokens)
+        candidates = {rank for rank in self.prefix_ranks(narrowest) if matches(rank)}
+        best = heapq.nsmallest(
+            limit,
+            candidates,
+            key=lambda rank: (not products[rank].folded_name.startswith(phrase), rank),
+        )
+        return [products[rank] for rank in best]
+
+
+_index = None
+_lock = threading.Lock()
+
+
+def build_index(generation=None):
+    rows = (
+        Product.objects.filter(active=True)
+        .order_by("-popularity", "name", "pk")
+        .values_list("id", "name", "product_image", "image_variants")
+    )
+    return SuggestIndex(rows.iterator(chunk_size=5000), generation)
+
+
+def get_index():
+    """This process's index, rebuilt if the catalog changed since it was built."""
+    global _index
+    generation = get_generation(Product)
+    index = _index
+    if index is None or index.generation != generation:
+        with _lock:
+            if _index is None or _index.generation != generation:
+                _index = build_index(generation)
+            index = _index
+    return index
@@ -1,3 +1,901 @@
-from django.test import TestCase
+import base64
+import io
+import json
+import shutil
+import tempfile
+from datetime import timedelta
+from unittest import mock, skipUnless
 
-# Create your tests here.
+from accesories_backend.cache import bump_generation
+from Be_men_user.models import User
+from Be_men_user.tests import checkout_payload, seed_activity, seed_catalog
+from cart.models import Cart
+from cart.serializer import CartSerializer, cart_row_serializer
+from django.core.cache import cache
+from django.core.files.storage import default_storage
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.db import connection
+from django.test import TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.utils import timezone
+from order.models import Order
+from order.serializer import UserOrderSerializer, user_order_row_serializer
+from PIL import Image
+from rest_framework.renderers import JSONRenderer
+from rest_framework.request import Request
+from rest_framework.test import APIClient, APIRequestFactory
+from wishlist.models import Wishlist
+from wishlist.serializer import WishlistSerializer, wishlist_row_serializer
+
+from . import images
+from .facets import facets_cache_key
+from .fast_serializer import product_row_serializer
+from .images import VARIANT_FORMATS, VARIANT_WIDTHS, generate_variants
+from .membership import annotate_membership
+from .models import Product, ProductCategory, ProductCoPurchase
+from .pagination import ProductKeysetPagination
+from .recommendations import update_co_purchases
+from .serializer import ProductMembershipSerializer, ProductSerializer
+
+
+def plan_nodes(plan):
+    yield plan
+    for child in plan.get("Plans", ()):
+        yield from plan_nodes(child)
+
+
+@skipUnless(connection.vendor == "postgresql", "EXPLAIN plans are PostgreSQL specific")
+class ProductPlanTests(TestCase):
+    """
+    Request every catalog and admin product list variant against a large
+    seeded table and EXPLAIN the page queries they run. Any sequential scan
+    of product_product fails the test with the plan printed.
+
+    Only row fetches (queries with a LIMIT) are checked: page totals and
+    ETag validators aggregate over the whole matching set by design.
+    """
+
+    rows = 50_000
+    catalog_urls = [
+        "/api/v1/user/products/",
+        "/api/v1/user/products/?page=40",
+        "/api/v1/user/products/?ordering=price",
+        "/api/v1/user/products/?ordering=-price",
+        "/api/v1/user/products/?ordering=created_at",
+        "/api/v1/user/products/?category=category%207",
+        "/api/v1/user/products/?category=category%207&ordering=price",
+        "/api/v1/user/products/?pagination=cursor",
+        "/api/v1/user/products/?pagination=cursor&ordering=price",
+        "/api/v1/user/products/?ordering=-popularity",
+        "/api/v1/user/products/?pagination=cursor&ordering=-popularity",
+    ]
+    admin_urls = [
+        "/api/v1/admin/products/",
+        "/api/v1/admin/products/?sort=oldest",
+        "/api/v1/admin/products/?sort=stock_low_high",
+        "/api/v1/admin/products/?sort=stock_high_low",
+        "/api/v1/admin/products/?sort=out_of_stock",
+        "/api/v1/admin/products/?sort=name_asc",
+        "/api/v1/admin/products/?sort=name_desc",
+        "/api/v1/admin/products/?sort=price_low_high",
+        "/api/v1/admin/products/?sort=price_high_low",
+    ]
+
+    @classmethod
+    def setUpTestData(cls):
+        categories = ProductCategory.objects.bulk_create(
+            [ProductCategory(category=f"Category {i}") for i in range(20)]
+        )
+        # One in 20 products is inactive and one in 50 is out of stock.
+        with connection.cursor() as cursor:
+            cursor.execute(
+                """
+                INSERT INTO product_product (
+                    name, category_id, description, price, old_price,
+                    product_image, product_stock, active, created_at, updated_at,
+                    popularity, image_variants
+                )
+                SELECT
+                    'Product ' || n,
+                    (%s::bigint[])[1 + n %% %s],
+                    'Seeded product ' || n,
+                    (n %% 5000) + 0.99,
+                    NULL,
+                    'products/seed.png',
+                    CASE WHEN n %% 50 = 0 THEN 0 ELSE 1 + n %% 200 END,
+                    n %% 20 <> 0,
+                    now() - n * interval '1 minute',
+                    now() - n * interval '1 minute',
+                    (n %% 997) * 1.5,
+                    '{}'
+                FROM generate_series(1, %s) AS n
+                """,
+                [[c.id for c in categories], len(categories), cls.rows],
+            )
+            cursor.execute("ANALYZE product_product")
+            cursor.execute("ANALYZE product_productcategory")
+        cls.admin = User.objects.create_superuser(
+            email="admin@example.com",
+            name="Admin",
+            phone_number="9000000000",
+            password="Str0ng-passw0rd",
+        )
+
+    def setUp(self):
+        cache.clear()
+        self.client = APIClient()
+
+    def explain(self, sql):
+        with connection.cursor() as cursor:
+            cursor.execute(f"EXPLAIN (FORMAT JSON) {sql}")
+            return json.loads(cursor.fetchone()[0])[0]["Plan"]
+
+    def assertNoSeqScan(self, url):
+        with CaptureQueriesContext(connection) as context:
+            response = self.client.get(url)
+        self.assertEqual(response.status_code, 200, url)
+
+        page_queries = [
+            query["sql"]
+            for query in context.captured_queries
+            if query["sql"].startswith("SELECT")
+            and '"product_product"' in query["sql"]
+            and " LIMIT " in query["sql"]
+        ]
+        self.assertTrue(page_queries, f"{url} ran no product page query")
+        for sql in page_queries:
+            plan = self.explain(sql)
+            for node in plan_nodes(plan):
+                if (
+                    node["Node Type"] == "Seq Scan"
+                    and node.get("Relation Name") == Product._meta.db_table
+                ):
+                    self.fail(
+                        f"{url} scans {Product._meta.db_table} sequentially:\n"
+                        f"{sql}\n{json.dumps(plan, indent=2)}"
+                    )
+        return response
+
+    def test_catalog_list_plans(self):
+        for url in self.catalog_urls:
+            with self.subTest(url=url):
+                response = self.assertNoSeqScan(url)
+                if response.data.get("next") and "cursor" in url:
+                    self.assertNoSeqScan(response.data["next"])
+
+    def test_admin_list_plans(self):
+        self.client.force_authenticate(self.admin)
+        for url in self.admin_urls:
+            with self.subTest(url=url):
+                self.assertNoSeqScan(url)
+
+
+class FastSerializerTests(TestCase):
+    """The .values() row serializers must render the same JSON as DRF's."""
+
+    queries = [
+        "",
+        "fields=id,name,price,product_image",
+        "omit=description,image_variants,created_at",
+        "fields=id,product.name,product.product_image",
+        "omit=product.description,quantity",
+        "expand=",
+        "fields=unknown",
+    ]
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create_user(
+            email="customer@example.com",
+            name="Customer",
+            phone_number="9000000001",
+            password="Str0ng-passw0rd",
+        )
+        cls.products = seed_catalog(3)
+        first, second, _ = cls.products
+        Product.objects.filter(pk=first.pk).update(
+            old_price=None,
+            image_variants={
+                "source": "products/seed.png",
+                "webp": {"200": "products/variants/seed-200w.webp"},
+                "jpeg": {"200": "products/variants/seed-200w.jpeg"},
+            },
+        )
+        Product.objects.filter(pk=second.pk).update(product_image="")
+        seed_activity(cls.user, cls.products[:2])
+
+    def requests(self):
+        factory = APIRequestFactory()
+        for query in self.queries:
+            anonymous = Request(factory.get(f"/products/?{query}"))
+            authenticated = Request(factory.get(f"/products/?{query}"))
+            authenticated.user = self.user
+            yield query, anonymous
+            yield query, authenticated
+
+    def assertSameJSON(self, slow, fast):
+        renderer = JSONRenderer()
+        self.assertEqual(renderer.render(slow), renderer.render(fast))
+
+    def test_products(self):
+        products = Product.objects.select_related("category").order_by("pk")
+        for query, request in self.requests():
+            with self.subTest(query=query, user=request.user):
+                row_serializer = product_row_serializer(request)
+                self.assertSameJSON(
+                    ProductSerializer(
+                        products, many=True, context={"request": request}
+                    ).data,
+                    row_serializer.serialize(
+                        products.values(*row_serializer.lookups())
+                    ),
+                )
+
+    def test_product_membership(self):
+        products = annotate_membership(
+            Product.objects.select_related("category").order_by("pk"), self.user
+        )
+        for query, request in self.requests():
+            with self.subTest(query=query, user=request.user):
+                row_serializer = product_row_serializer(request, membership=True)
+                self.assertSameJSON(
+                    ProductMembershipSerializer(
+                        products, many=True, context={"request": request}
+                    ).data,
+                    row_serializer.serialize(
+                        products.values(*row_serializer.lookups())
+                    ),
+                )
+
+    def test_nested_products(self):
+        cases = [
+            (Cart, CartSerializer, cart_row_serializer),
+            (Wishlist, WishlistSerializer, wishlist_row_serializer),
+            (Order, UserOrderSerializer, user_order_row_serializer),
+        ]
+        for model, serializer_class, row_serializer_for in cases:
+            rows = model.objects.filter(user=self.user).order_by("pk")
+            instances = rows.select_related("product__category")
+            for query, request in self.requests():
+                with self.subTest(model=model.__name__, query=query):
+                    row_serializer = row_serializer_for(request)
+                    # Nested product images are relative on these endpoints.
+                    context = {"request": request, "relative_media_urls": True}
+                    slow = serializer_class(instances, many=True, context=context).data
+                    fast = row_serializer.serialize(
+                        rows.values(*row_serializer.lookups())
+                    )
+                    self.assertSameJSON(slow, fast)
+                    product = next(
+                        (row["product"] for row in fast if "product" in row), None
+                    )
+                    if isinstance(product, dict) and "product_image" in product:
+                        self.assertTrue(product["product_image"].startswith("/media/"))
+
+
+@skipUnless(connection.vendor == "postgresql", "full-text search needs PostgreSQL")
+class ProductSearchTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        leather = ProductCategory.objects.create(category="Leather goods")
+        jackets = ProductCategory.objects.create(category="Jackets")
+        accessories = ProductCategory.objects.create(category="Accessories")
+
+        def create(name, category, description):
+            return Product.objects.create(
+                name=name,
+                category=category,
+                description=description,
+                price="999.00",
+                product_image="products/seed.png",
+            )
+
+        # "leather" in the name (A), the category (B) or the description (C).
+        cls.by_name = create("Leather jacket", jackets, "Warm winter wear.")
+        cls.by_category = create("Card holder", leather, "Slim and light.")
+        cls.by_description = create("Canvas belt", accessories, "Leather trim.")
+        cls.unrelated = create("Steel watch", accessories, "Water resistant.")
+        cls.jackets = jackets
+
+    def setUp(self):
+        cache.clear()
+        self.client = APIClient()
+
+    def search(self, search=None, **params):
+        if search is not None:
+            params["search"] = search
+        response = self.client.get("/api/v1/user/products/", params)
+        self.assertEqual(response.status_code, 200, response.data)
+        return [product["id"] for product in response.data["results"]]
+
+    def test_weighted_matches(self):
+        ranked = [self.by_name.id, self.by_category.id, self.by_description.id]
+        self.assertEqual(self.search("leather"), ranked)
+        self.assertEqual(self.search("leather", ordering="-relevance"), ranked)
+        self.assertEqual(self.search("leather", ordering="relevance"), ranked[::-1])
+        # Stemmed: "jackets" finds the "jacket" name and the Jackets category.
+        self.assertEqual(self.search("jackets"), [self.by_name.id])
+        self.assertEqual(self.search("suede"), [])
+
+    def test_relevance_needs_a_search_term(self):
+        self.assertEqual(
+            len(self.search(ordering="relevance")), Product.objects.count()
+        )
+
+    def test_websearch_syntax(self):
+        self.assertEqual(self.search('"leather jacket"'), [self.by_name.id])
+        self.assertEqual(self.search('"jacket leather"'), [])
+        self.assertEqual(
+            self.search("leather -jacket"),
+            [self.by_category.id, self.by_description.id],
+        )
+        self.assertCountEqual(
+            self.search("watch or belt"), [self.unrelated.id, self.by_description.id]
+        )
+
+    def test_category_rename_refreshes_search_vector(self):
+        self.assertEqual(self.search("outerwear"), [])
+        self.jackets.category = "Outerwear"
+        self.jackets.save()
+        self.assertEqual(self.search("outerwear"), [self.by_name.id])
+
+
+def cursor_token(payload):
+    raw = json.dumps(payload).encode()
+    return base64.urlsafe_b64encode(raw).decode().rstrip("=")
+
+
+class ProductKeysetPaginationTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        products = seed_catalog(11)
+        # Ties on every seek column, so the id tie-breaker decides.
+        for i, product in enumerate(products):
+            Product.objects.filter(pk=product.pk).update(
+                price=100 + 10 * (i % 3),
+                popularity=1.5 * (i % 2),
+                created_at=products[i - i % 4].created_at,
+            )
+        Product.objects.filter(pk=products[5].pk).update(active=False)
+
+    def setUp(self):
+        cache.clear()
+        self.client = APIClient()
+
+    def get(self, url):
+        response = self.client.get(url)
+        self.assertEqual(response.status_code, 200, getattr(response, "data", ""))
+        return response.data
+
+    def test_walk_every_ordering(self):
+        for ordering, (field, descending) in ProductKeysetPagination.orderings.items():
+            with self.subTest(ordering=ordering):
+                prefix = "-" if descending else ""
+                expected = list(
+                    Product.objects.filter(active=True)
+                    .order_by(f"{prefix}{field}", f"{prefix}pk")
+                    .values_list("pk", flat=True)
+                )
+                page = self.get(
+                    "/api/v1/user/products/"
+                    f"?pagination=cursor&page_size=3&ordering={ordering}"
+                )
+                self.assertIsNone(page["previous"])
+                pages = [[p["id"] for p in page["results"]]]
+                while page["next"]:
+                    page = self.get(page["next"])
+                    pages.append([p["id"] for p in page["results"]])
+                self.assertEqual(sum(pages, []), expected)
+                self.assertEqual([len(ids) for ids in pages], [3, 3, 3, 1])
+
+                # Back to the first page through the previous links.
+                walked = [pages[-1]]
+                while page["previous"]:
+                    page = self.get(page["previous"])
+                    walked.insert(0, [p["id"] for p in page["results"]])
+                self.assertEqual(walked, pages)
+                self.assertIsNotNone(page["next"])
+
+    def test_invalid_cursors(self):
+        url = "/api/v1/user/products/?cursor="
+        valid = {"o": "-created_at", "v": timezone.now().isoformat(), "id": 1}
+        cursors = [
+            "not a cursor",
+            cursor_token([1, 2]),
+            cursor_token({**valid, "r": False, "o": "price"}),
+            cursor_token({**valid, "r": False, "v": "yesterday"}),
+            cursor_token({**valid, "r": False, "v": None}),
+            cursor_token({**valid, "r": False, "id": "one"}),
+            cursor_token({**valid, "r": False, "id": 10**30}),
+            cursor_token({**valid, "r": "yes"}),
+            cursor_token(valid),
+        ]
+        for cursor in cursors:
+            with self.subTest(cursor=cursor):
+                response = self.client.get(url + cursor)
+                self.assertEqual(response.status_code, 404)
+        for value in ("nan", "inf"):
+            response = self.client.get(
+                url
+                + cursor_token({"o": "popularity", "v": value, "id": 1, "r": False})
+                + "&ordering=popularity"
+            )
+            self.assertEqual(response.status_code, 404)
+
+    def test_page_numbers_without_cursor(self):
+        page = self.get("/api/v1/user/products/?page_size=3&page=2")
+        self.assertEqual(page["total_items"], 10)
+        self.assertEqual(page["current_page"], 2)
+        self.assertIn("page=3", page["next"])
+        self.assertNotIn("cursor", page["next"])
+        expected = Product.objects.filter(active=True).order_by("-created_at")
+        self.assertEqual(
+            [p["id"] for p in page["results"]],
+            [p.id for p in expected[3:6]],
+        )
+
+
+class SparseFieldsetTests(TestCase):
+    """?fields=, ?omit= and ?expand= on products and the responses nesting them."""
+
+    product_fields = set(ProductSerializer.Meta.fields)
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create_user(
+            email="customer@example.com",
+            name="Customer",
+            phone_number="9000000001",
+            password="Str0ng-passw0rd",
+        )
+        cls.products = seed_catalog(2)
+        cls.orders = seed_activity(cls.user, cls.products)
+
+    def setUp(self):
+        cache.clear()
+        self.client = APIClient()
+
+    def fetch(self, url, authenticated=True):
+        self.client.force_authenticate(self.user if authenticated else None)
+        with CaptureQueriesContext(connection) as context:
+            response = self.client.get(url)
+        self.assertEqual(response.status_code, 200, getattr(response, "data", ""))
+        sql = "\n".join(query["sql"] for query in context.captured_queries)
+        return response.data, sql
+
+    def assertLoads(self, sql, column, loaded=True):
+        check = self.assertIn if loaded else self.assertNotIn
+        check(f'"{Product._meta.db_table}"."{column}"', sql)
+
+    def test_products(self):
+        data, sql = self.fetch("/api/v1/user/products/", authenticated=False)
+        self.assertEqual(set(data["results"][0]), self.product_fields)
+        self.assertLoads(sql, "description")
+
+        data, sql = self.fetch("/api/v1/user/products/?fields=id,name", False)
+        self.assertEqual(set(data["results"][0]), {"id", "name"})
+        self.assertLoads(sql, "description", False)
+
+        data, sql = self.fetch(
+            "/api/v1/user/products/?omit=description,image_variants", False
+        )
+        self.assertEqual(
+            set(data["results"][0]),
+            self.product_fields - {"description", "image_variants"},
+        )
+        self.assertLoads(sql, "description", False)
+        self.assertLoads(sql, "image_variants", False)
+
+        product = self.products[0]
+        data, sql = self.fetch(f"/api/v1/user/products/{product.id}/?fields=id,price")
+        self.assertEqual(data, {"id": product.id, "price": str(product.price)})
+        self.assertLoads(sql, "description", False)
+
+    def test_nested_products(self):
+        order = self.orders[0]
+        cases = [
+            "/api/v1/user/cart/",
+            "/api/v1/user/wishlist/",
+            "/api/v1/user/my-orders/",
+            f"/api/v1/user/orders/{order.id}/",
+        ]
+        for url in cases:
+            with self.subTest(url=url):
+                data, sql = self.fetch(url)
+                row = data[0] if isinstance(data, list) else data
+                self.assertEqual(set(row["product"]), self.product_fields)
+                self.assertLoads(sql, "description")
+
+                data, sql = self.fetch(f"{url}?fields=id,product.name")
+                row = data[0] if isinstance(data, list) else data
+                self.assertEqual(set(row), {"id", "product"})
+                self.assertEqual(set(row["product"]), {"name"})
+                self.assertLoads(sql, "description", False)
+
+                data, sql = self.fetch(f"{url}?omit=product.description")
+                row = data[0] if isinstance(data, list) else data
+                self.assertEqual(
+                    set(row["product"]), self.product_fields - {"description"}
+                )
+                self.assertLoads(sql, "description", False)
+
+                # Not expanded: the product collapses to its id.
+                data, sql = self.fetch(f"{url}?expand=")
+                row = data[0] if isinstance(data, list) else data
+                self.assertIsInstance(row["product"], int)
+                self.assertLoads(sql, "name", False)
+
+    def test_unknown_names_are_ignored(self):
+        data, _ = self.fetch("/api/v1/user/products/?fields=id,bogus", False)
+        self.assertEqual(set(data["results"][0]), {"id"})
+        data, _ = self.fetch("/api/v1/user/products/?omit=bogus", False)
+        self.assertEqual(set(data["results"][0]), self.product_fields)
+
+        order = self.orders[0]
+        for url in ("/api/v1/user/cart/", f"/api/v1/user/orders/{order.id}/"):
+            with self.subTest(url=url):
+                data, _ = self.fetch(f"{url}?fields=id,product.name,product.bogus")
+                row = data[0] if isinstance(data, list) else data
+                self.assertEqual(set(row["product"]), {"name"})
+                data, _ = self.fetch(f"{url}?expand=bogus&omit=bogus.id")
+                row = data[0] if isinstance(data, list) else data
+                self.assertIsInstance(row["product"], int)
+
+
+def image_upload(name="photo.png", size=(1000, 500), color="navy"):
+    buffer = io.BytesIO()
+    Image.new("RGB", size, color).save(buffer, "PNG")
+    return SimpleUploadedFile(name, buffer.getvalue(), content_type="image/png")
+
+
+class ImageVariantTests(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.media_root = tempfile.mkdtemp()
+        cls.media_override = override_settings(MEDIA_ROOT=cls.media_root)
+        cls.media_override.enable()
+
+    @classmethod
+    def tearDownClass(cls):
+        cls.media_override.disable()
+        shutil.rmtree(cls.media_root, ignore_errors=True)
+        super().tearDownClass()
+
+    def setUp(self):
+        cache.clear()
+        self.category = ProductCategory.objects.create(category="Jackets")
+        # Variants are generated inline here, not on the worker pool.
+        submit = mock.patch.object(images._executor, "submit")
+        self.submit = submit.start()
+        self.addCleanup(submit.stop)
+
+    def create(self, upload):
+        return Product.objects.create(
+            name="Leather jacket",
+            category=self.category,
+            description="Warm.",
+            price="999.00",
+            product_image=upload,
+        )
+
+    def variant_names(self, variants):
+        return [name for fmt in VARIANT_FORMATS for name in variants[fmt].values()]
+
+    def test_generate_variants(self):
+        with self.captureOnCommitCallbacks(execute=True):
+            product = self.create(image_upload())
+        self.submit.assert_called_once_with(images._run, product.pk)
+
+        self.assertTrue(generate_variants(product.pk))
+        product.refresh_from_db()
+        variants = product.image_variants
+        self.assertEqual(variants["source"], product.product_image.name)
+        for fmt in VARIANT_FORMATS:
+            self.assertEqual(set(variants[fmt]), {str(w) for w in VARIANT_WIDTHS})
+            for width, name in variants[fmt].items():
+                with default_storage.open(name) as f, Image.open(f) as image:
+                    self.assertEqual(image.format, VARIANT_FORMATS[fmt]["format"])
+                    self.assertEqual(image.size, (int(width), int(width) // 2))
+
+        response = APIClient().get(f"/api/v1/user/products/{product.pk}/")
+        self.assertEqual(
+            response.data["image_variants"]["webp"]["200"],
+            "http://testserver" + default_storage.url(variants["webp"]["200"]),
+        )
+
+    def test_current_variants_are_not_rebuilt(self):
+        product = self.create(image_upload())
+        generate_variants(product.pk)
+        product.refresh_from_db()
+        self.submit.reset_mock()
+
+        with mock.patch.object(images, "render_variants") as render:
+            self.assertFalse(generate_variants(product.pk))
+            render.assert_not_called()
+        # Saving without a new image queues nothing either.
+        with self.captureOnCommitCallbacks(execute=True):
+            product.name = "Suede jacket"
+            product.save()
+        self.submit.assert_not_called()
+
+    def test_replaced_variants_are_released_when_unused(self):
+        # Identical uploads share one stored image and one variant set.
+        first = self.create(image_upload("a.png"))
+        second = self.create(image_upload("b.png"))
+        self.assertEqual(first.product_image.name, second.product_image.name)
+        generate_variants(first.pk)
+        generate_variants(second.pk)
+        first.refresh_from_db()
+        old = self.variant_names(first.image_variants)
+
+        for product in (first, second):
+            product.refresh_from_db()
+            with self.captureOnCommitCallbacks(execute=True):
+                product.product_image = image_upload(color="tan")
+                product.save()
+                generate_variants(product.pk)
+            exists = [default_storage.exists(name) for name in old]
+            if product is first:
+                # The second product still uses the old source image.
+                self.assertTrue(all(exists))
+            else:
+                self.assertFalse(any(exists))
+
+        first.refresh_from_db()
+        self.assertTrue(
+            all(map(default_storage.exists, self.variant_names(first.image_variants)))
+        )
+
+
+class ProductFacetTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        belts = ProductCategory.objects.create(category="Belts")
+        wallets = ProductCategory.objects.create(category="Wallets")
+
+        def create(name, category, price, active=True):
+            return Product.objects.create(
+                name=name,
+                category=category,
+                description="Full grain.",
+                price=price,
+                product_image="products/seed.png",
+                active=active,
+            )
+
+        create("Leather belt", belts, "250.00")
+        create("Braided belt", belts, "750.00")
+        create("Leather dress belt", belts, "1500.00")
+        create("Leather wallet", wallets, "450.00")
+        cls.card_case = create("Card case", wallets, "6000.00")
+        create("Retired belt", belts, "100.00", active=False)
+        cls.belts, cls.wallets = belts, wallets
+
+    def setUp(self):
+        cache.clear()
+        self.client = APIClient()
+
+    def facets(self, **params):
+        response = self.client.get("/api/v1/user/products/facets/", params)
+        self.assertEqual(response.status_code, 200)
+        return response.data
+
+    def category(self, category, count):
+        return {"id": category.id, "category": category.category, "count": count}
+
+    def assertRanges(self, facets, counts):
+        self.assertEqual([r["count"] for r in facets["price_ranges"]], counts)
+
+    def test_all_products(self):
+        facets = self.facets()
+        self.assertEqual(facets["total"], 5)
+        self.assertEqual(
+            facets["categories"],
+            [self.category(self.belts, 3), self.category(self.wallets, 2)],
+        )
+        self.assertEqual(
+            facets["price_ranges"][:2],
+            [
+                {"min": "0.00", "max": "500.00", "count": 2},
+                {"min": "500.00", "max": "1000.00", "count": 1},
+            ],
+        )
+        self.assertEqual(
+            facets["price_ranges"][-1], {"min": "5000.00", "max": None, "count": 1}
+        )
+        self.assertRanges(facets, [2, 1, 1, 0, 1])
+        self.assertEqual(
+            (facets["min_price"], facets["max_price"]), ("250.00", "6000.00")
+        )
+
+    def test_category_filter(self):
+        facets = self.facets(category="belts")
+        self.assertEqual(facets["total"], 3)
+        self.assertEqual(facets["categories"], [self.category(self.belts, 3)])
+        self.assertRanges(facets, [1, 1, 1, 0, 0])
+        self.assertEqual(
+            (facets["min_price"], facets["max_price"]), ("250.00", "1500.00")
+        )
+
+        facets = self.facets(category="scarves")
+        self.assertEqual((facets["total"], facets["categories"]), (0, []))
+        self.assertRanges(facets, [0, 0, 0, 0, 0])
+        self.assertIsNone(facets["min_price"])
+
+    @skipUnless(connection.vendor == "postgresql", "full-text search needs PostgreSQL")
+    def test_search_filter(self):
+        facets = self.facets(search="leather")
+        self.assertEqual(facets["total"], 3)
+        self.assertEqual(
+            facets["categories"],
+            [self.category(self.belts, 2), self.category(self.wallets, 1)],
+        )
+        self.assertRanges(facets, [2, 0, 1, 0, 0])
+
+        facets = self.facets(search="leather", category="wallets")
+        self.assertEqual(facets["categories"], [self.category(self.wallets, 1)])
+        self.assertEqual(
+            (facets["min_price"], facets["max_price"]), ("450.00", "450.00")
+        )
+
+    def test_catalog_write_invalidates_cache(self):
+        request = Request(APIRequestFactory().get("/", {"category": " Wallets "}))
+        key = facets_cache_key(request)
+        # Parameters are normalised, so equivalent filters share an entry.
+        self.assertEqual(
+            key,
+            facets_cache_key(Request(APIRequestFactory().get("/?category=wallets"))),
+        )
+        self.assertRanges(self.facets(category="wallets"), [1, 0, 0, 0, 1])
+        self.assertIsNotNone(cache.get(key))
+        with self.assertNumQueries(0):
+            self.facets(category="wallets")
+
+        self.card_case.price = "999.00"
+        self.card_case.save()
+        self.assertNotEqual(facets_cache_key(request), key)
+        self.assertRanges(self.facets(category="wallets"), [1, 1, 0, 0, 0])
+
+
+class ProductActivityTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.client = APIClient()
+        self.user = User.objects.create_user(
+            email="shopper@example.com",
+            name="Shopper",
+            phone_number="9000000001",
+            password="Str0ng-passw0rd",
+        )
+        self.products = seed_catalog(3)
+        # products[:2] are in the cart, wishlist and orders.
+        self.orders = seed_activity(self.user, self.products[:2])
+
+    def test_popularity_ordering(self):
+        first, second, third = self.products
+        Wishlist.objects.create(user=self.user, product=third)
+        # Checkout creates orders with bulk_create(), which sends no post_save.
+        self.client.force_authenticate(self.user)
+        response = self.client.post(
+            "/api/v1/user/checkout/cod/", checkout_payload([second]), format="json"
+        )
+        self.assertEqual(response.status_code, 201)
+        self.client.force_authenticate(None)
+        scores = dict(Product.objects.values_list("id", "popularity"))
+        self.assertGreater(scores[second.id], scores[first.id])
+
+        for url in (
+            "/api/v1/user/products/?ordering=-popularity",
+            "/api/v1/user/products/?pagination=cursor&ordering=-popularity",
+        ):
+            response = self.client.get(url)
+            ids = [product["id"] for product in response.data["results"]]
+            self.assertEqual(ids[:3], [second.id, first.id, third.id])
+
+    def test_membership_flags(self):
+        self.client.force_authenticate(self.user)
+        first, second, third = self.products
+        Cart.objects.filter(user=self.user, product=first).update(quantity=3)
+        expected = {
+            first.id: (True, 3),
+            second.id: (True, 1),
+            third.id: (False, 0),
+        }
+        url = "/api/v1/user/products/?page_size=50"
+        response = self.client.get(url)
+        self.assertEqual(
+            {
+                row["id"]: (row["in_wishlist"], row["cart_quantity"])
+                for row in response.data["results"]
+            },
+            expected,
+        )
+        response = self.client.get(f"/api/v1/user/products/{first.id}/")
+        self.assertEqual(
+            (response.data["in_wishlist"], response.data["cart_quantity"]), (True, 3)
+        )
+
+        membership = f"/api/v1/user/products/membership/?ids={third.id},{first.id},0"
+        response = self.client.get(membership)
+        self.assertEqual(
+            response.data["results"],
+            [
+                {"id": third.id, "in_wishlist": False, "cart_quantity": 0},
+                {"id": first.id, "in_wishlist": True, "cart_quantity": 3},
+            ],
+        )
+        etag, list_etag = response["ETag"], self.client.get(url)["ETag"]
+        self.assertEqual(
+            self.client.get(membership, HTTP_IF_NONE_MATCH=etag).status_code, 304
+        )
+
+        # Cart and wishlist writes change both validators.
+        self.client.post("/api/v1/user/cart/", {"product_id": third.id})
+        self.assertEqual(
+            self.client.get(membership, HTTP_IF_NONE_MATCH=etag).status_code, 200
+        )
+        self.assertEqual(
+            self.client.get(url, HTTP_IF_NONE_MATCH=list_etag).status_code, 200
+        )
+        etag = self.client.get(membership)["ETag"]
+        self.client.post("/api/v1/user/wishlist/", {"product_id": third.id})
+        response = self.client.get(membership, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(
+            response.data["results"][0],
+            {"id": third.id, "in_wishlist": True, "cart_quantity": 1},
+        )
+
+        # Anonymous responses are unchanged.
+        self.client.force_authenticate(None)
+        row = self.client.get(url).data["results"][0]
+        self.assertNotIn("in_wishlist", row)
+        self.assertEqual(self.client.get(membership).status_code, 401)
+
+    def test_suggest(self):
+        first = self.products[0]
+        Product.objects.filter(pk=first.pk).update(name="Leather Bifold Wallet")
+        bump_generation(Product)
+        response = self.client.get("/api/v1/user/products/suggest/?q=bifold wal")
+        self.assertEqual(
+            response.data["results"],
+            [
+                {
+                    "id": first.id,
+                    "name": "Leather Bifold Wallet",
+                    "thumbnail": "http://testserver/media/products/seed.png",
+                }
+            ],
+        )
+
+    def test_related(self):
+        def settle_and_count():
+            # Orders are counted once they are older than SETTLE_DELAY.
+            Order.objects.update(created_at=timezone.now() - timedelta(hours=1))
+            update_co_purchases()
+
+        first, second, third = self.products
+        settle_and_count()
+        url = f"/api/v1/user/products/{first.id}/related/"
+        response = self.client.get(url)
+        self.assertEqual([p["id"] for p in response.data["results"]], [second.id])
+
+        # Only the new order is read; the first pair is not counted again.
+        seed_activity(self.user, [third])
+        settle_and_count()
+        self.assertEqual(
+            dict(
+                ProductCoPurchase.objects.filter(product=first).values_list(
+                    "related_id", "count"
+                )
+            ),
+            {second.id: 1, third.id: 1},
+        )
+
+    def test_product_image_is_absolute(self):
+        # Nested product images are relative; see the cart, wishlist and
+        # order tests.
+        product = self.client.get(f"/api/v1/user/products/{self.products[0].id}/")
+        self.assertEqual(
+            product.data["product_image"], "http://testserver/media/products/seed.png"
+        )
@@ -1,12 +1,37 @@
 import math
 
+from accesories_backend.cache import get_generation
+from accesories_backend.conditional import (conditional_response, make_etag,
+                                            queryset_validators)
+from accesories_backend.pagination import CachedCountPaginator
+from accesories_backend.serializers import defer_unselected
+from django.core.cache import cache
+from django.core.exceptions import ValidationError
 from django_filters.rest_framework import (CharFilter, DjangoFilterBackend,
                                            FilterSet)
-from product.models import Product
-from product.serializer import ProductSerializer
-from rest_framework import filters, viewsets
+from product.cache import CatalogResponseCacheMixin
+from product.facets import (FACETS_CACHE_TIMEOUT, facets_cache_key,
+                            product_facets)
+from product.fast_serializer import (media_url_converter,
+                                     product_row_serializer)
+from product.membership import (MEMBERSHIP_MAX_IDS, annotate_membership,
+                                membership_validators)
+from product.models import Product, ProductCoPurchase
+from product.pagination import ProductKeysetPagination
+from product.popularity import is_popularity_ordering, popularity_window
+from product.recommendations import (RELATED_LIMIT, RELATED_MAX_LIMIT,
+                                     related_products)
+from product.search import ProductOrderingFilter, ProductSearchFilter
+from product.serializer import ProductMembershipSerializer, ProductSerializer
+from product.suggest import (MIN_QUERY_LENGTH, SUGGEST_LIMIT,
+                             SUGGEST_MAX_LIMIT, get_index)
+from rest_framework import viewsets
+from rest_framework.decorators import action
+from rest_framework.exceptions import NotFound
+from rest_framework.exceptions import ValidationError as APIValidationError
 from rest_framework.pagination import PageNumberPagination
-from rest_framework.permissions import IsAuthenticatedOrReadOnly
+from rest_framework.permissions import (IsAuthenticated,
+                                        IsAuthenticatedOrReadOnly)
 from rest_framework.response import Response
 
 
@@ -21,12 +46,14 @@ class ProductFilter(FilterSet):
 class ProductPagination(PageNumberPagination):
     page_size = 10
     page_size_query_param = "page_size"
+    django_paginator_class = CachedCountPaginator
 
     def get_paginated_response(self, data):
         total_pages = math.ceil(self.page.paginator.count / self.page_size)
         return Response(
             {
                 "total_items": self.page.paginator.count,
+                "total_items_exact": self.page.paginator.count_is_exact,
                 "total_pages": total_pages,
                 "current_page": self.page.number,
                 "next": self.get_next_link(),
@@ -36,16 +63,260 @@ class ProductPagination(PageNumberPagination):
         )
 
 
-class ProductViewSet(viewsets.ReadOnlyModelViewSet):
-    queryset = Product.objects.filter(active=True).order_by("-created_at")
+class FastProductListMixin:
+    """
+    List products from ``.values()`` rows through the fast row serializer
+    instead of ProductSerializer; the JSON is identical. Authenticated
+    users also get ``in_wishlist`` and ``cart_quantity`` from the same query.
+    """
+
+    def list(self, request, *args, **kwargs):
+        queryset = self.filter_queryset(self.get_queryset())
+        membership = request.user.is_authenticated
+        if membership:
+            queryset = annotate_membership(queryset, request.user)
+        row_serializer = product_row_serializer(request, membership)
+        # id and the ordering columns are needed by the keyset paginator.
+        lookups = {
+            "id",
+            "created_at",
+            "price",
+            "popularity",
+            *row_serializer.lookups(),
+        }
+        rows = queryset.values(*lookups)
+
+        page = self.paginate_queryset(rows)
+        if page is not None:
+            return self.get_paginated_response(row_serializer.serialize(page))
+        return Response(row_serializer.serialize(rows))
+
+
+class ProductViewSet(
+    CatalogResponseCacheMixin, FastProductListMixin, viewsets.ReadOnlyModelViewSet
+):
+    queryset = (
+        Product.objects.filter(active=True)
+        .select_related("category")
+        .defer("search_vector")
+        .order_by("-created_at")
+    )
     serializer_class = ProductSerializer
     permission_classes = [IsAuthenticatedOrReadOnly]
     pagination_class = ProductPagination
     filter_backends = [
         DjangoFilterBackend,
-        filters.SearchFilter,
-        filters.OrderingFilter,
+        ProductSearchFilter,
+        ProductOrderingFilter,
     ]
     filterset_class = ProductFilter
-    search_fields = ["name", "category__category", "description"]
-    ordering_fields = ["price","created_at"]
+    ordering_fields = ["price", "created_at", "popularity", "relevance"]
+
+    def get_queryset(self):
+        # Ordering columns stay loaded for the keyset paginator.
+        queryset = defer_unselected(
+            super().get_queryset(),
+            self.request,
+            ProductSerializer,
+            keep=("created_at", "price", "popularity"),
+        )
+        if self.action == "retrieve" and self.request.user.is_authenticated:
+            queryset = annotate_membership(queryset, self.request.user)
+        return queryset
+
+    def get_serializer_class(self):
+        if self.request.user.is_authenticated:
+            return ProductMembershipSerializer
+        return super().get_serializer_class()
+
+    @property
+    def paginator(self):
+        """Use keyset pagination when the client asks for cursors."""
+        if not hasattr(self, "_paginator"):
+            if ProductKeysetPagination.is_requested(self.request):
+                self._paginator = ProductKeysetPagination()
+            else:
+                self._paginator = self.pagination_class()
+        return self._paginator
+
+    def anonymous_etag(self, request):
+        """
+        Anonymous responses are cached under a key that embeds the catalog
+        generation, so the key itself validates them without any SQL.
+        """
+        return make_etag(self.get_response_cache_key(request))
+
+    def list(self, request, *args, **kwargs):
+        if not request.user.is_authenticated:
+            return conditional_response(
+                request,
+                self.anonymous_etag(request),
+                None,
+                lambda: super(ProductViewSet, self).list(request, *args, **kwargs),
+            )
+        extra = [popularity_window()] if is_popularity_ordering(request) else []
+        extra += membership_validators(request)
+        etag, last_modified = queryset_validators(
+            self.filter_queryset(self.get_queryset()),
+            get_generation(Product),
+            request.get_full_path(),
+            *extra,
+        )
+        return conditional_response(
+            request,
+            etag,
+            last_modified,
+            lambda: super(ProductViewSet, self).list(request, *args, **kwargs),
+        )
+
+    def retrieve(self, request, *args, **kwargs):
+        if not request.user.is_authenticated:
+            return conditional_response(
+                request,
+                self.anonymous_etag(request),
+                None,
+                lambda: super(ProductViewSet, self).retrieve(request, *args, **kwargs),
+            )
+        lookup = self.lookup_url_kwarg or self.lookup_field
+        try:
+            last_modified = (
+                self.get_queryset()
+                .filter(**{self.lookup_field: self.kwargs[lookup]})
+                .values_list("updated_at", flat=True)
+                .first()
+            )
+        except (TypeError, ValueError, ValidationError):
+            last_modified = None
+        if last_modified is None:
+            return super().retrieve(request, *args, **kwargs)
+        return conditional_response(
+            request,
+            make_etag(
+                last_modified,
+                get_generation(Product),
+                request.get_full_path(),
+                *membership_validators(request),
+            ),
+            last_modified,
+            lambda: super(ProductViewSet, self).retrieve(request, *args, **kwargs),
+        )
+
+    def get_response_cache_key(self, request):
+        key = super().get_response_cache_key(request)
+        if self.action == "related":
+            # Rebuilt by build_co_purchases, independently of catalog writes.
+            key = f"{key}:{get_generation(ProductCoPurchase)}"
+        return key
+
+    @action(detail=True)
+    def related(self, request, pk=None):
+        """
+        Products most often bought together with this one (``?limit=``,
+        default 10), read from the precomputed co-purchase counts.
+        """
+        return self.cached_response(request, self.related_response, pk)
+
+    def related_response(self, request, pk):
+        try:
+            product_id = int(pk)
+        except ValueError:
+            raise NotFound()
+        try:
+            limit = int(request.query_params.get("limit", RELATED_LIMIT))
+        except ValueError:
+            limit = RELATED_LIMIT
+        limit = min(max(limit, 1), RELATED_MAX_LIMIT)
+
+        row_serializer = product_row_serializer(request)
+        rows = related_products(product_id).values(*row_serializer.lookups())
+        return Response({"results": row_serializer.serialize(rows[:limit])})
+
+    @action(detail=False, permission_classes=[IsAuthenticated])
+    def membership(self, request):
+        """
+        ``in_wishlist`` and ``cart_quantity`` of up to 100 products given as
+        ``?ids=1,2,3``, for badges on pages rendered without them.
+        """
+        try:
+            ids = list(
+                dict.fromkeys(
+                    int(value)
+                    for value in request.query_params.get("ids", "").split(",")
+                    if value.strip()
+                )
+            )
+        except ValueError:
+            raise APIValidationError({"ids": "Must be comma-separated integers."})
+        if len(ids) > MEMBERSHIP_MAX_IDS:
+            raise APIValidationError(
+                {"ids": f"At most {MEMBERSHIP_MAX_IDS} ids are allowed."}
+            )
+
+        def build_response():
+            flags = {
+                pk: (in_wishlist, cart_quantity)
+                for pk, in_wishlist, cart_quantity in annotate_membership(
+                    Product.objects.filter(pk__in=ids), request.user
+                ).values_list("pk", "in_wishlist", "cart_quantity")
+            }
+            return Response(
+                {
+                    "results": [
+                        {
+                            "id": pk,
+                            "in_wishlist": flags[pk][0],
+                            "cart_quantity": flags[pk][1],
+                        }
+                        for pk in ids
+                        if pk in flags
+                    ]
+                }
+            )
+
+        # The flags only change with the user's cart and wishlist generations,
+        # so a revalidation is answered without a query.
+        etag = make_etag(request.get_full_path(), *membership_validators(request))
+        return conditional_response(request, etag, None, build_response)
+
+    @action(detail=False)
+    def suggest(self, request):
+        """
+        Typeahead: up to ``?limit=`` (default 8) active products whose name
+        words start with the words of ``?q=``, as id, name and thumbnail.
+        Served from an in-memory index, see product/suggest.py.
+        """
+        query = request.query_params.get("q", "").strip()
+        if len(query) < MIN_QUERY_LENGTH:
+            return Response({"results": []})
+        try:
+            limit = int(request.query_params.get("limit", SUGGEST_LIMIT))
+        except ValueError:
+            limit = SUGGEST_LIMIT
+        limit = min(max(limit, 1), SUGGEST_MAX_LIMIT)
+
+        media_url = media_url_converter(request)
+        return Response(
+            {
+                "results": [
+                    {
+                        "id": product.id,
+                        "name": product.name,
+                        "thumbnail": media_url(product.image),
+                    }
+                    for product in get_index().search(query, limit)
+                ]
+            }
+        )
+
+    @action(detail=False)
+    def facets(self, request):
+        """
+        Category counts and price ranges for the products matching the same
+        ``category`` and ``search`` filters as the list.
+        """
+        key = facets_cache_key(request)
+        data = cache.get(key)
+        if data is None:
+            data = product_facets(self.filter_queryset(self.get_queryset()))
+            cache.set(key, data, FACETS_CACHE_TIMEOUT)
+        return Response(data)
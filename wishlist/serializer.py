@@ -1,12 +1,22 @@
+from accesories_backend.serializers import SparseFieldsetMixin
+from product.fast_serializer import nested_product_row_serializer
 from product.serializer import ProductSerializer
 from rest_framework import serializers
 
 from .models import Wishlist
 
 
-class WishlistSerializer(serializers.ModelSerializer):
+class WishlistSerializer(SparseFieldsetMixin, serializers.ModelSerializer):
     product = ProductSerializer(read_only=True)
 
     class Meta:
         model = Wishlist
         fields = ["id", "product"]
+        expandable_fields = ["product"]
+
+
+def wishlist_row_serializer(request):
+    """Fast, read-only equivalent of WishlistSerializer for .values() rows."""
+    return nested_product_row_serializer(
+        request, WishlistSerializer, {"id": ("id", None)}
+    )
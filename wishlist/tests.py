@@ -1,3 +1,53 @@
+from Be_men_user.models import User
+from Be_men_user.tests import seed_activity, seed_catalog
+from django.core.cache import cache
 from django.test import TestCase
+from rest_framework.test import APIClient
 
-# Create your tests here.
+from .models import Wishlist
+
+
+class WishlistTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.client = APIClient()
+        self.user = User.objects.create_user(
+            email="shopper@example.com",
+            name="Shopper",
+            phone_number="9000000001",
+            password="Str0ng-passw0rd",
+        )
+        self.products = seed_catalog(3)
+        seed_activity(self.user, self.products[:2])
+        self.client.force_authenticate(self.user)
+
+    def test_add_and_remove(self):
+        product = self.products[2]
+        membership = f"/api/v1/user/products/membership/?ids={product.id}"
+        etag = self.client.get(membership)["ETag"]
+
+        response = self.client.post(
+            "/api/v1/user/wishlist/", {"product_id": product.id}
+        )
+        self.assertEqual(response.status_code, 200)
+        self.assertTrue(
+            Wishlist.objects.filter(user=self.user, product=product).exists()
+        )
+        # The write changes the membership validator.
+        response = self.client.get(membership, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 200)
+        self.assertTrue(response.data["results"][0]["in_wishlist"])
+
+        self.client.delete(f"/api/v1/user/wishlist/{product.id}/")
+        self.assertFalse(
+            Wishlist.objects.filter(user=self.user, product=product).exists()
+        )
+        response = self.client.get(membership)
+        self.assertFalse(response.data["results"][0]["in_wishlist"])
+
+    def test_nested_product_images_are_relative(self):
+        image = "/media/products/seed.png"
+        response = self.client.get("/api/v1/user/wishlist/")
+        self.assertEqual(
+            [row["product"]["product_image"] for row in response.data], [image, image]
+        )
@@ -1,8 +1,9 @@
+from accesories_backend.cache import bump_generation
 from product.models import Product
 from rest_framework import permissions, status
 from rest_framework.response import Response
 from rest_framework.views import APIView
-from wishlist.serializer import WishlistSerializer
+from wishlist.serializer import wishlist_row_serializer
 
 from .models import Wishlist
 
@@ -17,8 +18,9 @@ class WishlistAPIView(APIView):
             .select_related("product")
             .order_by("-added_at")
         )
-        serializer = WishlistSerializer(items, many=True)
-        return Response(serializer.data)
+        row_serializer = wishlist_row_serializer(request)
+        rows = items.values(*row_serializer.lookups())
+        return Response(row_serializer.serialize(rows))
 
     def post(self, request):
         """Add a product to wishlist"""
@@ -30,7 +32,9 @@ class WishlistAPIView(APIView):
         except Product.DoesNotExist:
             return Response({"error": "Product not found"}, status=404)
 
-        Wishlist.objects.get_or_create(user=request.user, product=product)
+        _, created = Wishlist.objects.get_or_create(user=request.user, product=product)
+        if created:
+            bump_generation(Wishlist, request.user.pk)
         return Response({"message": "Product added to wishlist"}, status=200)
 
     def delete(self, request, product_id=None):
@@ -41,11 +45,13 @@ class WishlistAPIView(APIView):
                 user=request.user, product_id=product_id
             ).delete()
             if deleted:
+                bump_generation(Wishlist, request.user.pk)
                 return Response({"message": "Product removed from cart"}, status=204)
             return Response({"error": "Product not found in cart"}, status=404)
 
         # No product_id → empty the cart
         Wishlist.objects.filter(user=request.user).delete()
+        bump_generation(Wishlist, request.user.pk)
         return Response(
             {"message": "All cart items removed"}, status=status.HTTP_204_NO_CONTENT
         )